@@ -0,0 +1,56 @@
+import hashlib
+import math
+import re
+from typing import Dict
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Dimension of the hashed feature space
+EMBEDDING_DIM = 2 ** 12
+
+# Words that carry no meaning for matching questions against each other
+STOPWORDS = frozenset(
+    "a an and are be can could do does for how i in is it me my of on or "
+    "please should show tell the to what which with you your".split()
+)
+
+
+def tokenize(text: str):
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+def _bucket(feature: str) -> int:
+    digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=4).digest()
+    return int.from_bytes(digest, "little") % EMBEDDING_DIM
+
+
+def embed(text: str) -> Dict[int, float]:
+    """
+    Local, dependency-free text embedding: hashed word unigrams and bigrams
+    plus character trigrams (which tolerate typos), L2-normalized.
+    Returns a sparse {bucket: weight} vector.
+    """
+    tokens = tokenize(text)
+    features = list(tokens)
+    features += [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    for token in tokens:
+        padded = f" {token} "
+        features += [f"#{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+
+    vector = {}
+    for feature in features:
+        bucket = _bucket(feature)
+        vector[bucket] = vector.get(bucket, 0.0) + 1.0
+
+    norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+    if norm:
+        for bucket in vector:
+            vector[bucket] /= norm
+    return vector
+
+
+def cosine(a: Dict[int, float], b: Dict[int, float]) -> float:
+    """Cosine similarity of two normalized sparse vectors."""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(bucket, 0.0) for bucket, weight in a.items())
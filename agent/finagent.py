@@ -2,26 +2,42 @@ import sys
 from pathlib import Path
 import logging
 import uuid
-from typing import Any, Dict, List, Optional
+import asyncio
+import contextvars
+import json
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, wait
+from typing import Any, Dict, Iterator, List, Optional
 import finnhub
 from datetime import datetime, timedelta
 
 # Langchain imports with correct paths
 from langchain_core.messages import BaseMessage
+from langchain_core.callbacks import BaseCallbackHandler
 from langchain_core.runnables import RunnableConfig
 import langchain_core.output_parsers as output_parsers
-from langchain_core.prompts import PromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.agents import AgentExecutor, create_react_agent  # Fixed import
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder, PromptTemplate
+from langchain.agents import AgentExecutor, create_react_agent, create_tool_calling_agent  # Fixed import
 from langchain.tools import tool
-from FinAdvisor.api import models, database
+from FinAdvisor.api import models, database, news_ingestion, chat_context, deadline
+from FinAdvisor.api.llm_client import get_langchain_llm, get_llm_client
+from FinAdvisor.agent.sentiment import get_sentiment_for_ticker
+from FinAdvisor.agent.ticker_matcher import COMPANY_ALIASES
+from FinAdvisor.agent.ticker_resolver import TickerResolver
+from FinAdvisor.agent.response_cache import ResponseCache, context_buckets, context_fingerprint, is_shareable
+from FinAdvisor.agent.tool_cache import ToolCache
+from FinAdvisor.agent.intent_router import FAST_INTENTS, IntentRouter
+from FinAdvisor.agent.instrumentation import PARSE_ERROR_TOOL, AgentRunRecorder, agent_metrics
+from sqlmodel import Session
 import os
 # Other imports
 from dotenv import load_dotenv
-from google import genai
 from fastapi import HTTPException
 import yfinance as yf
-from sqlalchemy import select, desc
+from sqlalchemy import select
 
 # Add the project root to the Python path
 project_root = str(Path(__file__).parent.parent.parent)
@@ -38,19 +54,12 @@ logging.basicConfig(level=logging.INFO)
 google_api_key = os.getenv("GOOGLE_API_KEY")
 
 
-# Initialize clients
-try:
-    client = genai.Client(api_key=google_api_key)
-    logging.info("Gemini client initialized successfully")
-except Exception as e:
-    logging.error(f"Failed to initialize Gemini client: {e}")
-    client = None
+# Initialize clients; every Gemini call goes through the shared pooled, rate-limited client
+client = get_llm_client()
+if not client.available:
+    logging.error("Gemini client not initialized; GOOGLE_API_KEY missing or invalid")
 
-llm = ChatGoogleGenerativeAI(
-    model="gemini-1.5-flash",
-    temperature=0.2,
-    api_key=google_api_key
-)
+llm = get_langchain_llm(model="gemini-1.5-flash", temperature=0.2)
 
 
 # Company ticker mapping
@@ -87,18 +96,12 @@ company_ticker_map = {
     "JSW Steel": "JSWSTEEL"
 }
 
-def extract_company_ticker(prompt: str) -> str:
+def _llm_pick_company(prompt: str, candidates: List[str]) -> Optional[str]:
     """
-    Extract and correct company name from prompt using Gemini.
-    Returns the NSE-compatible stock ticker symbol (e.g. RELIANCE.NS).
+    Ask Gemini which of the closest candidate companies the prompt refers to.
+    Only used by the ticker resolver when local fuzzy matching is ambiguous.
     """
-    if not client:
-        logging.warning("Gemini client not available, using fallback method")
-        return _fallback_ticker_extraction(prompt)
-
-    company_names = list(company_ticker_map.keys())
-    company_names_str = ", ".join(company_names)
-
+    candidates_str = ", ".join(candidates)
     context = (
         f"{prompt}\n\n"
         "Extract the company name from the above prompt.\n"
@@ -107,168 +110,366 @@ def extract_company_ticker(prompt: str) -> str:
         "Example:\n"
         'User query: "show price of tata consultincy servises"\n'
         "Output: Tata Consultancy Services\n"
-        f"Choose from the following company names:\n{company_names_str}"
+        f"Choose from the following company names:\n{candidates_str}"
     )
 
-    try:
-        response = client.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=context
-        )
-        
-        extracted_name = response.text.strip()
-        logging.info(f"Gemini extracted name: {extracted_name}")
+    response = client.generate(context, model="gemini-2.0-flash")
 
-        ticker = company_ticker_map.get(extracted_name)
-        if ticker:
-            return f"{ticker}.NS"  # append .NS for Indian stocks
+    extracted_name = response.text.strip()
+    logging.info(f"Gemini extracted name: {extracted_name}")
 
-        # Fuzzy fallback: partial match
-        for company_name in company_ticker_map.keys():
-            if company_name.lower() in extracted_name.lower() or extracted_name.lower() in company_name.lower():
-                return f"{company_ticker_map[company_name]}.NS"
-        
-        raise HTTPException(
-            status_code=404, 
-            detail=f"Company '{extracted_name}' not found in our database"
-        )
+    ticker = company_ticker_map.get(extracted_name)
+    if ticker:
+        return ticker
 
-    except Exception as e:
-        logging.error(f"Error extracting company name with Gemini: {e}")
-        return _fallback_ticker_extraction(prompt)
+    # Partial match against the candidates we offered
+    for company_name in candidates:
+        if company_name.lower() in extracted_name.lower() or extracted_name.lower() in company_name.lower():
+            return company_ticker_map[company_name]
+    return None
 
-def _fallback_ticker_extraction(prompt: str) -> str:
-    """Fallback method for ticker extraction when Gemini is not available."""
-    prompt_lower = prompt.lower()
-    
-    # Check for exact company name matches
-    for company, ticker in company_ticker_map.items():
-        if company.lower() in prompt_lower:
-            return f"{ticker}.NS"
-    
-    # Check for ticker matches
-    for ticker in company_ticker_map.values():
-        if ticker.lower() in prompt_lower:
-            return f"{ticker}.NS"
+# Exact -> alias -> fuzzy resolution, with Gemini only for ambiguous prompts
+ticker_resolver = TickerResolver(
+    company_ticker_map,
+    COMPANY_ALIASES,
+    llm_fallback=_llm_pick_company if client.available else None
+)
+
+# Rules + nearest-centroid classifier that lets simple lookups skip the agent
+intent_router = IntentRouter(ticker_resolver.matcher)
+INTENT_ROUTER_ENABLED = os.getenv("INTENT_ROUTER_ENABLED", "true").lower() == "true"
+company_names = {ticker: name for name, ticker in company_ticker_map.items()}
+
+# Tool results shared across agent runs and users, keyed by (tool, ticker)
+tool_cache = ToolCache(
+    ttls={
+        "query_stock_data": float(os.getenv("TOOL_CACHE_STOCK_TTL_SECONDS", 300)),
+        "get_company_news": float(os.getenv("TOOL_CACHE_NEWS_TTL_SECONDS", 900)),
+        "compare_companies": float(os.getenv("TOOL_CACHE_STOCK_TTL_SECONDS", 300)),
+    },
+    max_entries=int(os.getenv("TOOL_CACHE_MAX_ENTRIES", 2000)),
+    # Longest a request waits on another request computing the same entry
+    max_wait=float(os.getenv("TOOL_CACHE_MAX_WAIT_SECONDS", 15))
+)
+
+# Planning stage: tool data for the tickers in a question is fetched up front, concurrently
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "true").lower() == "true"
+PREFETCH_MAX_TICKERS = int(os.getenv("PREFETCH_MAX_TICKERS", 2))
+PREFETCH_TIMEOUT_SECONDS = float(os.getenv("PREFETCH_TIMEOUT_SECONDS", 8))
+_prefetch_pool = ThreadPoolExecutor(max_workers=int(os.getenv("PREFETCH_WORKERS", 8)), thread_name_prefix="prefetch")
+# Separate pool for quote/fundamentals so prefetch tasks never wait on their own pool
+_yfinance_pool = ThreadPoolExecutor(max_workers=int(os.getenv("YFINANCE_WORKERS", 8)), thread_name_prefix="yfinance")
+YFINANCE_TIMEOUT_SECONDS = float(os.getenv("YFINANCE_TIMEOUT_SECONDS", 10))
+
+# Under a request deadline the agent stops iterating this long before it, to answer with what it has
+AGENT_DEADLINE_RESERVE_SECONDS = float(os.getenv("AGENT_DEADLINE_RESERVE_SECONDS", 3))
+DEADLINE_OBSERVATION = "Time budget for this question is used up. Answer now with the data gathered so far."
+_TIMEOUT_ERRORS = (TimeoutError, asyncio.TimeoutError, FuturesTimeoutError)
+
+def _out_of_time() -> bool:
+    """True once the request deadline, if any, is within the agent's reserve."""
+    left = deadline.remaining()
+    return left is not None and left <= AGENT_DEADLINE_RESERVE_SECONDS
+
+def extract_company_ticker(prompt: str) -> str:
+    """
+    Resolve the company mentioned in the prompt to a ticker, locally where
+    possible (see TickerResolver).
+    Returns the NSE-compatible stock ticker symbol (e.g. RELIANCE.NS).
+    """
+    resolution = ticker_resolver.resolve(prompt)
+    if resolution.ticker:
+        logging.info(f"Resolved ticker {resolution.ticker} via {resolution.tier}")
+        return f"{resolution.ticker}.NS"  # append .NS for Indian stocks
     
     # Default fallback
     logging.warning("No company found in prompt, defaulting to RELIANCE")
     return "RELIANCE.NS"
 
+def _fetch_stock_info(ticker: str) -> Optional[Dict[str, Any]]:
+    """Stock information for ``ticker`` from the database, else Yahoo Finance; None if there is none."""
+    # Try to get data from database first
+    try:
+        with Session(database.engine) as db:
+            stock = db.execute(
+                select(models.StockData).where(models.StockData.stock_ticker == ticker)
+            ).scalars().first()
+        if stock:
+            return {
+                "ticker": ticker,
+                "source": "database",
+                "price": stock.current_price,
+                "sector": stock.sector,
+                "pe_ratio": stock.pe_ratio,
+                "pb_ratio": stock.pb_ratio,
+                "dividend_yield": stock.dividend_yield,
+                "eps": stock.eps,
+                "book_value": stock.book_value,
+                "market_cap": stock.market_cap,
+                "volume": stock.volume,
+                "last_updated": stock.last_updated.isoformat() if stock.last_updated else None,
+            }
+    except Exception as e:
+        logging.error(f"Database query failed: {e}")
+
+    # Fallback to Yahoo Finance; quote and fundamentals are separate requests, made concurrently
+    stock = yf.Ticker(ticker)
+    fundamentals = _yfinance_pool.submit(lambda: stock.info)
+    history = stock.history(period="1d", timeout=deadline.timeout_for(YFINANCE_TIMEOUT_SECONDS, "Yahoo Finance"))
+
+    if history.empty:
+        fundamentals.cancel()
+        return None
+
+    info = fundamentals.result(timeout=deadline.timeout_for(YFINANCE_TIMEOUT_SECONDS, "Yahoo Finance"))
+    return {
+        "ticker": ticker,
+        "source": "yahoo",
+        "price": round(float(history['Close'].iloc[-1]), 2),
+        "sector": info.get('sector'),
+        "pe_ratio": info.get('forwardPE'),
+        "pb_ratio": info.get('priceToBook'),
+        "dividend_yield": info.get('dividendYield'),
+        "market_cap": info.get('marketCap'),
+        "volume": info.get('volume'),
+        "last_updated": datetime.now().isoformat()
+    }
+
+def _format_stock_info(stock_info: Dict[str, Any]) -> str:
+    """Format stock information as an agent Observation."""
+    def value(key):
+        return "N/A" if stock_info.get(key) is None else stock_info[key]
+
+    price = stock_info.get("price")
+    result = f"""
+Stock Information for {stock_info['ticker']}:
+- Current Price: {f"₹{price:.2f}" if isinstance(price, (int, float)) else "N/A"}
+- Sector: {stock_info.get('sector') or 'Unknown'}
+- P/E Ratio: {value('pe_ratio')}
+- P/B Ratio: {value('pb_ratio')}
+- Dividend Yield: {value('dividend_yield')}
+- Market Cap: {value('market_cap')}
+- Volume: {value('volume')}
+- Last Updated: {value('last_updated')}
+    """
+
+    return result.strip()
+
+def _stock_info(prompt: str):
+    """(ticker, stock information or None) for the company in ``prompt``, through the tool cache."""
+    ticker = extract_company_ticker(prompt)
+    logging.info(f"Querying stock data for ticker: {ticker}")
+    # Shared across runs, users and agent modes, keyed by the resolved ticker
+    return ticker, tool_cache.get_or_compute("query_stock_data", ticker, lambda: _fetch_stock_info(ticker))
+
 @tool
 def query_stock_data(prompt: str) -> str:
     """
     Query stock data based on user prompt.
     Extracts company name and returns stock information.
     """
-    # Import here to avoid circular imports
-    
-    
+    if _out_of_time():
+        return DEADLINE_OBSERVATION
     try:
-        ticker = extract_company_ticker(prompt)
-        logging.info(f"Querying stock data for ticker: {ticker}")
-        
-        # Try to get data from database first
-        db = database.get_db()
-        if db:
-            try:
-                data = db.execute(
-                    select(models.StockData).where(models.StockData.stock_ticker == ticker)
-                ).fetchall()
-                
-                if data:
-                    return f"Stock data from database: {data[0]}"
-            except Exception as e:
-                logging.error(f"Database query failed: {e}")
-        
-        # Fallback to Yahoo Finance
         try:
-            stock = yf.Ticker(ticker)
-            history = stock.history(period="1d")
-            
-            if history.empty:
-                return f"No stock data found for ticker '{ticker}'"
-            
-            info = stock.info
-            current_price = history['Close'].iloc[-1]
-            
-            stock_info = {
-                "ticker": ticker,
-                "current_price": f"₹{current_price:.2f}",
-                "sector": info.get('sector', 'Unknown'),
-                "pe_ratio": info.get('forwardPE', 'N/A'),
-                "pb_ratio": info.get('priceToBook', 'N/A'),
-                "dividend_yield": info.get('dividendYield', 'N/A'),
-                "market_cap": info.get('marketCap', 'N/A'),
-                "volume": info.get('volume', 'N/A'),
-                "last_updated": datetime.now().isoformat()
-            }
-            
-            result = f"""
-Stock Information for {ticker}:
-- Current Price: {stock_info['current_price']}
-- Sector: {stock_info['sector']}
-- P/E Ratio: {stock_info['pe_ratio']}
-- P/B Ratio: {stock_info['pb_ratio']}
-- Dividend Yield: {stock_info['dividend_yield']}
-- Market Cap: {stock_info['market_cap']}
-- Volume: {stock_info['volume']}
-- Last Updated: {stock_info['last_updated']}
-            """
-            
-            return result.strip()
-            
+            ticker, stock_info = _stock_info(prompt)
         except Exception as e:
             logging.error(f"Error fetching stock data from Yahoo Finance: {e}")
-            return f"Failed to fetch stock data for {ticker}: {str(e)}"
+            return f"Failed to fetch stock data: {str(e)}"
+
+        if stock_info is None:
+            return f"No stock data found for ticker '{ticker}'"
+        return _format_stock_info(stock_info)
             
     except Exception as e:
         logging.error(f"Error in query_stock_data: {e}")
         return f"Failed to process stock data query: {str(e)}"
 
+def _news_available(news_sentiment) -> bool:
+    """Empty and error results mean "no news right now" and must not be cached."""
+    return bool(news_sentiment) and not news_sentiment[0].get('error')
+
+def _news_sentiment(prompt: str):
+    ticker = extract_company_ticker(prompt)
+    return tool_cache.get_or_compute(
+        "get_company_news", ticker, lambda: _load_news_sentiment(ticker), cacheable=_news_available
+    )
+
+def _load_news_sentiment(ticker: str):
+    """Read news sentiment from the NewsArticle store, scraping live only if never crawled."""
+    try:
+        with Session(database.engine) as db:
+            stored = news_ingestion.get_stored_news(db, ticker)
+        if stored is not None:
+            return stored
+    except Exception as e:
+        logging.error(f"News store lookup failed: {e}")
+
+    logging.info(f"{ticker} not in news store, scraping live news")
+    return get_sentiment_for_ticker(news_ingestion.normalize_ticker(ticker))
+
+def _format_news_sentiment(news_sentiment) -> str:
+    """Format news sentiment results as an agent Observation."""
+    if not news_sentiment:
+        return "No news articles found for the specified company."
+    
+    if isinstance(news_sentiment, list) and len(news_sentiment) > 0:
+        if news_sentiment[0].get('error'):
+            return f"Error: {news_sentiment[0]['error']}"
+    
+    # Format the results for better readability
+    result = "News Sentiment Analysis:\n\n"
+    
+    positive_count = 0
+    negative_count = 0
+    
+    for i, item in enumerate(news_sentiment[:5], 1):  # Limit to top 5 articles
+        if 'sentiment' in item:
+            sentiment = item['sentiment']
+            title = item.get('title', 'No title')[:100] + "..."
+            
+            result += f"{i}. {title}\n"
+            result += f"   Sentiment: {sentiment['label']} (confidence: {sentiment['score']})\n\n"
+            
+            if sentiment['label'] == 'POSITIVE':
+                positive_count += 1
+            else:
+                negative_count += 1
+    
+    result += f"Summary: {positive_count} positive, {negative_count} negative articles analyzed."
+    
+    return result
+
 @tool 
 def get_company_news(prompt: str) -> str:
     """
     Fetch news articles and sentiment analysis for a specific company.
     """
+    if _out_of_time():
+        return DEADLINE_OBSERVATION
     try:
         logging.info(f"Getting news and sentiment for prompt: {prompt}")
-        news_sentiment = get_sentiment(prompt)
-        
-        if not news_sentiment:
-            return "No news articles found for the specified company."
-        
-        if isinstance(news_sentiment, list) and len(news_sentiment) > 0:
-            if news_sentiment[0].get('error'):
-                return f"Error: {news_sentiment[0]['error']}"
-        
-        # Format the results for better readability
-        result = "News Sentiment Analysis:\n\n"
-        
-        positive_count = 0
-        negative_count = 0
-        
-        for i, item in enumerate(news_sentiment[:5], 1):  # Limit to top 5 articles
-            if 'sentiment' in item:
-                sentiment = item['sentiment']
-                title = item.get('title', 'No title')[:100] + "..."
-                
-                result += f"{i}. {title}\n"
-                result += f"   Sentiment: {sentiment['label']} (confidence: {sentiment['score']})\n\n"
-                
-                if sentiment['label'] == 'POSITIVE':
-                    positive_count += 1
-                else:
-                    negative_count += 1
-        
-        result += f"Summary: {positive_count} positive, {negative_count} negative articles analyzed."
-        
-        return result
+        return _format_news_sentiment(_news_sentiment(prompt))
         
     except Exception as e:
         logging.error(f"Error in get_company_news: {e}")
         return f"Failed to fetch company news: {str(e)}"
 
+COMPARE_MAX_COMPANIES = int(os.getenv("COMPARE_MAX_COMPANIES", 6))
+_COMPANY_SEPARATOR_RE = re.compile(r",|;|\band\b|\bvs\.?|\bversus\b", re.IGNORECASE)
+
+def _resolve_companies(text: str) -> List[str]:
+    """All tickers named in ``text`` in one local pass (no LLM), in order of mention."""
+    tickers = ticker_resolver.matcher.tickers(text)
+    for part in _COMPANY_SEPARATOR_RE.split(text):
+        if part.strip() and not ticker_resolver.matcher.first(part):
+            resolution = ticker_resolver.resolve(part, allow_llm=False)
+            if resolution.ticker and resolution.ticker not in tickers:
+                tickers.append(resolution.ticker)
+    return tickers[:COMPARE_MAX_COMPANIES]
+
+def _fetch_comparison_rows(symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Stock rows for ``symbols`` from one database query, with one batched Yahoo download for the rest."""
+    rows = {}
+    try:
+        with Session(database.engine) as db:
+            stocks = db.execute(
+                select(models.StockData).where(models.StockData.stock_ticker.in_(symbols))
+            ).scalars().all()
+        for stock in stocks:
+            rows[stock.stock_ticker] = {
+                "price": stock.current_price,
+                "pe_ratio": stock.pe_ratio,
+                "pb_ratio": stock.pb_ratio,
+                "dividend_yield": stock.dividend_yield,
+                "market_cap": stock.market_cap,
+                "sector": stock.sector,
+            }
+    except Exception as e:
+        logging.error(f"Database query failed: {e}")
+
+    missing = [symbol for symbol in symbols if symbol not in rows]
+    if not missing:
+        return rows
+
+    # Fundamentals are per-ticker requests; run them while the batched price download is in flight
+    infos = {symbol: _yfinance_pool.submit(lambda s=symbol: yf.Ticker(s).info) for symbol in missing}
+    prices = yf.download(
+        missing, period="5d", group_by="ticker", progress=False, threads=True,
+        timeout=deadline.timeout_for(YFINANCE_TIMEOUT_SECONDS, "Yahoo Finance")
+    )
+    for symbol in missing:
+        try:
+            closes = prices[symbol]["Close"] if prices.columns.nlevels > 1 else prices["Close"]
+            closes = closes.dropna()
+            if closes.empty:
+                continue
+            info = infos[symbol].result(timeout=deadline.timeout_for(YFINANCE_TIMEOUT_SECONDS, "Yahoo Finance"))
+        except Exception as e:
+            logging.error(f"Comparison data for {symbol} failed: {e}")
+            continue
+        rows[symbol] = {
+            "price": float(closes.iloc[-1]),
+            "pe_ratio": info.get("forwardPE"),
+            "pb_ratio": info.get("priceToBook"),
+            "dividend_yield": info.get("dividendYield"),
+            "market_cap": info.get("marketCap"),
+            "sector": info.get("sector"),
+        }
+    return rows
+
+def _format_comparison(tickers: List[str], rows: Dict[str, Dict[str, Any]]) -> str:
+    def number(value, fmt="{:.2f}"):
+        return fmt.format(value) if isinstance(value, (int, float)) else "N/A"
+
+    lines = [
+        "Company Comparison:",
+        "| Company | Ticker | Price | P/E | P/B | Div Yield | Market Cap (Cr) | Sector |",
+        "|---|---|---|---|---|---|---|---|",
+    ]
+    for ticker in tickers:
+        symbol = f"{ticker}.NS"
+        row = rows.get(symbol)
+        if row is None:
+            lines.append(f"| {company_names.get(ticker, ticker)} | {symbol} | no data | | | | | |")
+            continue
+        market_cap = row["market_cap"] / 1e7 if isinstance(row["market_cap"], (int, float)) else None
+        lines.append(
+            f"| {company_names.get(ticker, ticker)} | {symbol} | ₹{number(row['price'])} | {number(row['pe_ratio'])} "
+            f"| {number(row['pb_ratio'])} | {number(row['dividend_yield'])} | {number(market_cap, '{:,.0f}')} "
+            f"| {row['sector'] or 'Unknown'} |"
+        )
+    return "\n".join(lines)
+
+def _comparison_rows(tickers: List[str]) -> Dict[str, Dict[str, Any]]:
+    symbols = [f"{ticker}.NS" for ticker in tickers]
+    return tool_cache.get_or_compute(
+        "compare_companies",
+        tuple(sorted(tickers)),
+        lambda: _fetch_comparison_rows(symbols),
+        # A database or Yahoo outage leaves rows missing; don't keep that for the whole TTL
+        cacheable=lambda rows: all(symbol in rows for symbol in symbols)
+    )
+
+@tool
+def compare_companies(companies: str) -> str:
+    """
+    Compare several companies side by side (price, P/E, P/B, dividend yield,
+    market cap, sector). Input: the company names or tickers, comma separated.
+    Use this instead of calling query_stock_data once per company.
+    """
+    if _out_of_time():
+        return DEADLINE_OBSERVATION
+    try:
+        tickers = _resolve_companies(companies)
+        if len(tickers) < 2:
+            return "Please name at least two supported companies to compare."
+        logging.info(f"Comparing companies: {tickers}")
+        return _format_comparison(tickers, _comparison_rows(tickers))
+    except Exception as e:
+        logging.error(f"Error in compare_companies: {e}")
+        return f"Failed to compare companies: {str(e)}"
+
 @tool
 def get_company_list() -> str:
     """Return list of available companies."""
@@ -296,21 +497,107 @@ def is_valid_ticker(ticker: str) -> str:
 tools = [
     query_stock_data,
     get_company_news,
+    compare_companies,
     get_company_list,
     get_ticker_by_company,
     is_valid_ticker
 ]
 
-# Create prompt template
-prompt_template = PromptTemplate(
-    input_variables=["input", "tools", "tool_names", "agent_scratchpad"],
-    template="""You are FinGuru, an intelligent financial assistant that helps users manage their investments through natural conversation.
+# Tool-calling mode: the same tools under the same names, taking structured
+# arguments and returning compact JSON instead of prose for the model to read
+def _compact(value) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+def _json_tool_error(tool_name: str, e: Exception) -> str:
+    logging.error(f"Error in {tool_name}: {e}")
+    return _compact({"error": str(e)})
+
+@tool("query_stock_data")
+def query_stock_data_json(company: str) -> str:
+    """Latest price, valuation ratios, market cap and sector for one company (name or ticker)."""
+    if _out_of_time():
+        return _compact({"error": DEADLINE_OBSERVATION})
+    try:
+        ticker, stock_info = _stock_info(company)
+        if stock_info is None:
+            return _compact({"ticker": ticker, "error": "no stock data"})
+        return _compact({key: value for key, value in stock_info.items() if value is not None})
+    except Exception as e:
+        return _json_tool_error("query_stock_data", e)
+
+@tool("get_company_news")
+def get_company_news_json(company: str) -> str:
+    """Recent news headlines with sentiment for one company (name or ticker)."""
+    if _out_of_time():
+        return _compact({"error": DEADLINE_OBSERVATION})
+    try:
+        news_sentiment = _news_sentiment(company)
+        if not _news_available(news_sentiment):
+            return _compact({"error": news_sentiment[0]['error'] if news_sentiment else "no news articles"})
+        articles = [
+            {"title": item.get('title', '')[:100], "label": item['sentiment']['label'], "score": item['sentiment']['score']}
+            for item in news_sentiment[:5] if 'sentiment' in item
+        ]
+        positive = sum(article["label"] == 'POSITIVE' for article in articles)
+        return _compact({"articles": articles, "positive": positive, "negative": len(articles) - positive})
+    except Exception as e:
+        return _json_tool_error("get_company_news", e)
+
+@tool("compare_companies")
+def compare_companies_json(companies: str) -> str:
+    """
+    Price, P/E, P/B, dividend yield, market cap and sector for several
+    companies at once. Input: the company names or tickers, comma separated.
+    """
+    if _out_of_time():
+        return _compact({"error": DEADLINE_OBSERVATION})
+    try:
+        tickers = _resolve_companies(companies)
+        if len(tickers) < 2:
+            return _compact({"error": "name at least two supported companies"})
+        rows = _comparison_rows(tickers)
+        return _compact({f"{ticker}.NS": rows.get(f"{ticker}.NS") for ticker in tickers})
+    except Exception as e:
+        return _json_tool_error("compare_companies", e)
+
+@tool("get_company_list")
+def get_company_list_json() -> str:
+    """Names of the companies available for analysis."""
+    return _compact(list(company_ticker_map.keys()))
+
+@tool("get_ticker_by_company")
+def get_ticker_by_company_json(company_name: str) -> str:
+    """Ticker symbol for an exact company name."""
+    ticker = company_ticker_map.get(company_name)
+    return _compact({"ticker": f"{ticker}.NS"} if ticker else {"error": "company not found"})
+
+@tool("is_valid_ticker")
+def is_valid_ticker_json(ticker: str) -> str:
+    """Whether a ticker is supported."""
+    return _compact({"ticker": ticker, "valid": ticker.replace('.NS', '') in company_ticker_map.values()})
+
+json_tools = [
+    query_stock_data_json,
+    get_company_news_json,
+    compare_companies_json,
+    get_company_list_json,
+    get_ticker_by_company_json,
+    is_valid_ticker_json
+]
+
+AGENT_INTRO = """You are FinGuru, an intelligent financial assistant that helps users manage their investments through natural conversation.
 
 Your capabilities include:
 - Fetching the latest news articles for a specific company and analyzing sentiment
 - Providing comprehensive stock market data for Indian companies
+- Comparing several companies side by side in a single step
 - Answering general questions about companies and stocks
-- Helping with investment decisions based on data analysis
+- Helping with investment decisions based on data analysis"""
+
+# Create prompt template
+prompt_template = PromptTemplate(
+    input_variables=["input", "tools", "tool_names", "agent_scratchpad"],
+    template=AGENT_INTRO + """
 
 You have access to these tools:
 {tools}
@@ -334,83 +621,157 @@ Question: {input}
 Thought: {agent_scratchpad}"""
 )
 
-# Create agent
-agent = create_react_agent(
-    llm=llm,
-    tools=tools,
-    prompt=prompt_template
+# Cache of final answers for repeated / paraphrased questions
+response_cache = ResponseCache(
+    default_ttl=float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", 3600)),
+    time_sensitive_ttl=float(os.getenv("RESPONSE_CACHE_TIME_SENSITIVE_TTL_SECONDS", 120)),
+    max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 1000)),
+    semantic=os.getenv("RESPONSE_CACHE_SEMANTIC", "false").lower() == "true"
 )
 
-# Create agent executor
-agent_executor = AgentExecutor(
-    agent=agent,
-    tools=tools,
-    verbose=True,
-    
-    handle_parsing_errors=True,
-    max_iterations=10
-)
+tool_calling_prompt = ChatPromptTemplate.from_messages([
+    ("system", AGENT_INTRO + """
 
-def financial_advice(user_id: uuid.UUID, query: str, db=None) -> Dict[str, Any]:
+Call the tools you need directly. When a step needs several tools (e.g. stock data and news, or
+several companies), request all of them in the same turn; they run in parallel. Tool results are
+compact JSON. Once you have enough data, answer the question in plain prose without calling more tools."""),
+    ("human", "{input}"),
+    MessagesPlaceholder("agent_scratchpad"),
+])
+
+# "react": text ReAct loop, one tool per LLM call. "tool_calling": native
+# function calling, several tools per LLM call, executed concurrently.
+AGENT_MODES = ("react", "tool_calling")
+AGENT_MODE = os.getenv("AGENT_MODE", "react").lower()
+if AGENT_MODE not in AGENT_MODES:
+    raise ValueError(f"AGENT_MODE must be one of {AGENT_MODES}, got {AGENT_MODE!r}")
+
+# Create agents
+agents = {
+    "react": (create_react_agent(llm=llm, tools=tools, prompt=prompt_template), tools),
+    "tool_calling": (create_tool_calling_agent(llm=llm, tools=json_tools, prompt=tool_calling_prompt), json_tools),
+}
+agent = agents["react"][0]
+
+def _build_executor(mode: str, max_execution_time: Optional[float] = None) -> AgentExecutor:
+    agent_for_mode, mode_tools = agents[mode]
+    return AgentExecutor(
+        agent=agent_for_mode,
+        tools=mode_tools,
+        # Step-by-step stdout tracing; structured per-step events come from AgentRunRecorder
+        verbose=os.getenv("AGENT_VERBOSE", "false").lower() == "true",
+        handle_parsing_errors=True,
+        max_iterations=10,
+        max_execution_time=max_execution_time
+    )
+
+# Create agent executors
+agent_executors = {mode: _build_executor(mode) for mode in AGENT_MODES}
+agent_executor = agent_executors["react"]
+
+# Tools run up front for the companies in a question, per mode
+PREFETCH_TOOLS = {
+    "react": (query_stock_data, get_company_news),
+    "tool_calling": (query_stock_data_json, get_company_news_json),
+}
+
+def _validate_query(query: str) -> None:
+    if not query:
+        raise HTTPException(status_code=400, detail="Query cannot be empty")
+
+    if len(query) > 1000:
+        raise HTTPException(status_code=400, detail="Query is too long. Please limit to 1000 characters.")
+
+def _fast_path_answer(query: str) -> Optional[Dict[str, str]]:
     """
-    Generate financial advice based on user profile and query.
+    Answer simple lookups (quote, news, company list, ticker checks) straight
+    from the tools. Returns {"intent", "answer"}, or None if the agent is needed.
     """
-    # Import here to avoid circular imports
-    from FinAdvisor.api import models, database
-    
-    try:
-        if not db:
-            db = database.get_db()
+    if not INTENT_ROUTER_ENABLED:
+        return None
+    intent = intent_router.classify(query)
+    if intent.name not in FAST_INTENTS:
+        return None
 
-        if not query:
-            raise HTTPException(status_code=400, detail="Query cannot be empty")
+    logging.info(f"Fast path: {intent.name} ({intent.source}, {intent.confidence:.2f}) for {intent.ticker or intent.symbol or '-'}")
+    try:
+        if intent.name == "company_list":
+            answer = get_company_list.invoke({})
+        elif intent.name == "valid_ticker":
+            answer = is_valid_ticker.invoke(intent.symbol.upper())
+        elif intent.name == "ticker_lookup":
+            answer = f"The ticker for {company_names[intent.ticker]} is {intent.ticker}.NS"
+        elif intent.name == "stock_quote":
+            answer = query_stock_data.invoke(intent.ticker)
+        else:
+            answer = get_company_news.invoke(intent.ticker)
+    except Exception as e:
+        logging.error(f"Fast path {intent.name} failed, falling back to the agent: {e}")
+        return None
+    return {"intent": intent.name, "answer": answer}
 
-        if len(query) > 1000:
-            raise HTTPException(status_code=400, detail="Query is too long. Please limit to 1000 characters.")
+def _build_agent_request(user_id: uuid.UUID, query: str, db, snapshot=None) -> Dict[str, Any]:
+    """
+    Assemble the agent input plus its response cache key. Shareable questions
+    are answered from the user's coarse age/portfolio buckets alone, without
+    history, so the cached answer fits everyone in the same buckets; others
+    get the full history and profile and bypass the cache. ``snapshot`` is
+    the API's cached user snapshot; without one the user is read from ``db``.
+    """
+    shareable = is_shareable(query)
+    if snapshot is not None:
+        if shareable:
+            return _shared_agent_request(query, snapshot.profile.age, snapshot.portfolio)
+        return _agent_request(query, snapshot.history, snapshot.prompt_fragment, None)
 
-        # Get user history
-        try:
-            history = db.execute(
-                select(models.Chat)
-                .where(models.Chat.user_id == user_id)
-                .order_by(desc(models.Chat.timestamp))
-                .limit(5)
-            ).fetchall()
-            
-            history_str = "\n".join([
-                f"User: {chat.human_message} AI: {chat.ai_message}" 
-                for chat in history
-            ]) if history else "No previous conversation history."
-            
-        except Exception as e:
-            logging.error(f"Error fetching chat history: {e}")
-            history_str = "Unable to fetch conversation history."
-        
-        # Get user profile
-        try:
-            user_info = db.execute(
-                select(models.Profile).where(models.Profile.id == user_id)
-            ).first()
-            
-            portfolio = db.execute(
-                select(models.Portfolio).where(models.Portfolio.user_id == user_id)
-            ).first()
-            
-        except Exception as e:
-            logging.error(f"Error fetching user data: {e}")
-            user_info = None
-            portfolio = None
+    # Get user profile
+    try:
+        user_info = db.execute(
+            select(models.Profile).where(models.Profile.id == user_id)
+        ).scalars().first()
         
-        if not user_info:
-            logging.warning(f"User {user_id} not found in database")
-            user_context = "New user - no profile information available."
-        else:
-            user_context = f"User information: {user_info}"
-            if portfolio:
-                user_context += f"\nPortfolio information: {portfolio}"
+        portfolio = db.execute(
+            select(models.Portfolio).where(models.Portfolio.user_id == user_id)
+        ).scalars().first()
         
-        # Construct enhanced query with context
-        enhanced_query = f"""
+    except Exception as e:
+        logging.error(f"Error fetching user data: {e}")
+        user_info = None
+        portfolio = None
+
+    if shareable:
+        return _shared_agent_request(query, user_info.age if user_info else None, portfolio)
+
+    # Rolling, token-bounded conversation context
+    try:
+        history_str = chat_context.load_history_context(db, user_id)
+    except Exception as e:
+        logging.error(f"Error fetching chat history: {e}")
+        history_str = "Unable to fetch conversation history."
+    
+    if not user_info:
+        logging.warning(f"User {user_id} not found in database")
+        user_context = "New user - no profile information available."
+    else:
+        user_context = f"User information: {user_info}"
+        if portfolio:
+            user_context += f"\nPortfolio information: {portfolio}"
+    
+    return _agent_request(query, history_str, user_context, None)
+
+def _shared_agent_request(query: str, age: Optional[int], portfolio) -> Dict[str, Any]:
+    """Agent request built only from the coarse buckets its cache key covers."""
+    age_band, portfolio_bucket = context_buckets(age, portfolio)
+    return _agent_request(
+        query,
+        "Not used for this general question.",
+        f"User profile (approximate): age {age_band}; portfolio {portfolio_bucket}.",
+        context_fingerprint(age, portfolio)
+    )
+
+def _agent_request(query: str, history_str: str, user_context: str, cache_context: Optional[str]) -> Dict[str, Any]:
+    # Construct enhanced query with context
+    enhanced_query = f"""
 Context: {history_str}
 
 {user_context}
@@ -418,18 +779,190 @@ Context: {history_str}
 This is a financial advisory session. Please provide comprehensive analysis and advice based on the user's question and available data.
 
 User Question: {query}
-        """
+    """
+
+    return {
+        "input": enhanced_query,
+        "cache_context": cache_context,
+        "tickers": ticker_resolver.matcher.tickers(query)
+    }
+
+def _prefetch_tool_data(tickers: List[str], mode: str = AGENT_MODE) -> List[Dict[str, str]]:
+    """
+    Fetch stock data and news sentiment for ``tickers`` concurrently through
+    the tool cache, so the agent's own calls for them are cache hits.
+    Returns the observations, in ``mode``'s tool output format, that arrived
+    within PREFETCH_TIMEOUT_SECONDS.
+    """
+    if not PREFETCH_ENABLED or not tickers or _out_of_time():
+        return []
+    # Leave at least half of what is left of the request deadline to the agent itself
+    timeout = PREFETCH_TIMEOUT_SECONDS
+    left = deadline.remaining()
+    if left is not None:
+        timeout = min(timeout, left / 2)
+
+    started = time.perf_counter()
+    futures = {}
+    for ticker in tickers[:PREFETCH_MAX_TICKERS]:
+        symbol = f"{ticker}.NS"
+        # Each task runs in a copy of this context so the tools see the request deadline
+        for tool_fn in PREFETCH_TOOLS[mode]:
+            future = _prefetch_pool.submit(contextvars.copy_context().run, tool_fn.invoke, symbol)
+            futures[future] = (tool_fn.name, symbol)
+    # Stragglers keep running and still land in the tool cache
+    done, _ = wait(futures, timeout=timeout)
+
+    observations = []
+    for future, (tool_name, symbol) in futures.items():
+        if future not in done or future.exception() is not None or DEADLINE_OBSERVATION in future.result():
+            continue
+        observations.append({"tool": tool_name, "tool_input": symbol, "observation": str(future.result())})
+    agent_metrics.observe("prefetch_ms", (time.perf_counter() - started) * 1000)
+    agent_metrics.increment("prefetch_observations", len(observations))
+    return observations
+
+def _with_prefetched(agent_input: str, observations: List[Dict[str, str]], mode: str = AGENT_MODE) -> str:
+    """Append prefetched tool results to the agent input as ready-made Observations."""
+    if not observations:
+        return agent_input
+    if mode == "tool_calling":
+        blocks = [f"{item['tool']}({item['tool_input']}): {item['observation']}" for item in observations]
+    else:
+        blocks = [
+            f"Action: {item['tool']}\nAction Input: {item['tool_input']}\nObservation: {item['observation']}"
+            for item in observations
+        ]
+    return (
+        f"{agent_input}\n"
+        "Data already fetched for the companies in this question (use it directly; "
+        "only call a tool for anything missing):\n\n" + "\n\n".join(blocks) + "\n"
+    )
+
+# What AgentExecutor answers when it hits max_iterations or max_execution_time
+AGENT_STOPPED_OUTPUT = "Agent stopped due to iteration limit or time limit."
+
+def _executor_for_request(mode: str = AGENT_MODE) -> AgentExecutor:
+    """The shared executor, or under a request deadline one whose time budget ends before it."""
+    left = deadline.remaining()
+    if left is None:
+        return agent_executors[mode]
+    return _build_executor(mode, max_execution_time=max(left - AGENT_DEADLINE_RESERVE_SECONDS, 0.1))
+
+def _partial_answer(steps) -> Optional[str]:
+    """Best-effort answer from the tool results gathered before the agent was stopped."""
+    findings = [
+        f"- {step.action.tool} ({step.action.tool_input}):\n{str(step.observation).strip()[:800]}"
+        for step in steps
+        if step.action.tool != PARSE_ERROR_TOOL and DEADLINE_OBSERVATION not in str(step.observation)
+    ]
+    if not findings:
+        return None
+    return (
+        "I could not finish the full analysis in time. Here is what I found so far:\n\n"
+        + "\n\n".join(findings)
+    )
+
+def _run_agent(agent_input: str, callbacks: list, on_chunk=None, mode: str = AGENT_MODE):
+    """
+    Run the agent within the request deadline. Returns (output, outcome),
+    outcome being "ok", "partial" (stopped early, answered from the steps so
+    far) or "empty". ``on_chunk`` sees every streamed executor chunk.
+    """
+    steps = []
+    output = None
+
+    def handle(chunk):
+        nonlocal output
+        if on_chunk:
+            on_chunk(chunk)
+        steps.extend(chunk.get("steps", []))
+        if "output" in chunk:
+            output = chunk["output"]
+
+    executor = _executor_for_request(mode)
+    config = {"callbacks": callbacks}
+    try:
+        if mode == "tool_calling":
+            # The async executor runs all tool calls of one turn concurrently (the
+            # sync one runs them in sequence). This is a worker thread with no event
+            # loop, and asyncio.run copies the context, so the deadline carries over.
+            async def consume():
+                async for chunk in executor.astream({"input": agent_input}, config=config):
+                    handle(chunk)
+            asyncio.run(consume())
+        else:
+            for chunk in executor.stream({"input": agent_input}, config=config):
+                handle(chunk)
+    except _TIMEOUT_ERRORS as e:
+        logging.warning(f"Agent ran out of time after {len(steps)} steps: {e}")
+        output = AGENT_STOPPED_OUTPUT
+        if not steps:
+            raise
+
+    if output == AGENT_STOPPED_OUTPUT:
+        output = _partial_answer(steps)
+        return output, "partial" if output else "empty"
+    return output, "ok" if output else "empty"
+
+def financial_advice(user_id: uuid.UUID, query: str, db=None, snapshot=None) -> Dict[str, Any]:
+    """
+    Generate financial advice based on user profile and query.
+    """
+    try:
+        _validate_query(query)
+
+        # Simple lookups are answered from the tools without the agent
+        fast_path = _fast_path_answer(query)
+        if fast_path is not None:
+            agent_metrics.increment("route_fast_path")
+            return {
+                "response": fast_path["answer"],
+                "user_id": str(user_id),
+                "query": query,
+                "intent": fast_path["intent"]
+            }
+
+        if not db:
+            db = database.get_db()
+
+        request = _build_agent_request(user_id, query, db, snapshot)
+
+        # Serve near-identical questions from the response cache
+        cached_response = response_cache.get(query, request["cache_context"], request["tickers"])
+        if cached_response is not None:
+            logging.info("Serving financial advice from response cache")
+            agent_metrics.increment("route_response_cache")
+            return {
+                "response": cached_response,
+                "user_id": str(user_id),
+                "query": query,
+                "cached": True
+            }
         
-        # Execute agent
-        response = agent_executor.invoke({"input": enhanced_query})
+        # Execute agent, with the mentioned companies' data already in hand
+        agent_metrics.increment("route_agent")
+        agent_input = _with_prefetched(request["input"], _prefetch_tool_data(request["tickers"]))
+        recorder = AgentRunRecorder(user_id, cache_status=tool_cache.take_status)
+        try:
+            output, outcome = _run_agent(agent_input, [recorder])
+        except Exception:
+            recorder.finish("error")
+            raise
+        recorder.finish(outcome)
         
-        if not response or 'output' not in response:
+        if not output:
             raise HTTPException(status_code=500, detail="Failed to get a response from the financial advisor.")
+
+        # Partial answers are not worth serving to the next asker
+        if outcome == "ok":
+            response_cache.put(query, request["cache_context"], output, request["tickers"])
         
         return {
-            "response": response['output'],
+            "response": output,
             "user_id": str(user_id),
-            "query": query
+            "query": query,
+            **({"partial": True} if outcome == "partial" else {})
         }
         
     except HTTPException as e:
@@ -438,6 +971,130 @@ User Question: {query}
         logging.error(f"Error generating financial advice: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to generate financial advice: {str(e)}")
 
+class _AgentCancelled(Exception):
+    """Raised inside a streamed agent run whose consumer has gone away."""
+
+class _FinalAnswerStreamHandler(BaseCallbackHandler):
+    """Forward LLM tokens that come after "Final Answer:" as they are generated."""
+
+    MARKER = "Final Answer:"
+
+    def __init__(self, emit):
+        self.emit = emit
+        self.streamed = False
+        self._buffer = ""
+        self._in_answer = False
+
+    def _reset(self):
+        self._buffer = ""
+        self._in_answer = False
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self._reset()
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self._reset()
+
+    def on_llm_new_token(self, token: str, **kwargs):
+        if self._in_answer:
+            self.streamed = True
+            self.emit({"event": "token", "text": token})
+            return
+        self._buffer += token
+        index = self._buffer.find(self.MARKER)
+        if index != -1:
+            self._in_answer = True
+            rest = self._buffer[index + len(self.MARKER):].lstrip()
+            if rest:
+                self.streamed = True
+                self.emit({"event": "token", "text": rest})
+
+def stream_financial_advice(user_id: uuid.UUID, query: str, db, snapshot=None) -> Iterator[Dict[str, Any]]:
+    """
+    Streaming variant of financial_advice. Yields event dicts:
+    "step" (tool chosen), "observation" (tool result), "token" (answer text
+    as it is generated) and finally "answer" with the full response.
+    Errors are yielded as an "error" event.
+    """
+    try:
+        _validate_query(query)
+        fast_path = _fast_path_answer(query)
+        if fast_path is not None:
+            agent_metrics.increment("route_fast_path")
+            yield {"event": "token", "text": fast_path["answer"]}
+            yield {"event": "answer", "text": fast_path["answer"], "intent": fast_path["intent"]}
+            return
+        request = _build_agent_request(user_id, query, db, snapshot)
+    except HTTPException as e:
+        yield {"event": "error", "message": str(e.detail)}
+        return
+
+    cached_response = response_cache.get(query, request["cache_context"], request["tickers"])
+    if cached_response is not None:
+        agent_metrics.increment("route_response_cache")
+        yield {"event": "token", "text": cached_response}
+        yield {"event": "answer", "text": cached_response, "cached": True}
+        return
+
+    events = queue.Queue()
+    done = object()
+    # Set when the consumer stops reading; the agent aborts at its next executor chunk
+    cancelled = threading.Event()
+    handler = _FinalAnswerStreamHandler(events.put)
+    recorder = AgentRunRecorder(user_id, cache_status=tool_cache.take_status)
+    agent_metrics.increment("route_agent")
+
+    def forward(chunk):
+        if cancelled.is_set():
+            raise _AgentCancelled()
+        for action in chunk.get("actions", []):
+            events.put({"event": "step", "tool": action.tool, "tool_input": str(action.tool_input)})
+        for step in chunk.get("steps", []):
+            events.put({
+                "event": "observation",
+                "tool": step.action.tool,
+                "observation": str(step.observation)[:500]
+            })
+
+    def run_agent():
+        outcome = "error"
+        try:
+            prefetched = _prefetch_tool_data(request["tickers"])
+            for item in prefetched:
+                events.put({"event": "observation", "tool": item["tool"], "observation": item["observation"][:500]})
+            output, outcome = _run_agent(
+                _with_prefetched(request["input"], prefetched), [handler, recorder], on_chunk=forward
+            )
+
+            if not output:
+                events.put({"event": "error", "message": "Failed to get a response from the financial advisor."})
+                return
+            if not handler.streamed:
+                events.put({"event": "token", "text": output})
+            if outcome == "ok":
+                response_cache.put(query, request["cache_context"], output, request["tickers"])
+            events.put({"event": "answer", "text": output, **({"partial": True} if outcome == "partial" else {})})
+        except _AgentCancelled:
+            outcome = "cancelled"
+        except Exception as e:
+            logging.error(f"Error streaming financial advice: {e}")
+            events.put({"event": "error", "message": f"Failed to generate financial advice: {str(e)}"})
+        finally:
+            recorder.finish(outcome)
+            events.put(done)
+
+    # Run in a copy of this context so the agent sees the request deadline
+    threading.Thread(target=contextvars.copy_context().run, args=(run_agent,), daemon=True).start()
+    try:
+        while True:
+            event = events.get()
+            if event is done:
+                return
+            yield event
+    finally:
+        # Also reached when the generator is closed early (client gone, branch timed out)
+        cancelled.set()
+
 # Test function
 def test_financial_advice():
     """Test function for the financial advice system."""
@@ -0,0 +1,203 @@
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from FinAdvisor.api.metrics import Histogram
+
+# Structured per-step / per-run events go to their own logger so they can be routed separately
+events_logger = logging.getLogger("finadvisor.agent.events")
+
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 20000, 40000, 60000)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+COUNT_BUCKETS = (0, 1, 2, 3, 4, 5, 6, 8, 10)
+
+# AgentExecutor reports an unparseable LLM output as this pseudo-tool when handle_parsing_errors is on
+PARSE_ERROR_TOOL = "_Exception"
+
+
+class AgentMetrics:
+    """Process-wide histograms and counters aggregated from every recorded agent run."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Histogram] = {}
+        self._counters = Counter()
+
+    def observe(self, name: str, value: float, buckets: Sequence[float] = LATENCY_BUCKETS_MS) -> None:
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram(buckets)
+            histogram.observe(value)
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += amount
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "histograms": {name: histogram.to_dict() for name, histogram in sorted(self._histograms.items())},
+            }
+
+
+agent_metrics = AgentMetrics()
+
+
+def emit_event(event: str, **fields) -> None:
+    events_logger.info(json.dumps({"event": event, **fields}, default=str))
+
+
+def _token_usage(response) -> Dict[str, int]:
+    """Prompt/completion token counts from an LLMResult, whichever way the provider reports them."""
+    usage = (response.llm_output or {}).get("token_usage") or (response.llm_output or {}).get("usage_metadata")
+    if not usage:
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None)
+                if usage:
+                    break
+            if usage:
+                break
+    usage = usage or {}
+    return {
+        "prompt_tokens": int(usage.get("prompt_tokens") or usage.get("input_tokens") or 0),
+        "completion_tokens": int(usage.get("completion_tokens") or usage.get("output_tokens") or 0),
+    }
+
+
+class AgentRunRecorder(BaseCallbackHandler):
+    """
+    Callback handler that instruments one agent run.
+
+    Records ReAct iterations, each LLM step's latency and token counts, each
+    tool call's latency and cache status, and parse-error retries. Every step
+    is logged as a structured event; ``finish`` logs the run summary and
+    feeds the aggregate histograms in ``metrics``.
+    """
+
+    def __init__(
+        self,
+        user_id=None,
+        metrics: AgentMetrics = agent_metrics,
+        cache_status: Optional[Callable[[], Optional[str]]] = None,
+    ):
+        self.request_id = uuid.uuid4().hex[:12]
+        self.user_id = str(user_id) if user_id is not None else None
+        self.metrics = metrics
+        self.cache_status = cache_status
+        self.started_at = time.perf_counter()
+        self.iterations = 0
+        self.parse_errors = 0
+        self.llm_steps: List[Dict[str, Any]] = []
+        self.tool_calls: List[Dict[str, Any]] = []
+        self._llm_starts: Dict[uuid.UUID, float] = {}
+        self._tool_starts: Dict[uuid.UUID, tuple] = {}
+        self._lock = threading.Lock()
+        self._finished = False
+
+    # LLM steps
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._llm_starts[run_id] = time.perf_counter()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._llm_starts[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        started = self._llm_starts.pop(run_id, None)
+        latency_ms = (time.perf_counter() - started) * 1000 if started else 0.0
+        step = {"step": len(self.llm_steps) + 1, "latency_ms": round(latency_ms, 1), **_token_usage(response)}
+        with self._lock:
+            self.llm_steps.append(step)
+        emit_event("llm_step", request_id=self.request_id, **step)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._llm_starts.pop(run_id, None)
+        emit_event("llm_error", request_id=self.request_id, error=str(error))
+
+    # ReAct iterations
+    def on_agent_action(self, action, **kwargs):
+        with self._lock:
+            self.iterations += 1
+            if action.tool == PARSE_ERROR_TOOL:
+                self.parse_errors += 1
+        if action.tool == PARSE_ERROR_TOOL:
+            emit_event("parse_error", request_id=self.request_id, iteration=self.iterations)
+
+    # Tool calls
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        if self.cache_status:
+            self.cache_status()  # clear any status left over from an earlier call on this thread
+        name = (serialized or {}).get("name") or kwargs.get("name") or "unknown"
+        self._tool_starts[run_id] = (name, time.perf_counter())
+
+    def _finish_tool(self, run_id, error: Optional[str] = None):
+        name, started = self._tool_starts.pop(run_id, ("unknown", None))
+        if name == PARSE_ERROR_TOOL:
+            return
+        latency_ms = (time.perf_counter() - started) * 1000 if started else 0.0
+        call = {
+            "tool": name,
+            "latency_ms": round(latency_ms, 1),
+            "cache": (self.cache_status() if self.cache_status else None) or "none",
+        }
+        if error:
+            call["error"] = error
+        with self._lock:
+            self.tool_calls.append(call)
+        emit_event("tool_call", request_id=self.request_id, **call)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._finish_tool(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._finish_tool(run_id, error=str(error))
+
+    def summary(self, outcome: str = "ok") -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "request_id": self.request_id,
+                "user_id": self.user_id,
+                "outcome": outcome,
+                "total_ms": round((time.perf_counter() - self.started_at) * 1000, 1),
+                "iterations": self.iterations,
+                "parse_errors": self.parse_errors,
+                "llm_calls": len(self.llm_steps),
+                "llm_ms": round(sum(step["latency_ms"] for step in self.llm_steps), 1),
+                "prompt_tokens": sum(step["prompt_tokens"] for step in self.llm_steps),
+                "completion_tokens": sum(step["completion_tokens"] for step in self.llm_steps),
+                "tool_ms": round(sum(call["latency_ms"] for call in self.tool_calls), 1),
+                "tools": list(self.tool_calls),
+            }
+
+    def finish(self, outcome: str = "ok") -> Dict[str, Any]:
+        """Log the run summary and add it to the aggregate metrics (once)."""
+        summary = self.summary(outcome)
+        if self._finished:
+            return summary
+        self._finished = True
+
+        emit_event("agent_run", **summary)
+        metrics = self.metrics
+        metrics.increment(f"runs_{outcome}")
+        metrics.increment("parse_errors", summary["parse_errors"])
+        metrics.observe("agent_run_ms", summary["total_ms"])
+        metrics.observe("agent_iterations", summary["iterations"], COUNT_BUCKETS)
+        metrics.observe("agent_prompt_tokens", summary["prompt_tokens"], TOKEN_BUCKETS)
+        metrics.observe("agent_completion_tokens", summary["completion_tokens"], TOKEN_BUCKETS)
+        for step in self.llm_steps:
+            metrics.observe("llm_step_ms", step["latency_ms"])
+            metrics.observe("llm_step_prompt_tokens", step["prompt_tokens"], TOKEN_BUCKETS)
+            metrics.observe("llm_step_completion_tokens", step["completion_tokens"], TOKEN_BUCKETS)
+        for call in self.tool_calls:
+            metrics.observe(f"tool_ms.{call['tool']}", call["latency_ms"])
+            metrics.increment(f"tool_cache_{call['cache']}.{call['tool']}")
+        return summary
@@ -0,0 +1,195 @@
+import re
+from typing import Dict, List, NamedTuple, Optional
+
+from .embeddings import cosine, embed
+from .ticker_matcher import TickerMatcher
+
+# Intents that can be answered straight from a tool; anything else is "advice"
+FAST_INTENTS = ("stock_quote", "company_news", "company_list", "valid_ticker", "ticker_lookup")
+# Intents that only make sense about exactly one company
+_TICKER_INTENTS = ("stock_quote", "company_news", "ticker_lookup")
+
+# Placeholder substituted for company mentions before embedding
+_COMPANY_TOKEN = "companyx"
+
+# Anything opinionated, personal or comparative needs the agent
+_ADVICE_RE = re.compile(
+    r"\b(should|buy|sell|invest\w*|hold|recommend\w*|suggest\w*|portfolio|compare|vs|versus|better|"
+    r"worth|risk\w*|my|i|we|retire\w*|plan\w*|why|predict\w*|forecast\w*|future|outlook|"
+    r"analy[sz]\w*|strategy|diversif\w*|long term|short term|"
+    r"overvalued|undervalued|valuation|fair value|cheap|expensive)\b",
+    re.IGNORECASE
+)
+
+# A quote is the price now; questions about the past need the agent
+_NOT_NOW_RE = re.compile(
+    r"\b(was|were|did|had|happened|last|ago|yesterday|history|historical|since|past|previous|during|"
+    r"in\s+(?:19|20)\d\d)\b",
+    re.IGNORECASE
+)
+
+# Words the valid_ticker rules can capture that are never a symbol ("is it a valid ticker?")
+_NOT_SYMBOLS = frozenset(
+    {"it", "this", "that", "these", "those", "there", "he", "she", "they", "something", "anything", "mine", "yours", "one"}
+)
+
+_RULES = {
+    "valid_ticker": [
+        re.compile(r"\b(?:is|check(?:\s+if)?)\s+['\"]?(?P<symbol>[A-Za-z&.\-]{1,20})['\"]?\s+(?:a\s+)?valid\s+(?:ticker|symbol)\b", re.IGNORECASE),
+        re.compile(r"\bvalid(?:ate)?\s+(?:ticker|symbol)\s*[:?]?\s+['\"]?(?P<symbol>[A-Za-z&.\-]{1,20})['\"]?\s*\??\s*$", re.IGNORECASE),
+    ],
+    "company_list": [
+        re.compile(r"^\s*(?:please\s+)?(?:list|show)(?:\s+me)?(?:\s+all)?(?:\s+the)?(?:\s+(?:available|supported))?\s+(?:companies|stocks|tickers)\b", re.IGNORECASE),
+        re.compile(r"\b(?:which|what)\s+(?:companies|stocks|tickers)\s+(?:are|do\s+you|can\s+you)\s+(?:available|supported|cover|track|support|analy[sz]e)\b", re.IGNORECASE),
+    ],
+    "ticker_lookup": [
+        re.compile(r"\b(?:ticker|symbol)\s+(?:of|for)\b", re.IGNORECASE),
+        re.compile(r"\bwhat(?:'s|\s+is)\s+\S+(?:\s+\S+){0,3}?(?:'s)?\s+(?:ticker|symbol)\b", re.IGNORECASE),
+    ],
+    "company_news": [
+        re.compile(r"\b(?:news|headlines|sentiment)\b", re.IGNORECASE),
+    ],
+    "stock_quote": [
+        re.compile(r"\b(?:price|quote|trading\s+at|market\s+cap|p/?e(?:\s+ratio)?|dividend\s+yield|volume)\b", re.IGNORECASE),
+    ],
+}
+
+# Labelled utterances for the nearest-centroid model (company names masked)
+INTENT_EXAMPLES: Dict[str, List[str]] = {
+    "stock_quote": [
+        f"price of {_COMPANY_TOKEN}",
+        f"{_COMPANY_TOKEN} share price",
+        f"how much is {_COMPANY_TOKEN} stock",
+        f"current stock price {_COMPANY_TOKEN}",
+        f"{_COMPANY_TOKEN} quote",
+        f"what is {_COMPANY_TOKEN} trading at",
+        f"stock data for {_COMPANY_TOKEN}",
+        f"{_COMPANY_TOKEN} pe ratio and market cap",
+    ],
+    "company_news": [
+        f"latest news on {_COMPANY_TOKEN}",
+        f"{_COMPANY_TOKEN} news",
+        f"what is happening with {_COMPANY_TOKEN}",
+        f"recent headlines about {_COMPANY_TOKEN}",
+        f"news sentiment for {_COMPANY_TOKEN}",
+    ],
+    "company_list": [
+        "list available companies",
+        "which companies do you cover",
+        "show supported stocks",
+        "what stocks can you analyse",
+        "list all tickers",
+    ],
+    "ticker_lookup": [
+        f"ticker of {_COMPANY_TOKEN}",
+        f"what is the symbol for {_COMPANY_TOKEN}",
+        f"{_COMPANY_TOKEN} ticker symbol",
+        f"nse code of {_COMPANY_TOKEN}",
+    ],
+    "advice": [
+        f"should i buy {_COMPANY_TOKEN}",
+        "how should i diversify my portfolio",
+        f"is {_COMPANY_TOKEN} a good long term investment",
+        "how much should i save for retirement",
+        "what is the difference between stocks and bonds",
+        f"compare {_COMPANY_TOKEN} and {_COMPANY_TOKEN}",
+        "best investment strategy for beginners",
+        f"what is the outlook for {_COMPANY_TOKEN}",
+        "explain mutual funds",
+        "how do i analyse a stock",
+    ],
+}
+
+
+class Intent(NamedTuple):
+    name: str                 # one of FAST_INTENTS or "advice"
+    confidence: float
+    source: str               # "rule", "model" or "default"
+    ticker: Optional[str] = None
+    symbol: Optional[str] = None  # raw symbol to validate, for valid_ticker
+
+
+def _sparse_mean(vectors) -> Dict[int, float]:
+    total = {}
+    for vector in vectors:
+        for bucket, weight in vector.items():
+            total[bucket] = total.get(bucket, 0.0) + weight
+    norm = sum(weight * weight for weight in total.values()) ** 0.5
+    return {bucket: weight / norm for bucket, weight in total.items()} if norm else total
+
+
+class IntentRouter:
+    """
+    Cheap classifier in front of the ReAct agent.
+
+    High-precision rules are tried first; otherwise a nearest-centroid model
+    over the local hashed embeddings (company names masked) votes. Anything
+    opinionated or personal, ambiguous about which company is meant, asking
+    for a past price, or below ``threshold`` / ``margin`` is routed to
+    "advice", i.e. the agent. Company-specific intents need exactly one
+    resolved company.
+    """
+
+    def __init__(
+        self,
+        matcher: TickerMatcher,
+        examples: Dict[str, List[str]] = INTENT_EXAMPLES,
+        threshold: float = 0.45,
+        margin: float = 0.08,
+    ):
+        self.matcher = matcher
+        self.threshold = threshold
+        self.margin = margin
+        self._centroids = {
+            name: _sparse_mean(embed(text) for text in texts)
+            for name, texts in examples.items()
+        }
+
+    def _mask(self, query: str) -> str:
+        masked, last = [], 0
+        for match in self.matcher.find_all(query):
+            masked.append(query[last:match.start])
+            masked.append(_COMPANY_TOKEN)
+            last = match.end
+        masked.append(query[last:])
+        return "".join(masked)
+
+    def classify(self, query: str) -> Intent:
+        # Checked before the advice guard: "which companies are available for analysis?"
+        if any(pattern.search(query) for pattern in _RULES["company_list"]):
+            return Intent("company_list", 1.0, "rule")
+        if _ADVICE_RE.search(query):
+            return Intent("advice", 1.0, "rule")
+
+        for name, patterns in _RULES.items():
+            for pattern in patterns:
+                match = pattern.search(query)
+                if not match:
+                    continue
+                if name == "valid_ticker":
+                    if match.group("symbol").lower() in _NOT_SYMBOLS:
+                        continue
+                    return Intent(name, 1.0, "rule", symbol=match.group("symbol"))
+                return self._with_ticker(Intent(name, 1.0, "rule"), query)
+
+        vector = embed(self._mask(query))
+        scores = sorted(
+            ((cosine(vector, centroid), name) for name, centroid in self._centroids.items()),
+            reverse=True
+        )
+        (best_score, best), (runner_up, _) = scores[0], scores[1]
+        if best == "advice":
+            return Intent("advice", best_score, "model")
+        if best_score < self.threshold or best_score - runner_up < self.margin:
+            return Intent("advice", best_score, "default")
+        return self._with_ticker(Intent(best, best_score, "model"), query)
+
+    def _with_ticker(self, intent: Intent, query: str) -> Intent:
+        if intent.name not in _TICKER_INTENTS:
+            return intent
+        if intent.name == "stock_quote" and _NOT_NOW_RE.search(query):
+            return Intent("advice", intent.confidence, "default")
+        tickers = self.matcher.tickers(query)
+        if len(tickers) != 1:
+            return Intent("advice", intent.confidence, "default")
+        return intent._replace(ticker=tickers[0])
@@ -0,0 +1,183 @@
+import hashlib
+import math
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
+
+from .embeddings import cosine, embed
+
+# Answers that depend on market data or news go stale quickly
+TIME_SENSITIVE_RE = re.compile(
+    r"\b(price|prices|quote|today|now|current|currently|latest|news|trading|live|"
+    r"market cap|volume|yesterday|this week|sentiment)\b",
+    re.IGNORECASE
+)
+# Questions about the user's own situation depend on their exact profile and history
+PERSONAL_RE = re.compile(
+    r"\b(i|me|my|mine|myself|i'm|i've|am i|should i|can i|our|we)\b",
+    re.IGNORECASE
+)
+# Follow-ups lean on the conversation so far ("what about its dividend?")
+FOLLOW_UP_RE = re.compile(
+    r"\b(it|its|it's|they|them|their|this|that|these|those|same|also|above|previous|earlier|what about|how about)\b",
+    re.IGNORECASE
+)
+
+_PUNCT_RE = re.compile(r"[^\w\s&]")
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(_PUNCT_RE.sub(" ", query.lower()).split())
+
+
+def is_time_sensitive(query: str) -> bool:
+    return bool(TIME_SENSITIVE_RE.search(query))
+
+
+def is_personal(query: str) -> bool:
+    return bool(PERSONAL_RE.search(query))
+
+
+def is_shareable(query: str) -> bool:
+    """
+    Whether ``query`` can be answered without the asker's history or exact
+    profile, so the answer may be cached and served to other users.
+    """
+    return not is_personal(query) and not FOLLOW_UP_RE.search(query)
+
+
+def _amount_bucket(amount: float) -> str:
+    """Order-of-magnitude bucket (1e4, 1e5, ...) so similar portfolios share entries."""
+    if not amount or amount <= 0:
+        return "0"
+    return f"1e{int(math.log10(amount))}"
+
+
+def context_buckets(age: Optional[int] = None, portfolio=None) -> Tuple[str, str]:
+    """
+    The coarse user context a shared answer may depend on: age band and
+    portfolio bucket (total size and equity share in 20% steps).
+    """
+    age_band = f"{(age // 10) * 10}s" if age else "unknown"
+    if portfolio is None:
+        return age_band, "none"
+    amounts = [
+        portfolio.equity_amt, portfolio.cash_amt, portfolio.fd_amt, portfolio.debt_amt,
+        portfolio.real_estate_amt, portfolio.bonds_amt, portfolio.crypto_amt
+    ]
+    total = sum(amount or 0 for amount in amounts)
+    equity_share = min(int((portfolio.equity_amt or 0) / total * 5), 4) * 20 if total else 0
+    return age_band, f"total ~{_amount_bucket(total)} INR, {equity_share}-{equity_share + 20}% equity"
+
+
+def context_fingerprint(age: Optional[int] = None, portfolio=None) -> str:
+    """Hash of ``context_buckets``: users with the same buckets share cached answers."""
+    raw = "|".join(context_buckets(age, portfolio))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass
+class _Entry:
+    response: str
+    expires_at: float
+    time_sensitive: bool
+    entities: FrozenSet[str] = field(default_factory=frozenset)
+    embedding: Optional[Dict[int, float]] = field(default=None)
+
+
+class ResponseCache:
+    """
+    TTL cache of final advisor answers keyed by (normalized query, coarse
+    user context fingerprint), shared by every user in the same buckets.
+
+    Only answers generated from the coarse context alone belong here (see
+    ``is_shareable``); callers pass ``context_key=None`` for anything else,
+    which bypasses the cache. Time-sensitive questions get a short TTL. When
+    ``semantic`` is enabled, queries are also matched by nearest neighbour
+    over local query embeddings within the same buckets, so paraphrases hit
+    too. A semantic hit additionally requires the same ``entities`` (e.g.
+    the tickers mentioned), so "price of TCS" never answers "price of INFY".
+    """
+
+    def __init__(
+        self,
+        default_ttl: float = 3600,
+        time_sensitive_ttl: float = 120,
+        max_entries: int = 1000,
+        semantic: bool = False,
+        similarity_threshold: float = 0.9,
+    ):
+        self.default_ttl = default_ttl
+        self.time_sensitive_ttl = time_sensitive_ttl
+        self.max_entries = max_entries
+        self.semantic = semantic
+        self.similarity_threshold = similarity_threshold
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counts = Counter()
+
+    def _key(self, query: str, context_key: str):
+        return (normalize_query(query), context_key)
+
+    def get(self, query: str, context_key: Optional[str], entities: Iterable[str] = ()) -> Optional[str]:
+        if context_key is None:
+            with self._lock:
+                self._counts["bypass"] += 1
+            return None
+        key = self._key(query, context_key)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > now:
+                self._entries.move_to_end(key)
+                self._counts["exact_hit"] += 1
+                return entry.response
+
+            if self.semantic:
+                match = self._nearest(query, context_key, frozenset(entities), now)
+                if match is not None:
+                    self._counts["semantic_hit"] += 1
+                    return match.response
+
+            self._counts["miss"] += 1
+            return None
+
+    def _nearest(self, query: str, context_key: str, entities: FrozenSet[str], now: float) -> Optional[_Entry]:
+        query_embedding = embed(query)
+        time_sensitive = is_time_sensitive(query)
+        best, best_score = None, self.similarity_threshold
+        for (_, scope), entry in self._entries.items():
+            if scope != context_key or entry.expires_at <= now or entry.embedding is None:
+                continue
+            if entry.time_sensitive != time_sensitive or entry.entities != entities:
+                continue
+            score = cosine(query_embedding, entry.embedding)
+            if score >= best_score:
+                best, best_score = entry, score
+        return best
+
+    def put(self, query: str, context_key: Optional[str], response: str, entities: Iterable[str] = ()) -> None:
+        if context_key is None:
+            return
+        key = self._key(query, context_key)
+        time_sensitive = is_time_sensitive(query)
+        ttl = self.time_sensitive_ttl if time_sensitive else self.default_ttl
+        entry = _Entry(
+            response=response,
+            expires_at=time.monotonic() + ttl,
+            time_sensitive=time_sensitive,
+            entities=frozenset(entities),
+            embedding=embed(query) if self.semantic else None,
+        )
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"entries": len(self._entries), **self._counts}
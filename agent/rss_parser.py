@@ -0,0 +1,96 @@
+import html
+import re
+import xml.etree.ElementTree as ET
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional
+
+# Google News wraps descriptions in escaped HTML (<a>, <font>, &nbsp; ...)
+_TAG_RE = re.compile(r"<[^>]+>")
+_WS_RE = re.compile(r"\s+")
+
+ITEM_FIELDS = ("title", "description", "link", "pubDate")
+
+
+def strip_html(text: str) -> str:
+    """Remove HTML tags and entities and collapse whitespace."""
+    if not text:
+        return ""
+    text = _TAG_RE.sub(" ", text)
+    text = html.unescape(text).replace("\xa0", " ")
+    return _WS_RE.sub(" ", text).strip()
+
+
+def _local_name(tag: str) -> str:
+    """Drop the '{namespace}' prefix ElementTree puts on namespaced tags."""
+    return tag.rsplit("}", 1)[-1]
+
+
+def iter_rss_items(source: BinaryIO) -> Iterator[Dict[str, str]]:
+    """
+    Incrementally parse an RSS feed and yield one dict per <item>.
+
+    Items are cleared and detached from their parent (<channel>) as soon as
+    they have been yielded so memory stays flat regardless of feed size. Stop
+    consuming the iterator to stop parsing.
+    """
+    context = ET.iterparse(source, events=("start", "end"))
+    # Elements still open, so an <item>'s parent is known when it ends
+    open_elements: List[ET.Element] = []
+    for event, elem in context:
+        if event == "start":
+            open_elements.append(elem)
+            continue
+        open_elements.pop()
+        if _local_name(elem.tag) != "item":
+            continue
+
+        item = {field: "" for field in ITEM_FIELDS}
+        for child in elem:
+            name = _local_name(child.tag)
+            if name in item:
+                item[name] = (child.text or "").strip()
+        yield item
+
+        # Drop the parsed item; its parent would otherwise keep every one alive
+        elem.clear()
+        if open_elements:
+            open_elements[-1].remove(elem)
+
+def parse_relevant_articles(
+    source: BinaryIO,
+    keywords: Iterable[str],
+    max_articles: int = 10,
+    max_scanned: Optional[int] = None,
+) -> List[Dict[str, str]]:
+    """
+    Return up to ``max_articles`` feed items mentioning any of ``keywords``.
+
+    Descriptions are stripped of HTML in the same pass, and parsing stops as
+    soon as enough relevant items have been collected (or ``max_scanned``
+    items have been looked at).
+    """
+    keywords = [keyword.lower() for keyword in keywords if keyword]
+    articles = []
+    scanned = 0
+
+    for item in iter_rss_items(source):
+        scanned += 1
+        title = item["title"]
+        description = strip_html(item["description"])
+
+        full_text = (title + " " + description).lower()
+        is_relevant = any(keyword in full_text for keyword in keywords)
+
+        if is_relevant and title:  # Only include if relevant and has title
+            articles.append({
+                'title': title,
+                'description': description,
+                'link': item["link"],
+                'pub_date': item["pubDate"]
+            })
+            if len(articles) >= max_articles:
+                break
+
+        if max_scanned is not None and scanned >= max_scanned:
+            break
+
+    return articles
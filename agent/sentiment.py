@@ -1,12 +1,14 @@
 from transformers import AutoTokenizer, AutoModelForSequenceClassification, pipeline
 from fastapi import HTTPException
 import requests
-from bs4 import BeautifulSoup
 import logging
 import os
 import sys
 import re
 from pathlib import Path
+from FinAdvisor.api.deadline import timeout_for
+from FinAdvisor.agent.rss_parser import parse_relevant_articles
+from FinAdvisor.agent.ticker_matcher import TickerMatcher, COMPANY_ALIASES
 
 company_ticker_map = {
     "Reliance Industries": "RELIANCE",
@@ -44,6 +46,12 @@ company_ticker_map = {
 # Reverse mapping for ticker to company name
 ticker_company_map = {v: k for k, v in company_ticker_map.items()}
 
+# Single-pass matcher over company names, tickers and aliases
+ticker_matcher = TickerMatcher(company_ticker_map, COMPANY_ALIASES)
+
+# Upper bound on feed items inspected while looking for relevant articles
+MAX_SCANNED_FEED_ITEMS = 100
+
 # Use a pre-trained sentiment model from Hugging Face
 MODEL_NAME = "distilbert-base-uncased-finetuned-sst-2-english"
 
@@ -87,27 +95,22 @@ def extract_keyword_context(text, keyword, context_size=50):
 def extract_company_ticker(prompt: str):
     """
     Extract company ticker from prompt.
-    This is a simplified version - you may need to implement more sophisticated NLP.
+    Returns the first company mentioned (by name, ticker or alias).
     """
-    prompt_lower = prompt.lower()
-    
-    # Check for exact company name matches
-    for company, ticker in company_ticker_map.items():
-        if company.lower() in prompt_lower:
-            return ticker
-    
-    # Check for ticker matches
-    for ticker in company_ticker_map.values():
-        if ticker.lower() in prompt_lower:
-            return ticker
+    ticker = ticker_matcher.first(prompt)
+    if ticker:
+        return ticker
     
     # Default fallback - you might want to handle this differently
     return "RELIANCE"
 
-def scraping_google_news(ticker: str):
+def scraping_google_news(ticker: str, max_articles: int = 10):
     """
     Scrape Google News RSS for company-related news.
     Returns a list of news articles with title and description.
+
+    The feed is parsed incrementally and the download is abandoned as soon
+    as ``max_articles`` relevant items have been found.
     """
     try:
         # Get company name for better search results
@@ -121,37 +124,21 @@ def scraping_google_news(ticker: str):
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
         
-        response = requests.get(url, headers=headers, timeout=10)
-        
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.content, 'xml')
-            items = soup.find_all('item')
-            
-            articles = []
+        # Clamped to the request deadline when called from a chat
+        with requests.get(url, headers=headers, timeout=timeout_for(10, "news feed"), stream=True) as response:
+            if response.status_code != 200:
+                logging.error(f"Failed to fetch news. Status code: {response.status_code}")
+                return []
+
+            # Let urllib3 undo gzip/deflate so the parser sees plain XML
+            response.raw.decode_content = True
             keywords = [ticker, company_name]
-            
-            for item in items[:10]:  # Limit to first 10 articles
-                title = item.title.get_text() if item.title else ""
-                description = item.description.get_text() if item.description else ""
-                link = item.link.get_text() if item.link else ""
-                pub_date = item.pubDate.get_text() if item.pubDate else ""
-                
-                # Check if article is relevant to our company
-                full_text = (title + " " + description).lower()
-                is_relevant = any(keyword.lower() in full_text for keyword in keywords)
-                
-                if is_relevant and title:  # Only include if relevant and has title
-                    articles.append({
-                        'title': title,
-                        'description': description,
-                        'link': link,
-                        'pub_date': pub_date
-                    })
-            
-            return articles
-        else:
-            logging.error(f"Failed to fetch news. Status code: {response.status_code}")
-            return []
+            return parse_relevant_articles(
+                response.raw,
+                keywords,
+                max_articles=max_articles,
+                max_scanned=MAX_SCANNED_FEED_ITEMS
+            )
             
     except requests.RequestException as e:
         logging.error(f"Request error: {e}")
@@ -160,16 +147,41 @@ def scraping_google_news(ticker: str):
         logging.error(f"Error scraping news: {e}")
         return []
 
-def get_sentiment(prompt: str):
+def score_articles(articles):
     """
-    Get sentiment analysis for a specific company based on user prompt.
+    Run sentiment analysis over scraped articles.
+    Articles that fail to score are skipped.
+    """
+    sentiments = []
+    for article in articles:
+        try:
+            # Analyze sentiment of title (and description if available)
+            text_to_analyze = article['title']
+            if article.get('description'):
+                text_to_analyze += " " + article['description']
+            
+            sentiment = analyze_sentiment(text_to_analyze)
+            
+            sentiments.append({
+                'title': article['title'],
+                'description': article.get('description', ''),
+                'sentiment': sentiment,
+                'link': article.get('link', ''),
+                'pub_date': article.get('pub_date', '')
+            })
+            
+        except Exception as e:
+            logging.error(f"Error analyzing sentiment for article: {e}")
+            continue
+    
+    return sentiments
+
+def get_sentiment_for_ticker(ticker: str):
+    """
+    Scrape live news for a ticker and analyze its sentiment.
     Returns a list of sentiment analysis results for news articles.
     """
     try:
-        # Extract ticker from prompt
-        ticker = extract_company_ticker(prompt)
-        logging.info(f"Extracted ticker: {ticker}")
-        
         # Get news articles
         company_news = scraping_google_news(ticker)
         
@@ -180,29 +192,23 @@ def get_sentiment(prompt: str):
                 "ticker": ticker
             }]
         
-        # Analyze sentiment for each article
-        sentiments = []
-        for article in company_news:
-            try:
-                # Analyze sentiment of title (and description if available)
-                text_to_analyze = article['title']
-                if article.get('description'):
-                    text_to_analyze += " " + article['description']
-                
-                sentiment = analyze_sentiment(text_to_analyze)
-                
-                sentiments.append({
-                    'title': article['title'],
-                    'sentiment': sentiment,
-                    'link': article.get('link', ''),
-                    'pub_date': article.get('pub_date', '')
-                })
-                
-            except Exception as e:
-                logging.error(f"Error analyzing sentiment for article: {e}")
-                continue
+        return score_articles(company_news)
+        
+    except Exception as e:
+        logging.error(f"Error in get_sentiment_for_ticker: {e}")
+        return [{"error": f"Failed to analyze sentiment: {str(e)}"}]
+
+def get_sentiment(prompt: str):
+    """
+    Get sentiment analysis for a specific company based on user prompt.
+    Returns a list of sentiment analysis results for news articles.
+    """
+    try:
+        # Extract ticker from prompt
+        ticker = extract_company_ticker(prompt)
+        logging.info(f"Extracted ticker: {ticker}")
         
-        return sentiments
+        return get_sentiment_for_ticker(ticker)
         
     except Exception as e:
         logging.error(f"Error in get_sentiment: {e}")
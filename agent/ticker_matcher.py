@@ -0,0 +1,130 @@
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+# Common ways users refer to companies besides the official name and ticker
+COMPANY_ALIASES = {
+    "RELIANCE": ["Reliance", "RIL"],
+    "TCS": ["Tata Consultancy", "TCS"],
+    "HDFCBANK": ["HDFC Bank Ltd"],
+    "ICICIBANK": ["ICICI"],
+    "INFY": ["Infosys Ltd"],
+    "HINDUNILVR": ["HUL", "Hindustan Unilever Ltd"],
+    "KOTAKBANK": ["Kotak", "Kotak Bank", "Kotak Mahindra"],
+    "SBIN": ["SBI", "State Bank"],
+    "LT": ["L&T", "Larsen", "Larsen and Toubro"],
+    "BAJFINANCE": ["Bajaj Fin"],
+    "HDFC": ["HDFC Ltd"],
+    "MARUTI": ["Maruti", "Maruti Suzuki India"],
+    "SUNPHARMA": ["Sun Pharma"],
+    "NESTLEIND": ["Nestle"],
+    "BHARTIARTL": ["Airtel", "Bharti"],
+    "ULTRACEMCO": ["UltraTech"],
+    "POWERGRID": ["Power Grid"],
+    "ONGC": ["Oil and Natural Gas"],
+    "EICHERMOT": ["Eicher", "Royal Enfield"],
+    "DRREDDY": ["Dr Reddy", "Dr Reddys", "Dr. Reddy", "Dr Reddy's"],
+    "DIVISLAB": ["Divis", "Divi's", "Divis Lab", "Divis Laboratories"],
+    "M&M": ["Mahindra and Mahindra", "M and M"],
+    "TECHM": ["TechM"],
+    "COALINDIA": ["Coal India Ltd"],
+    "JSWSTEEL": ["JSW"],
+}
+
+# A match may not be glued to letters or digits on either side, so "LT" does
+# not fire inside "result" and "ITC" not inside "switch".
+_BOUNDARY_LEFT = r"(?<![A-Za-z0-9])"
+_BOUNDARY_RIGHT = r"(?![A-Za-z0-9])"
+
+# When one surface form belongs to several kinds, the first kind wins
+_KIND_PRIORITY = ("name", "ticker", "alias")
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _trie_pattern(surfaces: Iterable[str]) -> str:
+    """
+    Compile surface forms into a prefix-trie shaped regex.
+
+    A flat "a|b|c|..." alternation makes the regex engine try every
+    alternative at every position; nesting alternatives by shared prefix means
+    only branches whose prefix actually matches are explored. Longer
+    continuations are tried first, so the longest surface form wins.
+    """
+    trie = {}
+    for surface in surfaces:
+        node = trie
+        for char in surface:
+            node = node.setdefault(char, {})
+        node[""] = True  # end of a surface form
+
+    def render(node) -> str:
+        branches = []
+        for char in sorted(k for k in node if k):
+            # Let any run of whitespace stand in for a single space
+            token = r"\s+" if char == " " else re.escape(char)
+            branches.append(token + render(node[char]))
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            body = "(?:" + body + ")?"
+        return body
+
+    return render(trie)
+
+
+class TickerMatch(NamedTuple):
+    ticker: str
+    surface: str  # text as it appeared in the prompt
+    kind: str     # "name", "ticker" or "alias"
+    start: int
+    end: int
+
+
+class TickerMatcher:
+    """
+    Find every company name, ticker and alias mentioned in a text in one pass.
+
+    All surface forms are compiled into a single case-insensitive trie-shaped
+    regex (longest form wins, so "HDFC Bank" beats "HDFC") wrapped in word
+    boundaries, instead of looping over names and tickers with substring checks.
+    """
+
+    def __init__(self, company_ticker_map: Dict[str, str], aliases: Optional[Dict[str, Iterable[str]]] = None):
+        self._lookup = {}
+        known_tickers = set(company_ticker_map.values())
+        forms = {
+            "name": [(name, ticker) for name, ticker in company_ticker_map.items()],
+            "ticker": [(ticker, ticker) for ticker in company_ticker_map.values()],
+            "alias": [(alias, ticker) for ticker, names in (aliases or {}).items()
+                      for alias in names if ticker in known_tickers],
+        }
+        for kind in _KIND_PRIORITY:
+            for surface, ticker in forms[kind]:
+                self._lookup.setdefault(_normalize(surface), (ticker, kind))
+
+        self._pattern = re.compile(
+            _BOUNDARY_LEFT + "(" + _trie_pattern(self._lookup) + ")" + _BOUNDARY_RIGHT,
+            re.IGNORECASE
+        )
+
+    def find_all(self, text: str) -> List[TickerMatch]:
+        """All non-overlapping matches, in order of appearance."""
+        matches = []
+        for match in self._pattern.finditer(text):
+            ticker, kind = self._lookup[_normalize(match.group(1))]
+            matches.append(TickerMatch(ticker, match.group(1), kind, match.start(), match.end()))
+        return matches
+
+    def tickers(self, text: str) -> List[str]:
+        """Distinct tickers mentioned in ``text``, in order of first appearance."""
+        return list(dict.fromkeys(match.ticker for match in self.find_all(text)))
+
+    def first(self, text: str) -> Optional[str]:
+        """Ticker of the first company mentioned in ``text``, if any."""
+        match = self._pattern.search(text)
+        if not match:
+            return None
+        return self._lookup[_normalize(match.group(1))][0]
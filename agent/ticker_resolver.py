@@ -0,0 +1,213 @@
+import logging
+import re
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from .ticker_matcher import TickerMatcher
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z0-9&']+")
+
+# Surface forms shorter than this are too noisy to fuzzy-match ("lt", "itc")
+MIN_FUZZY_LENGTH = 4
+
+# Name tokens a prompt may leave out and still mean the company ("Larsen Toubro")
+_FILLER_TOKENS = frozenset({"and", "&", "of", "the", "ltd", "limited", "co", "corp", "corporation"})
+
+TIERS = ("exact", "alias", "fuzzy", "llm", "unresolved")
+
+
+class Resolution(NamedTuple):
+    ticker: Optional[str]
+    tier: str     # one of TIERS
+    score: float  # 1.0 for exact/alias, similarity for fuzzy
+
+
+def normalize_prompt(prompt: str) -> str:
+    return " ".join(_TOKEN_RE.findall(prompt.lower()))
+
+
+def _trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _dice(a: set, b: set) -> float:
+    return 2 * len(a & b) / (len(a) + len(b)) if a or b else 0.0
+
+
+class TickerResolver:
+    """
+    Resolve a free-text prompt to a single ticker without an LLM round trip
+    whenever possible.
+
+    Tiers, cheapest first: exact name/ticker match, alias match, trigram
+    fuzzy scoring over name-sized windows of the prompt, and finally the
+    ``llm_fallback`` callable, which is only consulted when the best fuzzy
+    candidates are too close to call or the best one matches only part of
+    a company name ("steel prices" against "JSW Steel"). Results are memoized per normalized
+    prompt in an LRU and every resolution is counted per tier.
+    """
+
+    def __init__(
+        self,
+        company_ticker_map: Dict[str, str],
+        aliases: Optional[Dict[str, Iterable[str]]] = None,
+        llm_fallback: Optional[Callable[[str, List[str]], Optional[str]]] = None,
+        fuzzy_threshold: float = 0.6,
+        candidate_threshold: float = 0.5,
+        ambiguity_margin: float = 0.1,
+        cache_size: int = 2048,
+    ):
+        self.company_ticker_map = company_ticker_map
+        self.matcher = TickerMatcher(company_ticker_map, aliases)
+        self.llm_fallback = llm_fallback
+        self.fuzzy_threshold = fuzzy_threshold
+        self.candidate_threshold = candidate_threshold
+        self.ambiguity_margin = ambiguity_margin
+        self.cache_size = cache_size
+
+        self._ticker_names = {ticker: name for name, ticker in company_ticker_map.items()}
+        # Fuzzy index: surface -> (ticker, trigrams), bucketed by token count
+        self._surfaces_by_length = defaultdict(list)
+        self._trigram_index = defaultdict(set)
+        surfaces = [(name, ticker) for name, ticker in company_ticker_map.items()]
+        surfaces += [(alias, ticker) for ticker, names in (aliases or {}).items()
+                     for alias in names if ticker in self._ticker_names]
+        for surface, ticker in surfaces:
+            normalized = normalize_prompt(surface)
+            if len(normalized) < MIN_FUZZY_LENGTH:
+                continue
+            length = len(normalized.split())
+            name_grams = [_trigrams(token) for token in normalized.split() if token not in _FILLER_TOKENS]
+            entry = (normalized, ticker, _trigrams(normalized), length, name_grams)
+            self._surfaces_by_length[length].append(entry)
+            for gram in entry[2]:
+                self._trigram_index[gram].add(normalized)
+        self._surface_entries = {entry[0]: entry for entries in self._surfaces_by_length.values()
+                                 for entry in entries}
+
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._counts = Counter()
+
+    def resolve(self, prompt: str, allow_llm: bool = True) -> Resolution:
+        """
+        Resolve ``prompt`` to a ticker. With ``allow_llm=False`` ambiguous
+        prompts fall back to the best fuzzy candidate (or unresolved) and are
+        not memoized, so a later call may still ask the LLM.
+        """
+        key = normalize_prompt(prompt)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self._counts["cache_hit"] += 1
+                return cached
+
+        resolution, final = self._resolve_uncached(prompt, key, allow_llm)
+
+        with self._lock:
+            self._counts[resolution.tier] += 1
+            if final:
+                self._cache[key] = resolution
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+            total = sum(self._counts[tier] for tier in TIERS)
+            if total % 100 == 0:
+                logger.info(f"Ticker resolver stats: {self._stats_locked()}")
+        return resolution
+
+    def _resolve_uncached(self, prompt: str, key: str, allow_llm: bool):
+        """Returns (resolution, final); non-final results are not memoized."""
+        matches = self.matcher.find_all(prompt)
+        for match in matches:
+            if match.kind in ("name", "ticker"):
+                return Resolution(match.ticker, "exact", 1.0), True
+        if matches:
+            return Resolution(matches[0].ticker, "alias", 1.0), True
+
+        ranked = self.fuzzy_candidates(key)
+        if not ranked or ranked[0][1] < self.candidate_threshold:
+            return Resolution(None, "unresolved", ranked[0][1] if ranked else 0.0), True
+
+        best_ticker, best_score, complete = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        confident = complete and best_score >= self.fuzzy_threshold
+        if confident and best_score - runner_up >= self.ambiguity_margin:
+            return Resolution(best_ticker, "fuzzy", best_score), True
+
+        # Top candidates are too close, too weak or only part of a name to call locally
+        final = self.llm_fallback is None
+        if allow_llm and self.llm_fallback:
+            candidates = [self._ticker_names[ticker] for ticker, _, _ in ranked[:5]]
+            try:
+                ticker = self.llm_fallback(prompt, candidates)
+                final = True
+            except Exception as e:
+                logger.error(f"LLM ticker fallback failed: {e}")
+                ticker = None
+            if ticker:
+                return Resolution(ticker, "llm", best_score), True
+
+        if confident:
+            return Resolution(best_ticker, "fuzzy", best_score), final
+        return Resolution(None, "unresolved", best_score), final
+
+    def _covers(self, name_grams: List[set], window: List[str]) -> bool:
+        """Whether every meaningful token of a name has a similar token in ``window``."""
+        window_grams = [_trigrams(token) for token in window]
+        return all(
+            any(_dice(name_token, token) >= self.candidate_threshold for token in window_grams)
+            for name_token in name_grams
+        )
+
+    def fuzzy_candidates(self, normalized_prompt: str) -> List[tuple]:
+        """
+        (ticker, score, complete) triples ranked by trigram Dice similarity,
+        best first. ``complete`` means the window covered every meaningful
+        token of the name; a ticker's complete match is preferred over a
+        higher-scoring partial one.
+        """
+        tokens = normalized_prompt.split()
+        best = {}
+        max_length = max(self._surfaces_by_length, default=0)
+        # Compare each surface with prompt windows of similar word count
+        for size in range(1, min(len(tokens), max_length + 1) + 1):
+            for start in range(len(tokens) - size + 1):
+                window = tokens[start:start + size]
+                window_grams = _trigrams(" ".join(window))
+                shared = Counter()
+                for gram in window_grams:
+                    for surface in self._trigram_index.get(gram, ()):
+                        shared[surface] += 1
+                for surface, count in shared.items():
+                    _, ticker, grams, length, name_grams = self._surface_entries[surface]
+                    if abs(length - size) > 1:
+                        continue
+                    score = 2 * count / (len(grams) + len(window_grams))
+                    complete = score >= self.candidate_threshold and self._covers(name_grams, window)
+                    candidate = (complete, score)
+                    if candidate > best.get(ticker, (False, 0.0)):
+                        best[ticker] = candidate
+        ranked = [(ticker, score, complete) for ticker, (complete, score) in best.items()]
+        return sorted(ranked, key=lambda item: item[1], reverse=True)
+
+    def _stats_locked(self) -> Dict:
+        resolved = sum(self._counts[tier] for tier in TIERS)
+        lookups = resolved + self._counts["cache_hit"]
+        stats = {tier: self._counts[tier] for tier in TIERS}
+        stats["cache_hit"] = self._counts["cache_hit"]
+        stats["lookups"] = lookups
+        stats["rates"] = {
+            name: round(count / lookups, 3) if lookups else 0.0
+            for name, count in stats.items() if name not in ("lookups",)
+        }
+        return stats
+
+    def stats(self) -> Dict:
+        """Resolution counts per tier (plus memo hits) and their share of lookups."""
+        with self._lock:
+            return self._stats_locked()
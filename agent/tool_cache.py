@@ -0,0 +1,136 @@
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from FinAdvisor.api import deadline
+
+
+class ToolCache:
+    """
+    Cross-request cache of agent tool results keyed by (tool, key), usually
+    the resolved ticker, so paraphrased prompts about the same company share
+    one entry. Values are the tools' raw data (shared, so treat them as
+    read-only); each agent mode formats them for its own tool output.
+
+    Each tool has its own TTL (``ttls``, falling back to ``default_ttl``).
+    Concurrent misses for the same key are collapsed: one caller computes,
+    the others wait for its result, for at most ``max_wait`` seconds or what
+    is left of their request deadline, then compute it themselves (or raise
+    DeadlineExceeded once the budget is gone). ``None`` results, and results
+    rejected by the ``cacheable`` predicate (e.g. errors), are not cached.
+    """
+
+    def __init__(self, ttls: Optional[Dict[str, float]] = None, default_ttl: float = 300, max_entries: int = 2000,
+                 max_wait: float = 15):
+        self.ttls = dict(ttls or {})
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.max_wait = max_wait
+        self._entries = OrderedDict()
+        self._inflight: Dict[tuple, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._hits = Counter()
+        self._misses = Counter()
+        self._local = threading.local()
+
+    def take_status(self) -> Optional[str]:
+        """"hit" or "miss" for this thread's latest lookup, then cleared (for instrumentation)."""
+        status = getattr(self._local, "status", None)
+        self._local.status = None
+        return status
+
+    def ttl_for(self, tool: str) -> float:
+        return self.ttls.get(tool, self.default_ttl)
+
+    def _lookup_locked(self, cache_key: tuple, now: float):
+        entry = self._entries.get(cache_key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= now:
+            del self._entries[cache_key]
+            return None
+        self._entries.move_to_end(cache_key)
+        return value
+
+    def get(self, tool: str, key: Hashable) -> Any:
+        with self._lock:
+            value = self._lookup_locked((tool, key), time.monotonic())
+            if value is None:
+                self._misses[tool] += 1
+            else:
+                self._hits[tool] += 1
+            self._local.status = "miss" if value is None else "hit"
+            return value
+
+    def put(self, tool: str, key: Hashable, value: Any) -> None:
+        if value is None:
+            return
+        with self._lock:
+            self._entries[(tool, key)] = (value, time.monotonic() + self.ttl_for(tool))
+            self._entries.move_to_end((tool, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(
+        self,
+        tool: str,
+        key: Hashable,
+        compute: Callable[[], Any],
+        cacheable: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        cache_key = (tool, key)
+        done = None
+        while True:
+            with self._lock:
+                value = self._lookup_locked(cache_key, time.monotonic())
+                if value is not None:
+                    self._hits[tool] += 1
+                    self._local.status = "hit"
+                    return value
+                waiter = self._inflight.get(cache_key)
+                if waiter is None:
+                    self._misses[tool] += 1
+                    self._local.status = "miss"
+                    done = self._inflight[cache_key] = threading.Event()
+                    break
+            # Someone else is computing this key; use their result once ready,
+            # or compute it ourselves if theirs failed, was not cacheable or hangs
+            if not waiter.wait(deadline.timeout_for(self.max_wait, f"{tool} cache wait")):
+                with self._lock:
+                    self._misses[tool] += 1
+                    self._local.status = "miss"
+                break
+
+        if done is None:
+            # Gave up waiting; DeadlineExceeded if that used up the request's budget
+            deadline.timeout_for(self.max_wait, tool)
+        try:
+            value = compute()
+            if value is not None and (cacheable is None or cacheable(value)):
+                self.put(tool, key, value)
+            return value
+        finally:
+            # Only the caller that registered the computation clears it
+            if done is not None:
+                with self._lock:
+                    self._inflight.pop(cache_key, None)
+                done.set()
+
+    def stats(self) -> Dict[str, Dict]:
+        """Hits, misses, hit rate, live entries and TTL per tool."""
+        with self._lock:
+            entries = Counter(tool for tool, _ in self._entries)
+            tools = set(self._hits) | set(self._misses) | set(self.ttls)
+            stats = {}
+            for tool in sorted(tools):
+                lookups = self._hits[tool] + self._misses[tool]
+                stats[tool] = {
+                    "hits": self._hits[tool],
+                    "misses": self._misses[tool],
+                    "hit_rate": round(self._hits[tool] / lookups, 3) if lookups else 0.0,
+                    "entries": entries[tool],
+                    "ttl_seconds": self.ttl_for(tool),
+                }
+            return stats
@@ -7,8 +7,11 @@ import os
 import uuid
 from typing import Union
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+import asyncio
 from .models import Profile
 from .database import get_session
+from .user_context import aget_user_snapshot, get_user_snapshot
 
 load_dotenv()
 
@@ -40,16 +43,32 @@ def authenticate_user(username: str, password: str, db: Session = Depends(get_se
         raise HTTPException(status_code=401, detail="Invalid credentials")
     return user
 
-def get_current_user(token: str, db: Session = Depends(get_session)) -> Profile:
-    """Get the current user from the JWT token."""
+async def aauthenticate_user(username: str, password: str, db: AsyncSession) -> Profile:
+    """``authenticate_user`` for async endpoints; bcrypt runs off the event loop."""
+    user = (await db.exec(select(Profile).where(Profile.username == username))).first()
+    if not user or not await asyncio.to_thread(verify_password, password, user.password_hash):
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    return user
+
+def _token_user_id(token: str) -> str:
     try:
         payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=["HS256"])
-        user_id = payload.get("sub")
-        if not user_id:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        user = db.exec(select(Profile).where(Profile.id == user_id)).first()
-        return user
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token has expired")
     except jwt.JWTError:
         raise HTTPException(status_code=401, detail="Could not validate credentials")
+    user_id = payload.get("sub")
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return user_id
+
+def get_current_user(token: str, db: Session = Depends(get_session)) -> Profile:
+    """Get the current user from the JWT token."""
+    # Served from the per-user snapshot cache; one joined query on a miss
+    snapshot = get_user_snapshot(db, _token_user_id(token))
+    return snapshot.profile if snapshot else None
+
+async def aget_current_user(token: str, db: AsyncSession) -> Profile:
+    """``get_current_user`` for async endpoints."""
+    snapshot = await aget_user_snapshot(db, _token_user_id(token))
+    return snapshot.profile if snapshot else None
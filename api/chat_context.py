@@ -0,0 +1,175 @@
+import json
+import math
+import os
+import re
+import uuid
+from typing import Dict, FrozenSet, List, Optional
+
+from sqlmodel import Session, select
+from sqlalchemy import desc
+from sqlalchemy.exc import IntegrityError
+
+from .models import Chat, ChatContext
+
+# Approximate token budget of the verbatim recent-turns window
+CHAT_CONTEXT_TOKEN_BUDGET = int(os.getenv("CHAT_CONTEXT_TOKEN_BUDGET", 1500))
+# Approximate token budget of the summary of older turns
+CHAT_CONTEXT_SUMMARY_TOKENS = int(os.getenv("CHAT_CONTEXT_SUMMARY_TOKENS", 400))
+# A single message longer than this is truncated inside the window
+CHAT_CONTEXT_MESSAGE_TOKENS = int(os.getenv("CHAT_CONTEXT_MESSAGE_TOKENS", 300))
+# Chats replayed to build the context of a user who has none yet
+CHAT_CONTEXT_BACKFILL_CHATS = 50
+
+NO_HISTORY = "No previous conversation history."
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+# Combined answers are stored as "FinGuru: ... \n FinSaathi: ..."; keep one advisor's gist
+_ADVISOR_PREFIX_RE = re.compile(r"^\s*(FinGuru|FinSaathi):\s*")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token), good enough for budgeting."""
+    return math.ceil(len(text) / 4)
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    text = " ".join(text.split())
+    max_chars = max_tokens * 4
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rsplit(" ", 1)[0] + " ..."
+
+
+def _turn_tokens(turn: Dict[str, str]) -> int:
+    return estimate_tokens(turn["user"]) + estimate_tokens(turn["ai"])
+
+
+def _summarize_turn(turn: Dict[str, str]) -> str:
+    """One summary line per turn: the question and the first sentence of the answer."""
+    question = _truncate(turn["user"], 30)
+    answer = _ADVISOR_PREFIX_RE.sub("", turn["ai"].split("\n")[0])
+    first_sentence = _SENTENCE_RE.split(answer.strip(), 1)[0] if answer.strip() else ""
+    line = f"- Asked: {question}"
+    if first_sentence:
+        line += f" | Advised: {_truncate(first_sentence, 40)}"
+    return line
+
+
+def _trim_summary(lines: List[str]) -> List[str]:
+    """Drop the oldest summary lines until the summary fits its budget."""
+    while len(lines) > 1 and estimate_tokens("\n".join(lines)) > CHAT_CONTEXT_SUMMARY_TOKENS:
+        lines.pop(0)
+    return lines
+
+
+def _append_turn(context: ChatContext, human_message: str, ai_message: str, chat_id: Optional[int]) -> None:
+    turns = json.loads(context.recent_turns or "[]")
+    turn = {
+        "user": _truncate(human_message, CHAT_CONTEXT_MESSAGE_TOKENS),
+        "ai": _truncate(ai_message, CHAT_CONTEXT_MESSAGE_TOKENS),
+    }
+    if chat_id is not None:
+        turn["id"] = chat_id
+    turns.append(turn)
+    recent_tokens = (context.recent_tokens or 0) + _turn_tokens(turn)
+
+    summary_lines = context.summary.split("\n") if context.summary else []
+    # Always keep the newest turn verbatim, even if it alone exceeds the budget
+    while len(turns) > 1 and recent_tokens > CHAT_CONTEXT_TOKEN_BUDGET:
+        evicted = turns.pop(0)
+        recent_tokens -= _turn_tokens(evicted)
+        summary_lines.append(_summarize_turn(evicted))
+        context.summarized_turns = (context.summarized_turns or 0) + 1
+
+    context.summary = "\n".join(_trim_summary(summary_lines))
+    context.recent_turns = json.dumps(turns)
+    context.recent_tokens = recent_tokens
+    if chat_id is not None:
+        context.last_chat_id = chat_id
+
+
+def record_turn(
+    db: Session,
+    user_id: uuid.UUID,
+    human_message: str,
+    ai_message: str,
+    chat_id: Optional[int] = None
+) -> ChatContext:
+    """
+    Append a turn to the user's context and commit. Turns pushed out of the
+    token window are folded into the summary, so the work per message is constant.
+    """
+    for attempt in range(2):
+        context = db.get(ChatContext, user_id)
+        if context is None:
+            context = _backfill(db, user_id, exclude_chat_id=chat_id) or ChatContext(user_id=user_id)
+            db.add(context)
+        _append_turn(context, human_message, ai_message, chat_id)
+        try:
+            db.commit()
+            return context
+        except IntegrityError:
+            # Another request created the row first; apply the turn on top of it
+            db.rollback()
+            if attempt:
+                raise
+
+
+def _backfill(db: Session, user_id: uuid.UUID, exclude_chat_id: Optional[int] = None) -> Optional[ChatContext]:
+    """
+    Build (without committing) the context of a user whose chats predate the
+    context store, from their most recent chats.
+    """
+    query = select(Chat).where(Chat.user_id == user_id)
+    if exclude_chat_id is not None:
+        query = query.where(Chat.id != exclude_chat_id)
+    chats = db.exec(
+        query.order_by(desc(Chat.timestamp), desc(Chat.id)).limit(CHAT_CONTEXT_BACKFILL_CHATS)
+    ).all()
+    if not chats:
+        return None
+    context = ChatContext(user_id=user_id)
+    for chat in reversed(chats):
+        _append_turn(context, chat.human_message, chat.ai_message, chat.id)
+    return context
+
+
+def recent_chat_ids(context: Optional[ChatContext]) -> FrozenSet[int]:
+    """Ids of the chats in the verbatim window (turns recorded without an id are skipped)."""
+    if context is None:
+        return frozenset()
+    return frozenset(turn["id"] for turn in json.loads(context.recent_turns or "[]") if "id" in turn)
+
+
+def format_context(context: Optional[ChatContext]) -> str:
+    if context is None:
+        return NO_HISTORY
+    turns = json.loads(context.recent_turns or "[]")
+    if not turns and not context.summary:
+        return NO_HISTORY
+    parts = []
+    if context.summary:
+        parts.append(
+            f"Summary of {context.summarized_turns} earlier exchanges "
+            f"(most recent last):\n{context.summary}"
+        )
+    if turns:
+        parts.append("Recent conversation:\n" + "\n".join(
+            f"User: {turn['user']} AI: {turn['ai']}" for turn in turns
+        ))
+    return "\n\n".join(parts)
+
+
+def load_history_context(db: Session, user_id: uuid.UUID) -> str:
+    """Prompt-ready conversation context for ``user_id`` (one primary-key lookup)."""
+    context = db.get(ChatContext, user_id)
+    if context is None:
+        context = _backfill(db, user_id)
+        if context is not None:
+            db.add(context)
+            try:
+                db.commit()
+            except IntegrityError:
+                # Built concurrently by the other advisor branch; ours is equivalent
+                db.rollback()
+    return format_context(context)
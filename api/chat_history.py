@@ -0,0 +1,165 @@
+import asyncio
+import base64
+import json
+import logging
+import os
+import uuid
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import and_, delete, desc, or_
+
+from .models import Chat, ChatArchive, ChatHistoryPage, ChatOut
+from .database import engine
+
+logger = logging.getLogger(__name__)
+
+CHAT_HISTORY_PAGE_SIZE = int(os.getenv("CHAT_HISTORY_PAGE_SIZE", 20))
+CHAT_HISTORY_MAX_PAGE_SIZE = int(os.getenv("CHAT_HISTORY_MAX_PAGE_SIZE", 100))
+
+# Chats older than this move to chat_archive, keeping the hot table and its index small
+CHAT_ARCHIVE_AFTER_DAYS = int(os.getenv("CHAT_ARCHIVE_AFTER_DAYS", 90))
+CHAT_ARCHIVE_BATCH_SIZE = int(os.getenv("CHAT_ARCHIVE_BATCH_SIZE", 500))
+CHAT_ARCHIVE_INTERVAL_SECONDS = int(os.getenv("CHAT_ARCHIVE_INTERVAL_SECONDS", 6 * 60 * 60))
+
+Key = Tuple[datetime, int]
+
+
+def compress_chat(human_message: str, ai_message: str) -> bytes:
+    return zlib.compress(json.dumps([human_message, ai_message]).encode("utf-8"), 9)
+
+
+def decompress_chat(payload: bytes) -> Tuple[str, str]:
+    human_message, ai_message = json.loads(zlib.decompress(payload).decode("utf-8"))
+    return human_message, ai_message
+
+
+def encode_cursor(timestamp: datetime, chat_id: int) -> str:
+    """Opaque cursor for the chat at (``timestamp``, ``chat_id``)."""
+    raw = json.dumps([timestamp.isoformat(), chat_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Key:
+    """Inverse of ``encode_cursor``; raises ValueError for anything else."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, chat_id = json.loads(raw)
+        return datetime.fromisoformat(timestamp), int(chat_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def _page_query(model, user_id: uuid.UUID, before: Optional[Key], limit: int):
+    """
+    Newest-first page of ``model`` rows for ``user_id`` strictly older than
+    ``before`` in (timestamp, id) order. The comparison seeks straight into
+    the (user_id, timestamp, id) index, so deep pages cost the same as the
+    first. It is spelled out column by column so the cursor timestamp is bound
+    through the column's own type (on SQLite, its stored text format).
+    """
+    query = select(model).where(model.user_id == user_id)
+    if before is not None:
+        timestamp, chat_id = before
+        query = query.where(or_(
+            model.timestamp < timestamp,
+            and_(model.timestamp == timestamp, model.id < chat_id),
+        ))
+    return query.order_by(desc(model.timestamp), desc(model.id)).limit(limit)
+
+
+def _archived_out(row: ChatArchive) -> ChatOut:
+    human_message, ai_message = decompress_chat(row.payload)
+    return ChatOut(
+        id=row.id, user_id=row.user_id, human_message=human_message, ai_message=ai_message, timestamp=row.timestamp
+    )
+
+
+async def get_history_page(
+    db: AsyncSession, user_id: uuid.UUID, limit: int = CHAT_HISTORY_PAGE_SIZE, before: Optional[Key] = None
+) -> ChatHistoryPage:
+    """
+    One page of ``user_id``'s chats, newest first, older than ``before``.
+    Pages run through the hot table and continue into the archive, so
+    archived chats are reachable with the same cursor.
+    """
+    rows = (await db.exec(_page_query(Chat, user_id, before, limit + 1))).all()
+    chats: List[ChatOut] = [
+        ChatOut(
+            id=row.id, user_id=row.user_id, human_message=row.human_message,
+            ai_message=row.ai_message, timestamp=row.timestamp
+        )
+        for row in rows
+    ]
+    if len(chats) <= limit:
+        # Hot table exhausted; archived chats are all older than what is left in it
+        archive_before = (chats[-1].timestamp, chats[-1].id) if chats else before
+        archived = (await db.exec(_page_query(ChatArchive, user_id, archive_before, limit + 1 - len(chats)))).all()
+        chats.extend(_archived_out(row) for row in archived)
+
+    # One extra row was fetched to know whether another page exists
+    next_cursor = None
+    if len(chats) > limit:
+        chats = chats[:limit]
+        next_cursor = encode_cursor(chats[-1].timestamp, chats[-1].id)
+    return ChatHistoryPage(chats=chats, next_cursor=next_cursor)
+
+
+def _as_utc(timestamp: datetime) -> datetime:
+    # SQLite hands back naive datetimes; func.now() stored them in UTC
+    return timestamp if timestamp.tzinfo else timestamp.replace(tzinfo=timezone.utc)
+
+
+def archive_old_chats(
+    db: Session, older_than_days: int = CHAT_ARCHIVE_AFTER_DAYS, batch_size: int = CHAT_ARCHIVE_BATCH_SIZE
+) -> int:
+    """
+    Move chats older than ``older_than_days`` into ``chat_archive``, one
+    committed batch at a time. Chat ids grow with insertion time, so the
+    oldest chats sit at the head of the primary key and each batch reads only
+    the rows it moves. Returns the number of chats archived.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    archived = 0
+    while True:
+        oldest = db.exec(select(Chat).order_by(Chat.id).limit(batch_size)).all()
+        batch = []
+        for chat in oldest:
+            if chat.timestamp is None or _as_utc(chat.timestamp) >= cutoff:
+                break
+            batch.append(chat)
+        if not batch:
+            return archived
+
+        for chat in batch:
+            db.add(ChatArchive(
+                id=chat.id,
+                user_id=chat.user_id,
+                timestamp=chat.timestamp,
+                payload=compress_chat(chat.human_message, chat.ai_message),
+            ))
+        db.execute(delete(Chat).where(Chat.id.in_([chat.id for chat in batch])))
+        db.commit()
+        archived += len(batch)
+        if len(batch) < len(oldest) or len(oldest) < batch_size:
+            return archived
+
+
+def _archive_once() -> int:
+    with Session(engine) as db:
+        return archive_old_chats(db)
+
+
+async def run_chat_archiver(interval_seconds: int = CHAT_ARCHIVE_INTERVAL_SECONDS):
+    """Background loop that moves old chats out of the hot table."""
+    while True:
+        try:
+            archived = await asyncio.to_thread(_archive_once)
+            if archived:
+                logger.info(f"Archived {archived} chats older than {CHAT_ARCHIVE_AFTER_DAYS} days")
+        except Exception as e:
+            logger.error(f"Chat archiver iteration failed: {str(e)}")
+        await asyncio.sleep(interval_seconds)
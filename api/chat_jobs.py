@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ("queued", "running", "done", "failed")
+
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+@dataclass
+class ChatJob:
+    user_id: uuid.UUID
+    prompt: str
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = "queued"
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    response: Optional[str] = None
+    branches: Optional[Dict[str, Any]] = None
+    chat_id: Optional[str] = None
+    error: Optional[str] = None
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    _changed: asyncio.Condition = field(default_factory=asyncio.Condition, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    async def publish(self, event: Dict[str, Any]) -> None:
+        """Record a progress event and wake up anyone streaming this job."""
+        async with self._changed:
+            self.events.append(event)
+            self._changed.notify_all()
+
+    async def _set_status(self, status: str) -> None:
+        async with self._changed:
+            self.status = status
+            if status == "running":
+                self.started_at = time.time()
+            elif status in ("done", "failed"):
+                self.finished_at = time.time()
+            self._changed.notify_all()
+
+    async def iter_events(self):
+        """Replay the events published so far, then follow new ones until the job finishes."""
+        index = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: index < len(self.events) or self.finished)
+                pending = self.events[index:]
+                finished = self.finished
+            for event in pending:
+                yield event
+            index += len(pending)
+            if finished and index >= len(self.events):
+                return
+
+    def to_dict(self, queue_position: Optional[int] = None) -> Dict[str, Any]:
+        result = {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if queue_position is not None:
+            result["queue_position"] = queue_position
+        if self.status == "done":
+            result.update(response=self.response, branches=self.branches, chat_id=self.chat_id)
+        elif self.status == "failed":
+            result.update(error=self.error, branches=self.branches)
+        return result
+
+
+class ChatJobQueue:
+    """
+    Bounded queue of chat jobs processed by a fixed pool of asyncio workers.
+
+    ``handler`` runs one job: it publishes progress events on the job and
+    returns a dict with "response", "branches" and optionally "chat_id", or
+    raises to fail the job. At most ``workers`` jobs run at once, at most
+    ``max_queue`` wait, and finished jobs are kept for ``result_ttl`` seconds.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[ChatJob], Awaitable[Dict[str, Any]]],
+        workers: int = 4,
+        max_queue: int = 100,
+        result_ttl: float = 600,
+    ):
+        self.handler = handler
+        self.workers = workers
+        self.max_queue = max_queue
+        self.result_ttl = result_ttl
+        self._jobs: Dict[str, ChatJob] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._counts = Counter()
+        self._wait_ms_total = 0.0
+        self._run_ms_total = 0.0
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"Chat job queue started with {self.workers} workers (max queue {self.max_queue})")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, user_id: uuid.UUID, prompt: str) -> ChatJob:
+        if self._queue is None:
+            raise RuntimeError("Chat job queue is not running")
+        self._purge_expired()
+        job = ChatJob(user_id=user_id, prompt=prompt)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self._counts["rejected"] += 1
+            raise JobQueueFull(f"Chat job queue is full ({self.max_queue} jobs waiting)")
+        self._jobs[job.id] = job
+        self._counts["submitted"] += 1
+        return job
+
+    def get(self, job_id: str) -> Optional[ChatJob]:
+        self._purge_expired()
+        return self._jobs.get(job_id)
+
+    def queue_position(self, job: ChatJob) -> Optional[int]:
+        """1-based position among waiting jobs, or None once the job has started."""
+        if job.status != "queued":
+            return None
+        return 1 + sum(
+            1 for other in self._jobs.values()
+            if other.status == "queued" and other.created_at < job.created_at
+        )
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: ChatJob) -> None:
+        await job._set_status("running")
+        self._wait_ms_total += (job.started_at - job.created_at) * 1000
+        try:
+            result = await self.handler(job)
+            job.response = result.get("response")
+            job.branches = result.get("branches")
+            job.chat_id = result.get("chat_id")
+            status = "done"
+        except asyncio.CancelledError:
+            job.error = "cancelled"
+            await job._set_status("failed")
+            raise
+        except Exception as e:
+            logger.error(f"Chat job {job.id} failed: {e}")
+            job.error = str(getattr(e, "detail", e))
+            job.branches = getattr(e, "branches", None)
+            status = "failed"
+        await job._set_status(status)
+        self._counts[status] += 1
+        self._run_ms_total += (job.finished_at - job.started_at) * 1000
+
+    def _purge_expired(self) -> None:
+        cutoff = time.time() - self.result_ttl
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def stats(self) -> Dict[str, Any]:
+        self._purge_expired()
+        by_status = Counter(job.status for job in self._jobs.values())
+        finished = self._counts["done"] + self._counts["failed"]
+        started = finished + by_status["running"]
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "running": by_status["running"],
+            "jobs": {status: by_status[status] for status in JOB_STATUSES},
+            "submitted": self._counts["submitted"],
+            "rejected": self._counts["rejected"],
+            "completed": self._counts["done"],
+            "failed": self._counts["failed"],
+            "avg_wait_ms": round(self._wait_ms_total / started, 1) if started else 0.0,
+            "avg_run_ms": round(self._run_ms_total / finished, 1) if finished else 0.0,
+            "result_ttl_seconds": self.result_ttl,
+        }
@@ -0,0 +1,223 @@
+import math
+import os
+import re
+import threading
+import uuid
+from collections import Counter, OrderedDict, defaultdict
+from typing import Dict, Iterable, List
+
+from sqlmodel import Session, select
+from sqlalchemy import desc
+
+from .models import Chat
+from .chat_context import CHAT_CONTEXT_MESSAGE_TOKENS, _truncate, estimate_tokens
+
+# Older turns retrieved per question, and their approximate token budget
+CHAT_RETRIEVAL_TOP_K = int(os.getenv("CHAT_RETRIEVAL_TOP_K", 3))
+CHAT_RETRIEVAL_TOKEN_BUDGET = int(os.getenv("CHAT_RETRIEVAL_TOKEN_BUDGET", 600))
+# Turns scoring below this share too little with the question to be worth the tokens
+CHAT_RETRIEVAL_MIN_SCORE = float(os.getenv("CHAT_RETRIEVAL_MIN_SCORE", 1.0))
+# Chats indexed per user (newest kept) and users kept in memory
+CHAT_RETRIEVAL_MAX_DOCS = int(os.getenv("CHAT_RETRIEVAL_MAX_DOCS", 500))
+CHAT_RETRIEVAL_MAX_USERS = int(os.getenv("CHAT_RETRIEVAL_MAX_USERS", 2000))
+
+# BM25 parameters
+K1 = 1.5
+B = 0.75
+
+_TOKEN_RE = re.compile(r"[a-z0-9&]+")
+_STOPWORDS = frozenset("""
+a an and are as at be but by can do does for from has have how i if in is it its me my of on or should
+so that the their there this to was what when which who why will with you your about any would could
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in _STOPWORDS and len(token) > 1]
+
+
+class _UserIndex:
+    """BM25 index over one user's chats; documents are question + answer."""
+
+    def __init__(self):
+        self.docs: Dict[int, tuple] = {}  # chat_id -> (term counts, length, user, ai)
+        self.postings: Dict[str, set] = defaultdict(set)
+        self.total_length = 0
+
+    def add(self, chat_id: int, human_message: str, ai_message: str) -> None:
+        if chat_id in self.docs:
+            return
+        terms = Counter(tokenize(f"{human_message} {ai_message}"))
+        length = sum(terms.values())
+        self.docs[chat_id] = (
+            terms,
+            length,
+            _truncate(human_message, CHAT_CONTEXT_MESSAGE_TOKENS),
+            _truncate(ai_message, CHAT_CONTEXT_MESSAGE_TOKENS),
+        )
+        for term in terms:
+            self.postings[term].add(chat_id)
+        self.total_length += length
+
+    def remove_oldest(self) -> None:
+        chat_id = min(self.docs)
+        terms, length, _, _ = self.docs.pop(chat_id)
+        for term in terms:
+            ids = self.postings[term]
+            ids.discard(chat_id)
+            if not ids:
+                del self.postings[term]
+        self.total_length -= length
+
+    def search(self, query_terms: Iterable[str], exclude: Iterable[int] = ()) -> List[tuple]:
+        """(score, chat_id) of every document sharing a term with the query, best first."""
+        n_docs = len(self.docs)
+        if not n_docs:
+            return []
+        avg_length = self.total_length / n_docs or 1.0
+        excluded = set(exclude)
+        scores = Counter()
+        for term in set(query_terms):
+            ids = self.postings.get(term)
+            if not ids:
+                continue
+            idf = math.log(1 + (n_docs - len(ids) + 0.5) / (len(ids) + 0.5))
+            for chat_id in ids:
+                if chat_id in excluded:
+                    continue
+                terms, length, _, _ = self.docs[chat_id]
+                tf = terms[term]
+                scores[chat_id] += idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / avg_length))
+        return sorted(((score, chat_id) for chat_id, score in scores.items()), reverse=True)
+
+
+class ChatRetrievalIndex:
+    """
+    Per-user BM25 indexes over past chats, kept in memory.
+
+    A user's index is built from their newest chats on first use and then
+    updated incrementally by ``add_turn`` as chats are saved. Least recently
+    used users are dropped beyond ``max_users``.
+    """
+
+    def __init__(self, max_users: int = CHAT_RETRIEVAL_MAX_USERS, max_docs: int = CHAT_RETRIEVAL_MAX_DOCS):
+        self.max_users = max_users
+        self.max_docs = max_docs
+        self._users = OrderedDict()
+        # Turns saved while a user's index is being loaded, and how many loads are in flight
+        self._pending: Dict[uuid.UUID, List[tuple]] = {}
+        self._loading = Counter()
+        self._lock = threading.Lock()
+        self._counts = Counter()
+
+    def _add_locked(self, index: _UserIndex, chat_id: int, human_message: str, ai_message: str) -> None:
+        index.add(chat_id, human_message, ai_message)
+        while len(index.docs) > self.max_docs:
+            index.remove_oldest()
+
+    def add_turn(self, user_id: uuid.UUID, chat_id: int, human_message: str, ai_message: str) -> None:
+        """Index a newly saved chat; users not loaded yet pick it up when they are."""
+        with self._lock:
+            index = self._users.get(user_id)
+            if index is not None:
+                self._add_locked(index, chat_id, human_message, ai_message)
+            elif user_id in self._pending:
+                # A load may have read the table before this chat was saved
+                self._pending[user_id].append((chat_id, human_message, ai_message))
+
+    def _get_or_load(self, db: Session, user_id: uuid.UUID) -> _UserIndex:
+        with self._lock:
+            index = self._users.get(user_id)
+            if index is not None:
+                self._users.move_to_end(user_id)
+                return index
+            self._pending.setdefault(user_id, [])
+            self._loading[user_id] += 1
+
+        try:
+            chats = db.exec(
+                select(Chat.id, Chat.human_message, Chat.ai_message)
+                .where(Chat.user_id == user_id)
+                .order_by(desc(Chat.timestamp), desc(Chat.id))
+                .limit(self.max_docs)
+            ).all()
+        except Exception:
+            with self._lock:
+                self._finish_load_locked(user_id)
+            raise
+
+        with self._lock:
+            # Another request may have loaded (and updated) it meanwhile
+            index = self._users.get(user_id)
+            if index is None:
+                index = self._users[user_id] = _UserIndex()
+                self._counts["loads"] += 1
+                while len(self._users) > self.max_users:
+                    self._users.popitem(last=False)
+            for chat_id, human_message, ai_message in chats:
+                self._add_locked(index, chat_id, human_message or "", ai_message or "")
+            # Chats saved after our read; the index is live now, so later ones go straight in
+            for chat_id, human_message, ai_message in self._pending.get(user_id, []):
+                self._add_locked(index, chat_id, human_message or "", ai_message or "")
+            self._pending[user_id] = []
+            self._finish_load_locked(user_id)
+            return index
+
+    def _finish_load_locked(self, user_id: uuid.UUID) -> None:
+        self._loading[user_id] -= 1
+        if self._loading[user_id] <= 0:
+            del self._loading[user_id]
+            self._pending.pop(user_id, None)
+
+    def relevant_turns(
+        self,
+        db: Session,
+        user_id: uuid.UUID,
+        query: str,
+        k: int = CHAT_RETRIEVAL_TOP_K,
+        token_budget: int = CHAT_RETRIEVAL_TOKEN_BUDGET,
+        exclude: Iterable[int] = (),
+    ) -> List[Dict[str, str]]:
+        """
+        Up to ``k`` past turns most relevant to ``query`` that fit in
+        ``token_budget``, oldest first. ``exclude`` are chat ids already in
+        the prompt (the recent window).
+        """
+        query_terms = tokenize(query)
+        if not query_terms:
+            return []
+        index = self._get_or_load(db, user_id)
+        with self._lock:
+            ranked = index.search(query_terms, exclude)
+            picked, used = [], 0
+            for score, chat_id in ranked:
+                if len(picked) >= k or score < CHAT_RETRIEVAL_MIN_SCORE:
+                    break
+                _, _, human_message, ai_message = index.docs[chat_id]
+                tokens = estimate_tokens(human_message) + estimate_tokens(ai_message)
+                if used + tokens > token_budget:
+                    continue
+                used += tokens
+                picked.append((chat_id, {"user": human_message, "ai": ai_message}))
+            self._counts["queries"] += 1
+            self._counts["hits" if picked else "misses"] += 1
+        return [turn for _, turn in sorted(picked, key=lambda item: item[0])]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "users": len(self._users),
+                "documents": sum(len(index.docs) for index in self._users.values()),
+                **self._counts,
+            }
+
+
+chat_index = ChatRetrievalIndex()
+
+
+def format_relevant_turns(turns: List[Dict[str, str]]) -> str:
+    if not turns:
+        return ""
+    return "Relevant earlier exchanges:\n" + "\n".join(
+        f"User: {turn['user']} AI: {turn['ai']}" for turn in turns
+    )
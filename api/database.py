@@ -1,12 +1,180 @@
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 from dotenv import load_dotenv
 import os
+import threading
+import time
+from typing import Any, Dict
+
+from .metrics import Histogram
+
 load_dotenv()
 DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL environment variable is not set")
-engine = create_engine(DATABASE_URL, echo=True)
+# Async driver URL for request handlers; derived from DATABASE_URL unless set
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+
+# Async drivers per backend (the sync engine keeps the URL's own driver)
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+# Engine profile. SQL echo logs every statement synchronously; keep it for debugging only
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", 30))
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# Compiled SQL statements cached per engine, so repeated queries skip recompilation
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 1000))
+
+# SQLite only: WAL lets readers proceed while the screener writes
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", 64 * 1024))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+
+CHECKOUT_WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000, 30000)
+
+
+class PoolCheckoutMetrics:
+    """How long connection checkouts waited on the pool (including opening new connections)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histogram = Histogram(CHECKOUT_WAIT_BUCKETS_MS)
+        self._timeouts = 0
+
+    def observe(self, wait_ms: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self._histogram.observe(wait_ms)
+            if timed_out:
+                self._timeouts += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._histogram.to_dict(), "timeouts": self._timeouts}
+
+
+pool_metrics = PoolCheckoutMetrics()
+async_pool_metrics = PoolCheckoutMetrics()
+
+
+class _TimedCheckout:
+    """Pool mixin that records every checkout's wait in ``checkout_metrics``."""
+
+    checkout_metrics: PoolCheckoutMetrics
+
+    def _do_get(self):
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self.checkout_metrics.observe((time.perf_counter() - started) * 1000, timed_out)
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    checkout_metrics = pool_metrics
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    checkout_metrics = async_pool_metrics
+
+
+def _is_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite"
+
+
+def _async_url(url):
+    """``url`` with its backend's async driver."""
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver for {backend}; set ASYNC_DATABASE_URL")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+def _engine_options(url, poolclass=TimedQueuePool) -> Dict[str, Any]:
+    options = {
+        "echo": DB_ECHO,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "query_cache_size": DB_STATEMENT_CACHE_SIZE,
+    }
+    # In-memory SQLite keeps its single shared connection (SingletonThreadPool)
+    if _is_sqlite(url) and url.database in (None, "", ":memory:"):
+        return options
+    options.update(
+        poolclass=poolclass,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=DB_POOL_RECYCLE_SECONDS,
+    )
+    return options
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        # Negative cache_size is in KiB rather than pages
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    finally:
+        cursor.close()
+
+
+database_url = make_url(DATABASE_URL)
+engine = create_engine(database_url, **_engine_options(database_url))
+if _is_sqlite(database_url):
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+
+# Request handlers query through this engine without blocking the event loop;
+# batch jobs (screener, news crawler) keep the sync engine above
+async_database_url = make_url(ASYNC_DATABASE_URL) if ASYNC_DATABASE_URL else _async_url(database_url)
+async_engine = create_async_engine(async_database_url, **_engine_options(async_database_url, TimedAsyncQueuePool))
+if _is_sqlite(async_database_url):
+    event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+
+
+def _engine_stats(engine, metrics: PoolCheckoutMetrics) -> Dict[str, Any]:
+    pool = engine.pool
+    stats = {
+        "driver": engine.url.drivername,
+        "pool": type(pool).__name__,
+        "echo": engine.echo,
+        "pre_ping": DB_POOL_PRE_PING,
+        "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+    }
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            max_overflow=DB_MAX_OVERFLOW,
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=pool.overflow(),
+        )
+    stats["checkout_wait_ms"] = metrics.snapshot()
+    return stats
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Profile, pool occupancy and checkout wait histogram of the sync and async engines."""
+    return {
+        "sync": _engine_stats(engine, pool_metrics),
+        "async": _engine_stats(async_engine.sync_engine, async_pool_metrics),
+    }
 
 def get_db():
     db = Session(engine)
@@ -21,3 +189,11 @@ def create_db_and_tables():
 def get_session():
     with Session(engine) as session:
         yield session
+
+async def get_async_session():
+    """
+    Async session for ``async def`` endpoints. Loaded objects stay usable
+    after commit; sync helpers can run inside it via ``run_sync``.
+    """
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
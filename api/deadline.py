@@ -0,0 +1,62 @@
+import sys
+import time
+import types
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+# api.* and FinAdvisor.api.* can both be imported in one process (see
+# llm_client.get_llm_client); both must read the same ContextVar.
+_SHARED_SLOT = "_finadvisor_request_deadline"
+_slot = sys.modules.setdefault(_SHARED_SLOT, types.ModuleType(_SHARED_SLOT))
+if not hasattr(_slot, "var"):
+    _slot.var = ContextVar("request_deadline", default=None)
+_deadline: ContextVar = _slot.var
+
+# Upstream calls are never given less than this, so they fail fast rather than instantly
+MIN_TIMEOUT_SECONDS = 0.05
+
+
+class DeadlineExceeded(TimeoutError):
+    """The current request's time budget is used up."""
+
+
+def expires_at() -> Optional[float]:
+    """Absolute ``time.monotonic()`` expiry of the current request, or None without a deadline."""
+    return _deadline.get()
+
+
+def remaining() -> Optional[float]:
+    """Seconds left for the current request, or None without a deadline."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+@contextmanager
+def deadline_scope(seconds: float):
+    """
+    Give the code inside a time budget of ``seconds``. Nested scopes can only
+    tighten an outer deadline. The deadline follows the context into
+    ``asyncio.to_thread`` workers; plain threads need ``copy_context().run``.
+    """
+    deadline = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(deadline if outer is None else min(outer, deadline))
+    try:
+        yield
+    finally:
+        try:
+            _deadline.reset(token)
+        except ValueError:
+            # An async generator finalized from another context (e.g. client disconnect)
+            pass
+
+
+def timeout_for(default: float, what: str = "upstream call") -> float:
+    """``default`` clamped to the time left; raises DeadlineExceeded once the budget is gone."""
+    left = remaining()
+    if left is None:
+        return default
+    if left <= 0:
+        raise DeadlineExceeded(f"{what} deadline exceeded")
+    return max(MIN_TIMEOUT_SECONDS, min(default, left))
@@ -0,0 +1,173 @@
+import asyncio
+import json
+import os
+import random
+import re
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+# Offline stand-in for Gemini, selected with LLM_BACKEND=fake. It plugs in
+# underneath LLMClient, so the concurrency limit, timeouts and retries are
+# exercised exactly as against the real API.
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", 300))
+FAKE_LLM_JITTER_MS = float(os.getenv("FAKE_LLM_JITTER_MS", 100))
+FAKE_LLM_CHUNK_MS = float(os.getenv("FAKE_LLM_CHUNK_MS", 10))
+# Optional JSON file: {"react": [step, ...], "tools": [step, ...], "chat": "..."}
+FAKE_LLM_SCRIPT = os.getenv("FAKE_LLM_SCRIPT")
+
+# Default ReAct transcript; step N is replayed once the scratchpad holds N
+# observations, and the last step is repeated after that. "{question}" is
+# replaced with the user's question.
+DEFAULT_REACT_SCRIPT = [
+    "I should look up the latest stock data first.\n"
+    "Action: query_stock_data\n"
+    "Action Input: {question}",
+    "I should check the recent news and sentiment as well.\n"
+    "Action: get_company_news\n"
+    "Action Input: {question}",
+    "I now know the final answer\n"
+    "Final Answer: Based on the latest stock data and news sentiment, the company looks fairly valued. "
+    "Consider your risk profile and investment horizon before adding to the position.",
+]
+# Default tool-calling transcript; step N is replayed once N rounds of
+# function results have come back. A step is either a list of calls made in
+# one turn or the final answer text.
+DEFAULT_TOOL_SCRIPT = [
+    [
+        {"name": "query_stock_data", "args": {"company": "{question}"}},
+        {"name": "get_company_news", "args": {"company": "{question}"}},
+    ],
+    "Based on the latest stock data and news sentiment, the company looks fairly valued. "
+    "Consider your risk profile and investment horizon before adding to the position.",
+]
+DEFAULT_CHAT_RESPONSE = (
+    "Based on your profile, keep an emergency fund of six months of expenses, "
+    "invest regularly through diversified index funds, and review your allocation once a year."
+)
+
+_QUESTION_RE = re.compile(r"Question:\s*(?P<question>.*?)\nThought:", re.DOTALL)
+
+
+def _prompt_text(contents) -> str:
+    if isinstance(contents, str):
+        return contents
+    if isinstance(contents, (list, tuple)):
+        return "\n".join(_prompt_text(part) for part in contents)
+    return str(contents)
+
+
+def _token_count(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _fill(value, question: str):
+    if isinstance(value, str):
+        return value.replace("{question}", question)
+    if isinstance(value, dict):
+        return {key: _fill(item, question) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_fill(item, question) for item in value]
+    return value
+
+
+class FakeModels:
+    """Mirrors ``genai.Client().aio.models`` for the calls LLMClient makes."""
+
+    def __init__(self, react_script: List[str], chat_response: str, latency_ms: float, jitter_ms: float, chunk_ms: float,
+                 tool_script: Optional[List] = None):
+        self.react_script = react_script
+        self.tool_script = tool_script or DEFAULT_TOOL_SCRIPT
+        self.chat_response = chat_response
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.chunk_ms = chunk_ms
+
+    def _reply(self, prompt: str, config: Optional[Dict]) -> str:
+        questions = list(_QUESTION_RE.finditer(prompt))
+        if "Action Input:" in prompt and questions:
+            last = questions[-1]
+            # The format instructions above the question mention "Observation:" too
+            step = prompt[last.end():].count("Observation:")
+            text = self.react_script[min(step, len(self.react_script) - 1)]
+            # The agent input ends with "User Question: ..." after the user's context
+            question = last.group("question").rsplit("Question:", 1)[-1].strip()
+            text = text.replace("{question}", question)
+        else:
+            text = self.chat_response
+        for stop in (config or {}).get("stop_sequences") or []:
+            if stop in text:
+                text = text[:text.index(stop)]
+        return text
+
+    def _tool_reply(self, contents: List[Dict]):
+        """(text, function calls) for a structured tool-calling conversation."""
+        step, question = 0, ""
+        for content in contents:
+            parts = content.get("parts", [])
+            if any("function_response" in part for part in parts):
+                step += 1
+            elif content.get("role") == "user":
+                text = "".join(part.get("text", "") for part in parts)
+                # The agent input ends with "User Question: ..." after the user's context
+                question = text.rsplit("Question:", 1)[-1].strip().split("\n", 1)[0] or question
+        reply = _fill(self.tool_script[min(step, len(self.tool_script) - 1)], question)
+        if isinstance(reply, str):
+            return reply, []
+        return "", [SimpleNamespace(id=None, name=call["name"], args=call.get("args") or {}) for call in reply]
+
+    async def _think(self) -> None:
+        delay = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        await asyncio.sleep(max(0.0, delay) / 1000)
+
+    async def generate_content(self, model: str, contents, config: Optional[Dict] = None):
+        if (config or {}).get("tools") and isinstance(contents, list):
+            prompt = json.dumps(contents, default=str)
+            text, calls = self._tool_reply(contents)
+        else:
+            prompt = _prompt_text(contents)
+            text, calls = self._reply(prompt, config), []
+        await self._think()
+        usage = SimpleNamespace(prompt_token_count=_token_count(prompt),
+                                candidates_token_count=_token_count(text + json.dumps([c.args for c in calls])))
+        return SimpleNamespace(text=text, function_calls=calls, usage_metadata=usage)
+
+    async def generate_content_stream(self, model: str, contents, config: Optional[Dict] = None):
+        text = self._reply(_prompt_text(contents), config)
+        await self._think()
+
+        async def chunks():
+            words = re.findall(r"\S+\s*", text)
+            for i, word in enumerate(words):
+                if i:
+                    await asyncio.sleep(self.chunk_ms / 1000)
+                yield SimpleNamespace(text=word)
+        return chunks()
+
+
+class FakeGenaiClient:
+    """Drop-in for ``genai.Client`` that replays scripted responses with configurable latency."""
+
+    def __init__(
+        self,
+        react_script: Optional[List[str]] = None,
+        chat_response: str = DEFAULT_CHAT_RESPONSE,
+        latency_ms: float = FAKE_LLM_LATENCY_MS,
+        jitter_ms: float = FAKE_LLM_JITTER_MS,
+        chunk_ms: float = FAKE_LLM_CHUNK_MS,
+        tool_script: Optional[List] = None,
+    ):
+        models = FakeModels(react_script or DEFAULT_REACT_SCRIPT, chat_response, latency_ms, jitter_ms, chunk_ms,
+                            tool_script or DEFAULT_TOOL_SCRIPT)
+        self.aio = SimpleNamespace(models=models)
+
+    @classmethod
+    def from_env(cls) -> "FakeGenaiClient":
+        if not FAKE_LLM_SCRIPT:
+            return cls()
+        with open(FAKE_LLM_SCRIPT) as f:
+            script = json.load(f)
+        return cls(
+            react_script=script.get("react") or DEFAULT_REACT_SCRIPT,
+            chat_response=script.get("chat") or DEFAULT_CHAT_RESPONSE,
+            tool_script=script.get("tools") or DEFAULT_TOOL_SCRIPT,
+        )
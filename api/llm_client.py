@@ -0,0 +1,469 @@
+import asyncio
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import types
+import uuid
+from typing import Any, AsyncIterator, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import httpx
+from dotenv import load_dotenv
+from google import genai
+from google.genai import errors as genai_errors
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, SystemMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from . import deadline
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# "gemini", or "fake" to replay scripted responses offline (see fake_llm.py)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini").lower()
+LLM_MODEL = os.getenv("LLM_MODEL", "gemini-2.0-flash")
+# Upper bound on Gemini calls in flight across the whole process
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 8))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", 30))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 2))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", 0.5))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", 8))
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+_DONE = object()
+
+
+class LLMError(Exception):
+    """Raised when the LLM client is not configured."""
+
+
+class LLMResponse(NamedTuple):
+    text: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    tool_calls: Tuple[Dict[str, Any], ...] = ()  # {"id", "name", "args"} per requested function call
+
+
+def _is_retryable(error: BaseException) -> bool:
+    if isinstance(error, (asyncio.TimeoutError, httpx.TransportError)):
+        return True
+    if isinstance(error, genai_errors.APIError):
+        return error.code in RETRYABLE_STATUS
+    return False
+
+
+def _config(temperature: Optional[float], stop: Optional[List[str]], tools: Optional[Sequence[Dict]] = None,
+            system: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    config = {}
+    if temperature is not None:
+        config["temperature"] = temperature
+    if stop:
+        config["stop_sequences"] = list(stop)
+    if tools:
+        config["tools"] = [{"function_declarations": list(tools)}]
+    if system:
+        config["system_instruction"] = system
+    return config or None
+
+
+class LLMClient:
+    """
+    The one Gemini client of the process.
+
+    All calls run on a dedicated event loop thread through ``genai``'s async
+    API, so every caller (async routes, worker threads, the LangChain agent)
+    shares one connection pool and one concurrency limit. Each attempt gets a
+    timeout; timeouts, transport errors, 429 and 5xx responses are retried
+    with full-jitter exponential backoff. A stream is only retried before its
+    first chunk. Attempts and backoff stop at the caller's request deadline.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        backend: str = LLM_BACKEND,
+        model: str = LLM_MODEL,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        timeout: float = LLM_TIMEOUT_SECONDS,
+        max_retries: int = LLM_MAX_RETRIES,
+        backoff_base: float = LLM_BACKOFF_BASE_SECONDS,
+        backoff_max: float = LLM_BACKOFF_MAX_SECONDS,
+    ):
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.backend = backend
+        try:
+            if backend == "fake":
+                from .fake_llm import FakeGenaiClient
+                self._client = FakeGenaiClient.from_env()
+                logger.warning("LLM_BACKEND=fake: Gemini calls are answered by scripted responses")
+            else:
+                self._client = genai.Client(api_key=api_key) if api_key else None
+        except Exception as e:
+            logger.error(f"Failed to initialize Gemini client: {e}")
+            self._client = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+        self._stats = {"calls": 0, "retries": 0, "timeouts": 0, "failures": 0, "in_flight": 0, "peak_in_flight": 0}
+
+    @property
+    def available(self) -> bool:
+        return self._client is not None
+
+    # Event loop plumbing
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="llm-client", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def _submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def _retrying(self, attempt_call, timeout: float, expiry: Optional[float]):
+        """
+        Run ``attempt_call`` under the concurrency limit, retrying transient
+        failures. No attempt or backoff runs past ``expiry``, the caller's
+        request deadline (``time.monotonic()``), if any.
+        """
+        if self._client is None:
+            raise LLMError("Gemini client not initialized")
+        self._stats["calls"] += 1
+        attempt = 0
+        while True:
+            try:
+                async with self._semaphore:
+                    attempt_timeout = timeout
+                    if expiry is not None:
+                        left = expiry - time.monotonic()
+                        if left <= 0:
+                            raise deadline.DeadlineExceeded("LLM call deadline exceeded")
+                        attempt_timeout = min(timeout, left)
+                    self._stats["in_flight"] += 1
+                    self._stats["peak_in_flight"] = max(self._stats["peak_in_flight"], self._stats["in_flight"])
+                    try:
+                        return await attempt_call(attempt_timeout)
+                    finally:
+                        self._stats["in_flight"] -= 1
+            except Exception as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    self._stats["timeouts"] += 1
+                delay = self._backoff(attempt)
+                out_of_time = expiry is not None and time.monotonic() + delay >= expiry
+                if (attempt >= self.max_retries or out_of_time or not _is_retryable(e)
+                        or isinstance(e, deadline.DeadlineExceeded) or getattr(e, "no_retry", False)):
+                    self._stats["failures"] += 1
+                    raise
+                attempt += 1
+                self._stats["retries"] += 1
+                logger.warning(f"Gemini call failed ({type(e).__name__}: {e}); retry {attempt} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    # Runs on the client loop
+    async def _generate(self, prompt, model, config, timeout, expiry) -> LLMResponse:
+        async def attempt_call(timeout):
+            response = await asyncio.wait_for(
+                self._client.aio.models.generate_content(model=model, contents=prompt, config=config),
+                timeout=timeout
+            )
+            usage = response.usage_metadata
+            calls = getattr(response, "function_calls", None) or []
+            return LLMResponse(
+                text=response.text or "",
+                prompt_tokens=(usage.prompt_token_count or 0) if usage else 0,
+                completion_tokens=(usage.candidates_token_count or 0) if usage else 0,
+                tool_calls=tuple(
+                    {"id": call.id or f"call_{uuid.uuid4().hex[:12]}", "name": call.name, "args": dict(call.args or {})}
+                    for call in calls
+                ),
+            )
+        return await self._retrying(attempt_call, timeout, expiry)
+
+    async def _stream(self, prompt, model, config, timeout, expiry, emit) -> None:
+        async def attempt_call(timeout):
+            chunks = await asyncio.wait_for(
+                self._client.aio.models.generate_content_stream(model=model, contents=prompt, config=config),
+                timeout=timeout
+            )
+            iterator = chunks.__aiter__()
+            started = False
+            while True:
+                try:
+                    # The timeout applies to the gap between chunks
+                    chunk = await asyncio.wait_for(iterator.__anext__(), timeout=timeout)
+                except StopAsyncIteration:
+                    return
+                except Exception as e:
+                    # Part of the answer is already out; a retry would repeat it
+                    e.no_retry = started
+                    raise
+                if chunk.text:
+                    started = True
+                    emit(chunk.text)
+        await self._retrying(attempt_call, timeout, expiry)
+
+    # Public API. The request deadline is read here, in the caller's context;
+    # the client loop thread does not share it.
+    def _call_args(self, model, temperature, stop, timeout, tools=None, system=None):
+        config = _config(temperature, stop, tools, system)
+        return model or self.model, config, timeout or self.timeout, deadline.expires_at()
+
+    async def agenerate(self, prompt, *, model: Optional[str] = None, temperature: Optional[float] = None,
+                        stop: Optional[List[str]] = None, timeout: Optional[float] = None,
+                        tools: Optional[Sequence[Dict]] = None, system: Optional[str] = None) -> LLMResponse:
+        """``prompt`` is text or genai contents; ``tools`` are function declarations the model may call."""
+        coro = self._generate(prompt, *self._call_args(model, temperature, stop, timeout, tools, system))
+        return await asyncio.wrap_future(self._submit(coro))
+
+    def generate(self, prompt, *, model: Optional[str] = None, temperature: Optional[float] = None,
+                 stop: Optional[List[str]] = None, timeout: Optional[float] = None,
+                 tools: Optional[Sequence[Dict]] = None, system: Optional[str] = None) -> LLMResponse:
+        """Blocking variant for worker threads; never call it from the event loop."""
+        coro = self._generate(prompt, *self._call_args(model, temperature, stop, timeout, tools, system))
+        return self._submit(coro).result()
+
+    def stream(self, prompt, *, model: Optional[str] = None, temperature: Optional[float] = None,
+               stop: Optional[List[str]] = None, timeout: Optional[float] = None) -> Iterator[str]:
+        """Blocking streaming variant for worker threads: yields text chunks."""
+        chunks = queue.Queue()
+        coro = self._stream(prompt, *self._call_args(model, temperature, stop, timeout), chunks.put)
+        future = self._submit(coro)
+        future.add_done_callback(lambda _: chunks.put(_DONE))
+        try:
+            while True:
+                chunk = chunks.get()
+                if chunk is _DONE:
+                    break
+                yield chunk
+            future.result()
+        finally:
+            future.cancel()
+
+    async def astream(self, prompt, *, model: Optional[str] = None, temperature: Optional[float] = None,
+                      stop: Optional[List[str]] = None, timeout: Optional[float] = None) -> AsyncIterator[str]:
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue()
+
+        def emit(item):
+            loop.call_soon_threadsafe(chunks.put_nowait, item)
+
+        coro = self._stream(prompt, *self._call_args(model, temperature, stop, timeout), emit)
+        future = self._submit(coro)
+        future.add_done_callback(lambda _: emit(_DONE))
+        try:
+            while True:
+                chunk = await chunks.get()
+                if chunk is _DONE:
+                    break
+                yield chunk
+            future.result()
+        finally:
+            future.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.backend, "max_concurrency": self.max_concurrency, "timeout_seconds": self.timeout, **self._stats}
+
+
+# api.* and FinAdvisor.api.* can both end up imported in one process (the agent
+# imports through the package path). Keep the client in one process-wide slot
+# so there is a single connection pool and concurrency limit either way.
+_SHARED_SLOT = "_finadvisor_shared_llm_client"
+_shared_lock = threading.Lock()
+
+
+def get_llm_client() -> LLMClient:
+    with _shared_lock:
+        slot = sys.modules.get(_SHARED_SLOT)
+        if slot is None:
+            slot = types.ModuleType(_SHARED_SLOT)
+            slot.client = LLMClient(api_key=os.getenv("GOOGLE_API_KEY"))
+            sys.modules[_SHARED_SLOT] = slot
+        return slot.client
+
+
+def _messages_to_prompt(messages: List[BaseMessage]) -> str:
+    if len(messages) == 1:
+        return str(messages[0].content)
+    return "\n\n".join(f"{message.type.upper()}: {message.content}" for message in messages)
+
+
+def _message_text(content) -> str:
+    if isinstance(content, str):
+        return content
+    return "".join(part if isinstance(part, str) else part.get("text", "") for part in content)
+
+
+def _messages_to_contents(messages: List[BaseMessage]):
+    """(system instruction, genai contents) for a tool-calling conversation."""
+    system, contents, call_names = [], [], {}
+    for message in messages:
+        if isinstance(message, SystemMessage):
+            system.append(_message_text(message.content))
+        elif isinstance(message, AIMessage):
+            parts = [{"text": _message_text(message.content)}] if message.content else []
+            for call in message.tool_calls:
+                call_names[call["id"]] = call["name"]
+                parts.append({"function_call": {"name": call["name"], "args": call["args"]}})
+            contents.append({"role": "model", "parts": parts})
+        elif isinstance(message, ToolMessage):
+            try:
+                result = json.loads(message.content)
+            except (TypeError, ValueError):
+                result = _message_text(message.content)
+            part = {"function_response": {
+                "name": message.name or call_names.get(message.tool_call_id, "tool"),
+                "response": {"result": result},
+            }}
+            # All results answering one model turn go back together
+            previous = contents[-1] if contents else None
+            if previous and previous["role"] == "user" and "function_response" in previous["parts"][0]:
+                previous["parts"].append(part)
+            else:
+                contents.append({"role": "user", "parts": [part]})
+        else:
+            contents.append({"role": "user", "parts": [{"text": _message_text(message.content)}]})
+    return "\n\n".join(system) or None, contents
+
+
+_SCHEMA_KEYS = ("type", "description", "properties", "required", "items", "enum")
+
+
+def _gemini_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON schema trimmed to the subset Gemini function declarations accept."""
+    trimmed = {key: schema[key] for key in _SCHEMA_KEYS if key in schema}
+    if "properties" in trimmed:
+        trimmed["properties"] = {name: _gemini_schema(prop) for name, prop in trimmed["properties"].items()}
+    if "items" in trimmed:
+        trimmed["items"] = _gemini_schema(trimmed["items"])
+    return trimmed
+
+
+def function_declaration(tool) -> Dict[str, Any]:
+    """Gemini function declaration for a LangChain tool (or anything convert_to_openai_tool takes)."""
+    spec = convert_to_openai_tool(tool)["function"]
+    declaration = {"name": spec["name"], "description": spec.get("description", "")}
+    parameters = spec.get("parameters") or {}
+    # Gemini rejects object schemas without properties; omit them for no-argument tools
+    if parameters.get("properties"):
+        declaration["parameters"] = _gemini_schema(parameters)
+    return declaration
+
+
+class SharedGeminiChat(BaseChatModel):
+    """LangChain chat model backed by the shared LLMClient (pool, limit, timeouts, retries)."""
+
+    model: str = LLM_MODEL
+    temperature: Optional[float] = None
+    timeout: Optional[float] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "shared-gemini"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model": self.model, "temperature": self.temperature}
+
+    def _options(self, stop):
+        return {"model": self.model, "temperature": self.temperature, "stop": stop, "timeout": self.timeout}
+
+    def bind_tools(self, tools, **kwargs):
+        """Offer ``tools`` to the model as native function declarations."""
+        return self.bind(tools=[function_declaration(tool) for tool in tools], **kwargs)
+
+    @staticmethod
+    def _structured(messages: List[BaseMessage], tools) -> bool:
+        return bool(tools) or any(isinstance(message, ToolMessage) for message in messages)
+
+    def _request(self, messages: List[BaseMessage], stop, tools):
+        """Positional prompt and keyword options for the shared client."""
+        options = self._options(stop)
+        if not self._structured(messages, tools):
+            return _messages_to_prompt(messages), options
+        system, contents = _messages_to_contents(messages)
+        return contents, {**options, "tools": tools, "system": system}
+
+    @staticmethod
+    def _result(response: LLMResponse) -> ChatResult:
+        message = AIMessage(
+            content=response.text,
+            tool_calls=[
+                {"name": call["name"], "args": call["args"], "id": call["id"], "type": "tool_call"}
+                for call in response.tool_calls
+            ],
+            usage_metadata={
+                "input_tokens": response.prompt_tokens,
+                "output_tokens": response.completion_tokens,
+                "total_tokens": response.prompt_tokens + response.completion_tokens,
+            },
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, tools=None, **kwargs) -> ChatResult:
+        prompt, options = self._request(messages, stop, tools)
+        return self._result(get_llm_client().generate(prompt, **options))
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, tools=None, **kwargs) -> ChatResult:
+        prompt, options = self._request(messages, stop, tools)
+        return self._result(await get_llm_client().agenerate(prompt, **options))
+
+    @staticmethod
+    def _as_chunk(result: ChatResult) -> ChatGenerationChunk:
+        message = result.generations[0].message
+        return ChatGenerationChunk(message=AIMessageChunk(
+            content=message.content,
+            tool_call_chunks=[
+                {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": i}
+                for i, call in enumerate(message.tool_calls)
+            ],
+            usage_metadata=message.usage_metadata,
+        ))
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, tools=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        if self._structured(messages, tools):
+            # Function calls arrive whole; answer tool-calling turns in one chunk
+            yield self._as_chunk(self._generate(messages, stop, run_manager, tools=tools))
+            return
+        for text in get_llm_client().stream(_messages_to_prompt(messages), **self._options(stop)):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=text))
+            if run_manager:
+                run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, tools=None, **kwargs):
+        if self._structured(messages, tools):
+            yield self._as_chunk(await self._agenerate(messages, stop, run_manager, tools=tools))
+            return
+        async for text in get_llm_client().astream(_messages_to_prompt(messages), **self._options(stop)):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=text))
+            if run_manager:
+                await run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
+
+
+def get_langchain_llm(model: Optional[str] = None, temperature: Optional[float] = None) -> SharedGeminiChat:
+    """LangChain chat model for agents, routed through the shared client."""
+    return SharedGeminiChat(model=model or LLM_MODEL, temperature=temperature)
@@ -1,7 +1,7 @@
 # main.py
 from fastapi import FastAPI, Depends, HTTPException
 from sqlmodel import Session, select
-from .database import create_db_and_tables, get_session
+from .database import create_db_and_tables, get_session, pool_stats
 from .models import Profile, Chat, Portfolio, ProfileCreate, ProfileOut
 from google import genai
 import uuid
@@ -13,11 +13,13 @@ from dotenv import load_dotenv
 import os
 import yfinance as yf
 import logging
+import asyncio
 
 from .middlewares import RateLimitMiddleware, AuthMiddleware, LoggerMiddleware
 from sqlalchemy.exc import SQLAlchemyError
 # Use relative import
 from .database import engine  # Changed from api.database
+from .migrations import run_migrations
 
 load_dotenv()
 
@@ -34,10 +36,17 @@ app.add_middleware(
 )
 # Fix these imports too
 from . import screener  # Changed from api.screener
+from . import news_ingestion
+from . import chat_history
 # Remove this redundant import
 # from api import routers  # Remove this line
 
-app.add_middleware(RateLimitMiddleware)
+# Global request limit; raise it (e.g. for load tests) via env
+app.add_middleware(
+    RateLimitMiddleware,
+    limit=int(os.getenv("RATE_LIMIT_REQUESTS", 1)),
+    period=int(os.getenv("RATE_LIMIT_PERIOD_SECONDS", 2))
+)
 app.add_middleware(AuthMiddleware)
 app.add_middleware(LoggerMiddleware)
 logger = logging.getLogger(__name__)
@@ -58,9 +67,12 @@ def on_startup():
     try:
         logger.info("Application startup initiated")
         
-        # Create database tables
+        # Create database tables, then bring existing ones up to date
         create_db_and_tables()
         logger.info("Database tables created successfully")
+        applied = run_migrations(engine)
+        if applied:
+            logger.info(f"Schema migrations applied: {', '.join(applied)}")
         
         # Get database session
         try:
@@ -82,6 +94,59 @@ def on_startup():
         # You might want to set a flag to indicate incomplete initialization
 
 
+@app.on_event("startup")
+async def start_news_crawler():
+    """
+    Keep the NewsArticle store fresh in the background so news endpoints
+    never have to scrape inside the request.
+    """
+    if os.getenv("NEWS_CRAWL_ENABLED", "true").lower() != "true":
+        logger.info("Background news crawler disabled")
+        return
+    app.state.news_crawler = asyncio.create_task(news_ingestion.run_news_crawler())
+    logger.info("Background news crawler started")
+
+
+@app.on_event("shutdown")
+async def stop_news_crawler():
+    crawler = getattr(app.state, "news_crawler", None)
+    if crawler:
+        crawler.cancel()
+
+
+@app.on_event("startup")
+async def start_chat_archiver():
+    """Move chats older than CHAT_ARCHIVE_AFTER_DAYS out of the hot chat table."""
+    if os.getenv("CHAT_ARCHIVE_ENABLED", "true").lower() != "true":
+        logger.info("Background chat archiver disabled")
+        return
+    app.state.chat_archiver = asyncio.create_task(chat_history.run_chat_archiver())
+    logger.info("Background chat archiver started")
+
+
+@app.on_event("shutdown")
+async def stop_chat_archiver():
+    archiver = getattr(app.state, "chat_archiver", None)
+    if archiver:
+        archiver.cancel()
+
+
+@app.on_event("startup")
+async def start_chat_job_workers():
+    """Start the worker pool that processes queued /chat/jobs."""
+    await chat.job_queue.start()
+
+
+@app.on_event("shutdown")
+async def stop_chat_job_workers():
+    await chat.job_queue.stop()
+
 @app.get("/")
 async def root():
-    return {"message": "Welcome to the FinAdvisor API!"}
\ No newline at end of file
+    return {"message": "Welcome to the FinAdvisor API!"}
+
+
+@app.get("/metrics/db")
+def db_metrics():
+    """Database engine profile, connection pool occupancy and checkout wait times."""
+    return pool_stats()
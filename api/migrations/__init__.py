@@ -0,0 +1,46 @@
+import logging
+from datetime import datetime, timezone
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from . import m0001_hot_query_indexes
+
+logger = logging.getLogger(__name__)
+
+# Applied in order, once each. ``create_all`` only creates missing tables, so
+# changes to existing tables (indexes, columns) ship as a migration module
+# with an ``ID`` and a list of raw ``UP`` statements. Statements must be
+# idempotent (IF [NOT] EXISTS): fresh databases already match the models.
+MIGRATIONS = [
+    m0001_hot_query_indexes,
+]
+
+
+def run_migrations(engine) -> List[str]:
+    """Apply pending migrations, each in its own transaction; returns the IDs applied."""
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations (id VARCHAR PRIMARY KEY, applied_at VARCHAR NOT NULL)"
+        ))
+        applied = set(connection.execute(text("SELECT id FROM schema_migrations")).scalars())
+
+    newly_applied = []
+    for migration in MIGRATIONS:
+        if migration.ID in applied:
+            continue
+        try:
+            with engine.begin() as connection:
+                for statement in migration.UP:
+                    connection.execute(text(statement))
+                connection.execute(
+                    text("INSERT INTO schema_migrations (id, applied_at) VALUES (:id, :applied_at)"),
+                    {"id": migration.ID, "applied_at": datetime.now(timezone.utc).isoformat()},
+                )
+        except IntegrityError:
+            # Another worker applied it first
+            continue
+        logger.info(f"Applied migration {migration.ID}")
+        newly_applied.append(migration.ID)
+    return newly_applied
@@ -0,0 +1,6 @@
+"""Apply pending schema migrations: python -m FinAdvisor.api.migrations"""
+from ..database import engine
+from . import run_migrations
+
+applied = run_migrations(engine)
+print(f"Applied: {', '.join(applied)}" if applied else "Schema is up to date")
@@ -0,0 +1,35 @@
+"""
+Index only what the hot queries use.
+
+StockData and Portfolio carried a single-column index on every numeric
+field, none of which any query filters or sorts on; each screener refresh
+paid to maintain them. Chat history (user_id, newest first, LIMIT n) had
+only a user_id index and sorted every user's chats to page them.
+"""
+
+ID = "0001_hot_query_indexes"
+
+_UNUSED_INDEXES = [
+    "ix_stock_data_current_price",
+    "ix_stock_data_pe_ratio",
+    "ix_stock_data_pb_ratio",
+    "ix_stock_data_dividend_yield",
+    "ix_stock_data_eps",
+    "ix_stock_data_book_value",
+    "ix_stock_data_market_cap",
+    "ix_stock_data_volume",
+    "ix_portfolio_equity_amt",
+    "ix_portfolio_cash_amt",
+    "ix_portfolio_fd_amt",
+    "ix_portfolio_debt_amt",
+    "ix_portfolio_real_estate_amt",
+    "ix_portfolio_bonds_amt",
+    "ix_portfolio_crypto_amt",
+]
+
+UP = [
+    'CREATE INDEX IF NOT EXISTS ix_chat_user_id_timestamp_id ON chat (user_id, "timestamp", id)',
+    # Its leading column makes the composite index cover user_id lookups
+    "DROP INDEX IF EXISTS ix_chat_user_id",
+    *(f"DROP INDEX IF EXISTS {name}" for name in _UNUSED_INDEXES),
+]
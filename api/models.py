@@ -1,14 +1,25 @@
 # models.py
 from sqlmodel import Field, SQLModel, Relationship, Session, create_engine
 from typing import Optional, List, Union
-from datetime import datetime
+from datetime import datetime, date
 import uuid
-from sqlalchemy import Column, String, TIMESTAMP, func
+from sqlalchemy import Column, LargeBinary, String, TIMESTAMP, Index, UniqueConstraint, func
+from sqlalchemy.dialects import sqlite
 from pydantic import EmailStr, validator, BaseModel
 
 # Create a single metadata instance
 metadata = SQLModel.metadata
 
+# SQLite compares timestamps as text. Store and bind chat timestamps in the
+# format CURRENT_TIMESTAMP (the server default) writes, so keyset comparisons
+# against a cursor see equal seconds as equal; the id breaks ties within a second
+ChatTimestamp = TIMESTAMP(timezone=True).with_variant(
+    sqlite.DATETIME(
+        storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"
+    ),
+    "sqlite",
+)
+
 class Profile(SQLModel, table=True):
     __tablename__ = "user"
     __table_args__ = {"extend_existing": True}
@@ -118,13 +129,37 @@ class ProfileOut(BaseModel):
 
 class Chat(SQLModel, table=True):
     __tablename__ = "chat"
-    __table_args__ = {"extend_existing": True}  # Add this line
+    __table_args__ = (
+        # A user's chats newest first (history, context backfill, retrieval); also serves user_id lookups
+        Index("ix_chat_user_id_timestamp_id", "user_id", "timestamp", "id"),
+        {"extend_existing": True},
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
-    user_id: uuid.UUID = Field(foreign_key="user.id", index=True)
+    user_id: uuid.UUID = Field(foreign_key="user.id")
     human_message: str = Field()
     ai_message: str = Field()
     timestamp: datetime = Field(
+        sa_column=Column(
+            ChatTimestamp,
+            server_default=func.now()
+        )
+    )
+
+
+class ChatArchive(SQLModel, table=True):
+    """Chats moved out of ``chat`` by the archiver; messages are stored zlib-compressed."""
+    __tablename__ = "chat_archive"
+    __table_args__ = (
+        Index("ix_chat_archive_user_id_timestamp_id", "user_id", "timestamp", "id"),
+        {"extend_existing": True},
+    )
+
+    id: int = Field(primary_key=True)  # the original chat id
+    user_id: uuid.UUID = Field(foreign_key="user.id")
+    timestamp: datetime = Field(sa_column=Column(ChatTimestamp, nullable=False))
+    payload: bytes = Field(sa_column=Column(LargeBinary, nullable=False))  # zlib(JSON [human, ai])
+    archived_at: datetime = Field(
         sa_column=Column(
             TIMESTAMP(timezone=True),
             server_default=func.now()
@@ -132,6 +167,27 @@ class Chat(SQLModel, table=True):
     )
 
 
+class ChatContext(SQLModel, table=True):
+    """Rolling per-user conversation context, updated after every chat message."""
+    __tablename__ = "chat_context"
+    __table_args__ = {"extend_existing": True}
+
+    user_id: uuid.UUID = Field(foreign_key="user.id", primary_key=True)
+    summary: str = Field(default="")  # extractive summary of turns older than the window
+    recent_turns: str = Field(default="[]")  # JSON list of {"user": ..., "ai": ...}, oldest first
+    recent_tokens: int = Field(default=0)
+    summarized_turns: int = Field(default=0)
+    last_chat_id: Optional[int] = Field(default=None, nullable=True)
+    updated_at: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column(
+            TIMESTAMP(timezone=True),
+            server_default=func.now(),
+            onupdate=func.now()
+        )
+    )
+
+
 class UserLogin(SQLModel, table=True):
     __tablename__ = "user_login"
     __table_args__ = {"extend_existing": True}  # Add this line
@@ -153,13 +209,13 @@ class Portfolio(SQLModel, table=True):
     
     portfolio_id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     user_id: uuid.UUID = Field(foreign_key="user.id", index=True)
-    equity_amt: Optional[float] = Field(default=None, index=True)
-    cash_amt: Optional[float] = Field(default=None, index=True)
-    fd_amt: Optional[float] = Field(default=None, index=True)
-    debt_amt: Optional[float] = Field(default=None, index=True)
-    real_estate_amt: Optional[float] = Field(default=None, index=True)
-    bonds_amt: Optional[float] = Field(default=None, index=True)
-    crypto_amt: Optional[float] = Field(default=None, index=True)
+    equity_amt: Optional[float] = Field(default=None)
+    cash_amt: Optional[float] = Field(default=None)
+    fd_amt: Optional[float] = Field(default=None)
+    debt_amt: Optional[float] = Field(default=None)
+    real_estate_amt: Optional[float] = Field(default=None)
+    bonds_amt: Optional[float] = Field(default=None)
+    crypto_amt: Optional[float] = Field(default=None)
     
     created_at: datetime = Field(
         sa_column=Column(
@@ -185,14 +241,14 @@ class StockData(SQLModel, table=True):
     stock_name: str = Field(index=True)
     stock_ticker: str = Field(sa_column=Column(String, unique=True, nullable=False))
     sector: Optional[str] = Field(default=None, index=True)
-    current_price: float = Field(index=True)
-    pe_ratio: Optional[float] = Field(default=None, index=True)
-    pb_ratio: Optional[float] = Field(default=None, index=True)
-    dividend_yield: Optional[float] = Field(default=None, index=True)
-    eps: Optional[float] = Field(default=None, index=True)
-    book_value: Optional[float] = Field(default=None, index=True)
-    market_cap: Optional[float] = Field(default=None, index=True)
-    volume: Optional[int] = Field(default=None, index=True)
+    current_price: float = Field()
+    pe_ratio: Optional[float] = Field(default=None)
+    pb_ratio: Optional[float] = Field(default=None)
+    dividend_yield: Optional[float] = Field(default=None)
+    eps: Optional[float] = Field(default=None)
+    book_value: Optional[float] = Field(default=None)
+    market_cap: Optional[float] = Field(default=None)
+    volume: Optional[int] = Field(default=None)
     last_updated: datetime = Field(
         sa_column=Column(
             TIMESTAMP(timezone=True),
@@ -202,6 +258,55 @@ class StockData(SQLModel, table=True):
     )
 
 
+class NewsArticle(SQLModel, table=True):
+    __tablename__ = "news_article"
+    __table_args__ = (
+        Index("ix_news_article_ticker_published_at", "ticker", "published_at"),
+        UniqueConstraint("ticker", "content_hash", name="uq_news_article_ticker_content_hash"),
+        {"extend_existing": True},
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    ticker: str = Field(nullable=False)  # NSE symbol without the .NS suffix
+    title: str = Field(nullable=False)
+    description: Optional[str] = Field(default=None, nullable=True)
+    link: Optional[str] = Field(default=None, nullable=True)
+    content_hash: str = Field(nullable=False)
+    sentiment_label: str = Field(nullable=False)
+    sentiment_score: float = Field(nullable=False)
+    published_at: datetime = Field(sa_column=Column(TIMESTAMP(timezone=True), nullable=False))
+    fetched_at: datetime = Field(
+        sa_column=Column(
+            TIMESTAMP(timezone=True),
+            server_default=func.now()
+        )
+    )
+
+
+class NewsCrawlState(SQLModel, table=True):
+    __tablename__ = "news_crawl_state"
+    __table_args__ = {"extend_existing": True}
+
+    ticker: str = Field(primary_key=True)
+    last_crawled_at: datetime = Field(sa_column=Column(TIMESTAMP(timezone=True), nullable=False))
+    articles_stored: int = Field(default=0)
+
+
+class SentimentDaily(SQLModel, table=True):
+    """Per-ticker daily news sentiment, maintained incrementally by the news crawler."""
+    __tablename__ = "sentiment_daily"
+    __table_args__ = {"extend_existing": True}
+
+    ticker: str = Field(primary_key=True)
+    day: date = Field(primary_key=True)
+    article_count: int = Field(default=0)
+    positive_count: int = Field(default=0)
+    negative_count: int = Field(default=0)
+    score_sum: float = Field(default=0.0)  # sum of signed scores (+positive / -negative)
+    mean_score: float = Field(default=0.0)
+    ewm_score: float = Field(default=0.0)
+
+
 # Additional response models for consistency
 class ChatOut(BaseModel):
     id: int
@@ -211,6 +316,11 @@ class ChatOut(BaseModel):
     timestamp: datetime
 
 
+class ChatHistoryPage(BaseModel):
+    chats: List[ChatOut]  # newest first
+    next_cursor: Optional[str] = None  # pass as ``before`` for the next (older) page; None at the end
+
+
 class PortfolioOut(BaseModel):
     portfolio_id: uuid.UUID
     user_id: uuid.UUID
@@ -238,4 +348,13 @@ class StockDataOut(BaseModel):
     book_value: Optional[float]
     market_cap: Optional[float]
     volume: Optional[int]
-    last_updated: datetime
\ No newline at end of file
+    last_updated: datetime
+
+
+class SentimentDailyOut(BaseModel):
+    day: date
+    article_count: int
+    positive_count: int
+    negative_count: int
+    mean_score: float
+    ewm_score: float
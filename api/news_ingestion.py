@@ -0,0 +1,209 @@
+import asyncio
+import hashlib
+import logging
+import os
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional
+
+from sqlmodel import Session, select
+from sqlalchemy import or_, desc
+
+from .models import NewsArticle, NewsCrawlState
+from .database import engine
+from .sentiment_history import update_daily_sentiment
+
+logger = logging.getLogger(__name__)
+
+NEWS_CRAWL_INTERVAL_SECONDS = int(os.getenv("NEWS_CRAWL_INTERVAL_SECONDS", 30 * 60))
+NEWS_ARTICLES_PER_TICKER = int(os.getenv("NEWS_ARTICLES_PER_TICKER", 10))
+
+
+def normalize_ticker(ticker: str) -> str:
+    """Store tickers as bare NSE symbols ('RELIANCE.NS' -> 'RELIANCE')."""
+    ticker = ticker.strip().upper()
+    for suffix in (".NS", ".BO"):
+        if ticker.endswith(suffix):
+            return ticker[:-len(suffix)]
+    return ticker
+
+
+def content_hash(title: str, description: Optional[str] = "") -> str:
+    """Hash of the normalized article text, used to catch re-posted stories."""
+    text = " ".join(f"{title} {description or ''}".lower().split())
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _parse_pub_date(pub_date: str) -> datetime:
+    try:
+        published = parsedate_to_datetime(pub_date)
+        if published.tzinfo is None:
+            published = published.replace(tzinfo=timezone.utc)
+        return published
+    except (TypeError, ValueError):
+        return datetime.now(timezone.utc)
+
+
+def store_scored_articles(db: Session, ticker: str, scored: List[Dict]) -> List[NewsArticle]:
+    """
+    Insert scored articles for ``ticker`` that are not stored yet.
+    An article is a duplicate if its link or its content hash is already known.
+    Returns the newly added rows (the caller commits).
+    """
+    ticker = normalize_ticker(ticker)
+    candidates = []
+    for item in scored:
+        if item.get("error") or "sentiment" not in item:
+            continue
+        candidates.append((item, content_hash(item["title"], item.get("description"))))
+    if not candidates:
+        return []
+
+    links = [item["link"] for item, _ in candidates if item.get("link")]
+    hashes = [digest for _, digest in candidates]
+    existing = db.exec(
+        select(NewsArticle.link, NewsArticle.content_hash)
+        .where(NewsArticle.ticker == ticker)
+        .where(or_(NewsArticle.link.in_(links), NewsArticle.content_hash.in_(hashes)))
+    ).all()
+    seen_links = {link for link, _ in existing if link}
+    seen_hashes = {digest for _, digest in existing}
+
+    added = []
+    for item, digest in candidates:
+        link = item.get("link") or None
+        if digest in seen_hashes or (link and link in seen_links):
+            continue
+        seen_hashes.add(digest)
+        if link:
+            seen_links.add(link)
+
+        article = NewsArticle(
+            ticker=ticker,
+            title=item["title"],
+            description=item.get("description"),
+            link=link,
+            content_hash=digest,
+            sentiment_label=item["sentiment"]["label"],
+            sentiment_score=item["sentiment"]["score"],
+            published_at=_parse_pub_date(item.get("pub_date", "")),
+            fetched_at=datetime.now(timezone.utc)
+        )
+        db.add(article)
+        added.append(article)
+    return added
+
+
+def _filter_unseen(db: Session, ticker: str, articles: List[Dict]) -> List[Dict]:
+    """Drop scraped articles we already stored so they are not scored again."""
+    links = [article["link"] for article in articles if article.get("link")]
+    if not links:
+        return articles
+    known = set(db.exec(
+        select(NewsArticle.link)
+        .where(NewsArticle.ticker == ticker)
+        .where(NewsArticle.link.in_(links))
+    ).all())
+    return [article for article in articles if article.get("link") not in known]
+
+
+def crawl_ticker(db: Session, ticker: str) -> int:
+    """Scrape, score and store the latest news for one ticker. Returns rows added."""
+    # Import here so the sentiment model only loads where news is crawled
+    from FinAdvisor.agent.sentiment import scraping_google_news, score_articles
+
+    ticker = normalize_ticker(ticker)
+    articles = scraping_google_news(ticker, max_articles=NEWS_ARTICLES_PER_TICKER)
+    fresh = _filter_unseen(db, ticker, articles)
+    added = store_scored_articles(db, ticker, score_articles(fresh)) if fresh else []
+    if added:
+        update_daily_sentiment(db, ticker, added)
+
+    state = db.get(NewsCrawlState, ticker)
+    if state is None:
+        state = NewsCrawlState(ticker=ticker, last_crawled_at=datetime.now(timezone.utc))
+    state.last_crawled_at = datetime.now(timezone.utc)
+    state.articles_stored += len(added)
+    db.add(state)
+    db.commit()
+    return len(added)
+
+
+def crawl_all_news(db: Session) -> Dict:
+    """
+    Crawl news for every ticker in the screener universe.
+
+    Returns:
+        Dictionary with operation results
+    """
+    from .screener import get_all_stock_codes
+
+    tickers = get_all_stock_codes()
+    added_count = 0
+    errors = []
+
+    for ticker in tickers:
+        try:
+            added_count += crawl_ticker(db, ticker)
+        except Exception as e:
+            db.rollback()
+            error_msg = f"Error crawling news for {ticker}: {str(e)}"
+            logger.error(error_msg)
+            errors.append(error_msg)
+
+    result = {
+        "success": len(errors) < len(tickers),
+        "message": "News crawl completed",
+        "tickers": len(tickers),
+        "articles_added": added_count,
+        "errors": len(errors)
+    }
+    if errors:
+        result["sample_errors"] = errors[:10]
+    logger.info(f"News crawl completed: {added_count} new articles, {len(errors)} errors")
+    return result
+
+
+def _crawl_all_news_once() -> Dict:
+    with Session(engine) as session:
+        return crawl_all_news(session)
+
+
+async def run_news_crawler(interval_seconds: int = NEWS_CRAWL_INTERVAL_SECONDS):
+    """Background loop that keeps the news store fresh."""
+    while True:
+        try:
+            await asyncio.to_thread(_crawl_all_news_once)
+        except Exception as e:
+            logger.error(f"News crawler iteration failed: {str(e)}")
+        await asyncio.sleep(interval_seconds)
+
+
+def get_stored_news(db: Session, ticker: str, limit: int = 10) -> Optional[List[Dict]]:
+    """
+    Read the latest stored articles for ``ticker`` in the same shape as
+    ``get_sentiment``. Returns None if the ticker has never been crawled.
+    """
+    ticker = normalize_ticker(ticker)
+    if db.get(NewsCrawlState, ticker) is None:
+        return None
+
+    rows = db.exec(
+        select(NewsArticle)
+        .where(NewsArticle.ticker == ticker)
+        .order_by(desc(NewsArticle.published_at))
+        .limit(limit)
+    ).all()
+    if not rows:
+        return [{
+            "error": "No news articles found for the specified company.",
+            "ticker": ticker
+        }]
+
+    return [{
+        'title': row.title,
+        'description': row.description or '',
+        'sentiment': {"label": row.sentiment_label, "score": row.sentiment_score},
+        'link': row.link or '',
+        'pub_date': row.published_at.isoformat()
+    } for row in rows]
@@ -1,17 +1,33 @@
-from ..models import Chat, Profile, Portfolio
-from ..database import get_session
+from ..models import Chat, ChatHistoryPage, Profile, Portfolio
+from ..database import get_async_session, get_session, engine
+from ..chat_context import record_turn
+from ..chat_history import CHAT_HISTORY_MAX_PAGE_SIZE, CHAT_HISTORY_PAGE_SIZE, decode_cursor, get_history_page
+from ..chat_retrieval import chat_index, format_relevant_turns
+from ..user_context import UserSnapshot, aget_user_snapshot, get_user_snapshot, update_snapshot_history
+from ..chat_jobs import ChatJob, ChatJobQueue, JobQueueFull
+from ..llm_client import get_llm_client
+from .. import deadline
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from starlette.requests import Request
 import uuid
+from dataclasses import replace
+from typing import Optional
+import asyncio
+import json
+import logging
+import threading
+import time
 import yfinance as yf
-from ..utils import chat_with_gemini
+from ..utils import chat_with_gemini, stream_chat_with_gemini
 from dotenv import load_dotenv
 from datetime import date, timedelta, datetime
 import os
 import finnhub
 from ..bertmodel_loader import tokenizer, model
-from ..OAuth2 import get_current_user, authenticate_user, verify_password
+from ..OAuth2 import aget_current_user, get_current_user, authenticate_user, verify_password
 from fastapi.security import OAuth2PasswordBearer
 import sys
 from pathlib import Path
@@ -19,7 +35,9 @@ parent_dir = str(Path(__file__).parent.parent.parent.parent)
 if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 
-from FinAdvisor.agent.finagent import financial_advice
+from FinAdvisor.agent.finagent import (
+    financial_advice, stream_financial_advice, tool_cache, ticker_resolver, response_cache, agent_metrics
+)
 # Create OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="user/token")
 
@@ -30,6 +48,24 @@ router = APIRouter(
     tags=["Chat"]
 )
 
+logger = logging.getLogger(__name__)
+
+# Longest prompt either advisor accepts
+MAX_PROMPT_LENGTH = 1000
+
+# Each advisor branch gets this long before its answer is dropped
+CHAT_BRANCH_TIMEOUT_SECONDS = float(os.getenv("CHAT_BRANCH_TIMEOUT_SECONDS", 60))
+
+# End-to-end time budget per endpoint; it flows into the agent loop, its tools and every upstream call
+CHAT_DEADLINE_SECONDS = float(os.getenv("CHAT_DEADLINE_SECONDS", 60))
+CHAT_STREAM_DEADLINE_SECONDS = float(os.getenv("CHAT_STREAM_DEADLINE_SECONDS", 90))
+CHAT_JOB_DEADLINE_SECONDS = float(os.getenv("CHAT_JOB_DEADLINE_SECONDS", 120))
+
+# Background chat jobs: concurrent jobs, waiting jobs, and how long results are kept
+CHAT_JOB_WORKERS = int(os.getenv("CHAT_JOB_WORKERS", 4))
+CHAT_JOB_MAX_QUEUE = int(os.getenv("CHAT_JOB_MAX_QUEUE", 100))
+CHAT_JOB_RESULT_TTL_SECONDS = float(os.getenv("CHAT_JOB_RESULT_TTL_SECONDS", 600))
+
 finnhub_client = finnhub.Client(api_key=finhub_api_key)
 def fetch_news(ticker:str)->str:
     date_today= str(date.today())
@@ -37,47 +73,31 @@ def fetch_news(ticker:str)->str:
     news = finnhub_client.company_news(ticker, _from=date_past, to=date_today)
     return news
 
-def gemini_financial_advice(user_id: uuid.UUID, prompt: str, db: Session = Depends(get_session)):
-    try:
-        if not prompt:
-            raise HTTPException(status_code=400, detail="Prompt cannot be empty")
-        if len(prompt) > 1000:
-            raise HTTPException(status_code=400, detail="Prompt is too long. Please limit to 1000 characters.")
-        hstr= db.exec(select(Chat).where(Chat.user_id==user_id)).all()
-        history = ""
-        for chat in hstr:
-            history += "User:"+chat.human_message + " AI: " + chat.ai_message
-        user_info = db.exec(select(Profile).where(Profile.id==user_id)).first()
-        portfolio = db.exec(select(Portfolio).where(Portfolio.user_id==user_id)).first()
-        username = user_info.username if user_info else "Unknown User"
-        age= user_info.age if user_info else "Unknown Age"
-        equity_amt = portfolio.equity_amt if portfolio else "Unknown Equity Amount"
-        cash_amt = portfolio.cash_amt if portfolio else "Unknown Cash Amount"
-        fd_amt = portfolio.fd_amt if portfolio else "Unknown FD Amount"
-        debt_amt = portfolio.debt_amt if portfolio else "Unknown Debt Amount"
-        real_estate_amt = portfolio.real_estate_amt if portfolio else "Unknown Real Estate Amount"
-        bonds_amt = portfolio.bonds_amt if portfolio else "Unknown Bonds Amount"
-        crypto_amt = portfolio.crypto_amt if portfolio else "Unknown Crypto Amount"
-
-        if not user_info:
-            raise HTTPException(status_code=404, detail="User not found")
-        context = f"""Context: {history}
+def _validate_prompt(prompt) -> None:
+    """400 for prompts neither advisor accepts; checked before any branch starts."""
+    if not prompt or not isinstance(prompt, str):
+        raise HTTPException(status_code=400, detail="Prompt is required")
+    if len(prompt) > MAX_PROMPT_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Prompt is too long. Please limit to {MAX_PROMPT_LENGTH} characters.")
+
+def build_gemini_context(user_id: uuid.UUID, prompt: str, db: Session, snapshot: Optional[UserSnapshot] = None) -> str:
+    """Validate the prompt and build the FinSaathi prompt with the user's history and data."""
+    _validate_prompt(prompt)
+    snapshot = snapshot or get_user_snapshot(db, user_id)
+    if not snapshot:
+        raise HTTPException(status_code=404, detail="User not found")
+    return f"""Context: {snapshot.history}
 You are a financial advisor FinSaathi. Answer the question based on the context provided and the user data.
 
-User Data:
-- User: {username}
-- Age: {age}
-- Equity Amount: {equity_amt}
-- Cash Amount: {cash_amt}
-- FD Amount: {fd_amt}
-- Debt Amount: {debt_amt}
-- Real Estate Amount: {real_estate_amt}
-- Bonds Amount: {bonds_amt}
-- Crypto Amount: {crypto_amt}
+{snapshot.prompt_fragment}
 
 Take the user's financial situation, goals and age into account when responding.
 
 User Question: {prompt}"""
+
+def gemini_financial_advice(user_id: uuid.UUID, prompt: str, db: Session = Depends(get_session), snapshot: Optional[UserSnapshot] = None):
+    try:
+        context = build_gemini_context(user_id, prompt, db, snapshot)
         
         # Call Gemini API
         response = chat_with_gemini(context)
@@ -88,50 +108,452 @@ User Question: {prompt}"""
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)+ " An error occurred while communicating with the Gemini API.")
 
+def stream_gemini_financial_advice(user_id: uuid.UUID, prompt: str, db: Session, snapshot: Optional[UserSnapshot] = None):
+    """Streaming FinSaathi; yields the same event dicts as stream_financial_advice."""
+    try:
+        context = build_gemini_context(user_id, prompt, db, snapshot)
+        parts = []
+        for text in stream_chat_with_gemini(context):
+            parts.append(text)
+            yield {"event": "token", "text": text}
+        if not parts:
+            yield {"event": "error", "message": "Failed to get a response from the Gemini API."}
+            return
+        yield {"event": "answer", "text": "".join(parts)}
+    except HTTPException as e:
+        yield {"event": "error", "message": str(e.detail)}
+    except Exception as e:
+        yield {"event": "error", "message": str(e) + " An error occurred while communicating with the Gemini API."}
+
+def _run_with_own_session(advisor, user_id: uuid.UUID, prompt: str, snapshot: Optional[UserSnapshot]):
+    """Run an advisor in a worker thread with its own DB session (sessions are not thread-safe)."""
+    with Session(engine) as session:
+        return advisor(user_id, prompt, session, snapshot)
+
+def _prepare_snapshot(user_id: uuid.UUID, prompt: str, snapshot: Optional[UserSnapshot]) -> Optional[UserSnapshot]:
+    """
+    The user's snapshot (loaded if not given) with the older turns most
+    relevant to ``prompt`` appended to its history, for this request only.
+    """
+    with Session(engine) as session:
+        if snapshot is None:
+            snapshot = get_user_snapshot(session, user_id)
+        if snapshot is None:
+            return None
+        try:
+            turns = chat_index.relevant_turns(session, user_id, prompt, exclude=snapshot.recent_chat_ids)
+        except Exception as e:
+            logger.error(f"Chat history retrieval failed: {e}")
+            return snapshot
+    if not turns:
+        return snapshot
+    return replace(snapshot, history=f"{snapshot.history}\n\n{format_relevant_turns(turns)}")
+
+async def _run_branch(name: str, advisor, user_id: uuid.UUID, prompt: str, timeout: float,
+                      snapshot: Optional[UserSnapshot] = None) -> dict:
+    """
+    Run one advisor branch with a timeout. Never raises: failures are
+    reported in the returned dict so the other branch can still answer.
+    """
+    start = time.perf_counter()
+    branch = {"name": name, "ok": False, "response": None, "error": None}
+    try:
+        result = await asyncio.wait_for(
+            asyncio.to_thread(_run_with_own_session, advisor, user_id, prompt, snapshot),
+            timeout=timeout
+        )
+        if not result or not result.get("response"):
+            branch["error"] = "empty response"
+        else:
+            branch["ok"] = True
+            branch["response"] = result["response"]
+    except asyncio.TimeoutError:
+        branch["error"] = f"timed out after {timeout:.0f}s"
+    except HTTPException as e:
+        branch["error"] = str(e.detail)
+    except Exception as e:
+        branch["error"] = str(e)
+    branch["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    logger.info(f"{name} branch finished in {branch['latency_ms']} ms (ok={branch['ok']})")
+    return branch
+
+def _branch_timeout(timeout: float) -> float:
+    """``timeout`` cut down to the request deadline, if one is set."""
+    left = deadline.remaining()
+    return timeout if left is None else max(min(timeout, left), 0)
+
+def _branch_text(branch: dict) -> str:
+    if branch["ok"]:
+        return branch["response"]
+    return f"[{branch['name']} unavailable: {branch['error']}]"
+
+async def advise_concurrently(user_id: uuid.UUID, prompt: str, timeout: float = CHAT_BRANCH_TIMEOUT_SECONDS,
+                              snapshot: Optional[UserSnapshot] = None):
+    """
+    Run FinGuru (ReAct agent) and FinSaathi (Gemini) side by side.
+    Returns the combined response text and per-branch status/latency.
+    """
+    # Both branches share one user snapshot instead of each querying the user
+    snapshot = await asyncio.to_thread(_prepare_snapshot, user_id, prompt, snapshot)
+    timeout = _branch_timeout(timeout)
+    finguru, finsaathi = await asyncio.gather(
+        _run_branch("FinGuru", financial_advice, user_id, prompt, timeout, snapshot),
+        _run_branch("FinSaathi", gemini_financial_advice, user_id, prompt, timeout, snapshot)
+    )
+    if not finguru["ok"] and not finsaathi["ok"]:
+        raise HTTPException(
+            status_code=502,
+            detail=f"Both advisors failed. FinGuru: {finguru['error']}; FinSaathi: {finsaathi['error']}"
+        )
+
+    return _combine_branches(finguru, finsaathi)
+
+def _combine_branches(finguru: dict, finsaathi: dict):
+    """Combined response text and per-branch status/latency."""
+    response = f"FinGuru: {_branch_text(finguru)} \n FinSaathi: {_branch_text(finsaathi)}"
+    branches = {
+        branch["name"]: {
+            "status": "ok" if branch["ok"] else "failed",
+            "latency_ms": branch["latency_ms"],
+            **({} if branch["ok"] else {"error": branch["error"]})
+        }
+        for branch in (finguru, finsaathi)
+    }
+    return response, branches
+
+# Streaming advisors, in the order their answers are combined
+STREAMING_ADVISORS = {
+    "FinGuru": stream_financial_advice,
+    "FinSaathi": stream_gemini_financial_advice,
+}
+
+def _pump_branch(name: str, advisor, user_id: uuid.UUID, prompt: str, snapshot: Optional[UserSnapshot], emit,
+                 stop: threading.Event):
+    """
+    Run a streaming advisor in a worker thread, tagging each event with its
+    source. Once ``stop`` is set the advisor is closed at its next event.
+    """
+    with Session(engine) as session:
+        stream = advisor(user_id, prompt, session, snapshot)
+        try:
+            for event in stream:
+                if stop.is_set():
+                    break
+                emit({**event, "source": name})
+        except Exception as e:
+            emit({"event": "error", "source": name, "message": str(e)})
+        finally:
+            stream.close()
+    emit({"event": "end", "source": name})
+
+async def stream_concurrently(user_id: uuid.UUID, prompt: str, timeout: float = CHAT_BRANCH_TIMEOUT_SECONDS,
+                              snapshot: Optional[UserSnapshot] = None):
+    """
+    Streaming counterpart of advise_concurrently. Both advisors run in worker
+    threads and their events are multiplexed as they arrive. The last event is
+    "done" with the combined response and branch status; a branch that has not
+    finished by the timeout is reported as failed and its later events dropped.
+    Branches still running when this generator finishes, times out or is
+    closed (client disconnect) are told to stop, and do so at their next event.
+    """
+    snapshot = await asyncio.to_thread(_prepare_snapshot, user_id, prompt, snapshot)
+    timeout = _branch_timeout(timeout)
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+
+    def emit(event: dict):
+        loop.call_soon_threadsafe(events.put_nowait, event)
+
+    start = time.perf_counter()
+    stop_at = loop.time() + timeout
+    branches = {name: {"name": name, "ok": False, "response": None, "error": None} for name in STREAMING_ADVISORS}
+    pending = set(STREAMING_ADVISORS)
+    stop = threading.Event()
+    # Referenced so the worker tasks are not garbage collected while running
+    workers = [
+        asyncio.ensure_future(asyncio.to_thread(_pump_branch, name, advisor, user_id, prompt, snapshot, emit, stop))
+        for name, advisor in STREAMING_ADVISORS.items()
+    ]
+
+    try:
+        while pending:
+            try:
+                event = await asyncio.wait_for(events.get(), timeout=max(stop_at - loop.time(), 0))
+            except asyncio.TimeoutError:
+                for name in sorted(pending):
+                    branches[name]["error"] = f"timed out after {timeout:.0f}s"
+                    yield {"event": "error", "source": name, "message": branches[name]["error"]}
+                break
+
+            name = event["source"]
+            if name not in pending:
+                continue
+            branch = branches[name]
+            if event["event"] == "end":
+                pending.discard(name)
+                if not branch["ok"] and not branch["error"]:
+                    branch["error"] = "empty response"
+                branch["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+                logger.info(f"{name} stream finished in {branch['latency_ms']} ms (ok={branch['ok']})")
+                continue
+            if event["event"] == "answer":
+                branch["ok"] = True
+                branch["response"] = event["text"]
+            elif event["event"] == "error":
+                branch["error"] = event["message"]
+            yield event
+    finally:
+        stop.set()
+        if pending:
+            logger.info(f"Stopping abandoned advisor branches: {sorted(pending)}")
+
+    for branch in branches.values():
+        branch.setdefault("latency_ms", round((time.perf_counter() - start) * 1000, 1))
+    response, summary = _combine_branches(branches["FinGuru"], branches["FinSaathi"])
+    yield {
+        "event": "done",
+        "ok": any(branch["ok"] for branch in branches.values()),
+        "response": response,
+        "branches": summary,
+    }
+
+def _store_chat(session: Session, user_id: uuid.UUID, prompt: str, response: str) -> str:
+    new_chat = Chat(user_id=user_id, human_message=prompt, ai_message=response)
+    session.add(new_chat)
+    session.commit()
+    session.refresh(new_chat)
+    _remember_turn(session, user_id, prompt, response, new_chat.id)
+    return str(new_chat.id)
+
+def _save_chat(user_id: uuid.UUID, prompt: str, response: str) -> str:
+    with Session(engine) as session:
+        return _store_chat(session, user_id, prompt, response)
+
+def _remember_turn(db: Session, user_id: uuid.UUID, prompt: str, response: str, chat_id: int):
+    """Fold a saved chat into the rolling context, the cached user snapshot and the retrieval index."""
+    context = record_turn(db, user_id, prompt, response, chat_id)
+    update_snapshot_history(user_id, context)
+    chat_index.add_turn(user_id, chat_id, prompt, response)
+
+def _sse(event: dict) -> str:
+    return f"event: {event['event']}\ndata: {json.dumps(event, default=str)}\n\n"
+
 # Add an authenticated route that uses the OAuth2 system
 @router.post("/secure-advice")
 async def get_secure_financial_advice(
     request: Request,  # Use Request to access JSON body
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_session)
+    db: AsyncSession = Depends(get_async_session)
 ):
     """
     Get financial advice as an authenticated user
     """
     # Get current user from token
-    current_user = get_current_user(token, db)
+    current_user = await aget_current_user(token, db)
     
     # Extract prompt from request body
     body = await request.json()
     prompt = body.get("prompt")
     
-    if not prompt:
-        raise HTTPException(status_code=400, detail="Prompt is required")
-    
-    # Get advice using the financial_advice function
-    response1=financial_advice(current_user.id, prompt, db)
-    if not response1:
-        raise HTTPException(status_code=500, detail="Failed to get financial advice from FinGuru.")
-        
-    response2 = gemini_financial_advice(current_user.id, prompt, db)
-    if not response2:
-        raise HTTPException(status_code=500, detail="Failed to get financial advice from FinSaathi.")
-    response=f"FinGuru: {response1['response']} \n FinSaathi: {response2['response']}"
-
-    # Save the chat to database
-    new_chat = Chat(
-        user_id=current_user.id,
-        human_message=prompt,
-        ai_message=response,
-          # Use current time for timestamp
-    )
+    _validate_prompt(prompt)
     
-    db.add(new_chat)
-    db.commit()
-    db.refresh(new_chat)
+    snapshot = await aget_user_snapshot(db, current_user.id)
+    # Don't hold a pooled connection while the advisors think; the save below takes a fresh one
+    await db.close()
+
+    # Both advisors run concurrently within the request deadline; one failing still yields an answer
+    with deadline.deadline_scope(CHAT_DEADLINE_SECONDS):
+        response, branches = await advise_concurrently(current_user.id, prompt, snapshot=snapshot)
+
+    # Save the chat to database, through the async driver
+    await db.run_sync(_store_chat, current_user.id, prompt, response)
     
     # Your secure-advice endpoint should return a response like this:
-    return {"response": response}
+    return {"response": response, "branches": branches}
+
 
+@router.post("/secure-advice/stream")
+async def stream_secure_financial_advice(
+    request: Request,
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_session)
+):
+    """
+    Streaming variant of /secure-advice as Server-Sent Events.
+
+    Each event carries a "source" (FinGuru or FinSaathi) and is one of "step",
+    "observation", "token", "answer" or "error". The stream ends with "done",
+    sent after the combined message has been saved to the chat history.
+    """
+    current_user = await aget_current_user(token, db)
+
+    body = await request.json()
+    prompt = body.get("prompt")
+
+    _validate_prompt(prompt)
+
+    user_id = current_user.id
+    snapshot = await aget_user_snapshot(db, user_id)
+    # The stream saves with its own session; release this connection before it starts
+    await db.close()
+
+    async def event_stream():
+        with deadline.deadline_scope(CHAT_STREAM_DEADLINE_SECONDS):
+            async for event in stream_concurrently(user_id, prompt, snapshot=snapshot):
+                if event["event"] != "done":
+                    yield _sse(event)
+                    continue
+                if not event["ok"]:
+                    yield _sse({"event": "error", "source": "server", "message": "Both advisors failed.",
+                                "branches": event["branches"]})
+                    return
+                # The request-scoped session is closed by now, so save with our own
+                event["chat_id"] = await asyncio.to_thread(_save_chat, user_id, prompt, event["response"])
+                yield _sse(event)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+class ChatJobFailed(Exception):
+    def __init__(self, detail: str, branches: dict = None):
+        super().__init__(detail)
+        self.detail = detail
+        self.branches = branches
 
+async def _process_chat_job(job: ChatJob) -> dict:
+    """Run both advisors for a queued job, publishing their events, and save the chat."""
+    # The budget starts when a worker picks the job up, not when it was queued
+    with deadline.deadline_scope(CHAT_JOB_DEADLINE_SECONDS):
+        async for event in stream_concurrently(job.user_id, job.prompt):
+            if event["event"] != "done":
+                await job.publish(event)
+                continue
+            if not event["ok"]:
+                raise ChatJobFailed("Both advisors failed.", event["branches"])
+            chat_id = await asyncio.to_thread(_save_chat, job.user_id, job.prompt, event["response"])
+            await job.publish({**event, "chat_id": chat_id})
+            return {"response": event["response"], "branches": event["branches"], "chat_id": chat_id}
+    raise ChatJobFailed("Advisor stream ended without a result.")
+
+job_queue = ChatJobQueue(
+    _process_chat_job,
+    workers=CHAT_JOB_WORKERS,
+    max_queue=CHAT_JOB_MAX_QUEUE,
+    result_ttl=CHAT_JOB_RESULT_TTL_SECONDS
+)
+
+def _get_own_job(job_id: str, user_id: uuid.UUID) -> ChatJob:
+    job = job_queue.get(job_id)
+    # Jobs of other users are reported as missing rather than forbidden
+    if not job or job.user_id != user_id:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
+
+@router.post("/jobs", status_code=202)
+async def submit_chat_job(
+    request: Request,
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_session)
+):
+    """
+    Queue a chat for the advisors and return its job id immediately.
+    Poll /chat/jobs/{job_id} or stream /chat/jobs/{job_id}/stream for the result.
+    """
+    current_user = await aget_current_user(token, db)
+
+    body = await request.json()
+    prompt = body.get("prompt")
+
+    _validate_prompt(prompt)
+
+    try:
+        job = job_queue.submit(current_user.id, prompt)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    return job.to_dict(queue_position=job_queue.queue_position(job))
 
+@router.get("/history", response_model=ChatHistoryPage)
+async def get_chat_history(
+    limit: int = CHAT_HISTORY_PAGE_SIZE,
+    before: Optional[str] = None,
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_session)
+):
+    """
+    The user's chats, newest first. Pass ``next_cursor`` from a page as
+    ``before`` to get the next (older) one; archived chats follow on seamlessly.
+    """
+    current_user = await aget_current_user(token, db)
+    if not 1 <= limit <= CHAT_HISTORY_MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {CHAT_HISTORY_MAX_PAGE_SIZE}")
+    try:
+        cursor = decode_cursor(before) if before else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return await get_history_page(db, current_user.id, limit, cursor)
+
+# Defined before /jobs/{job_id} so "stats" is not taken for a job id
+@router.get("/jobs/stats")
+def chat_job_stats(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_session)
+):
+    """Queue depth, worker utilisation and job counts."""
+    get_current_user(token, db)
+    return job_queue.stats()
+
+@router.get("/agent/stats")
+def agent_stats(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_session)
+):
+    """FinGuru run histograms plus tool-result cache, ticker resolver, response cache, LLM client and history retrieval counters."""
+    get_current_user(token, db)
+    return {
+        "agent": agent_metrics.snapshot(),
+        "tool_cache": tool_cache.stats(),
+        "ticker_resolver": ticker_resolver.stats(),
+        "response_cache": response_cache.stats(),
+        "llm_client": get_llm_client().stats(),
+        "chat_retrieval": chat_index.stats(),
+    }
+
+@router.get("/jobs/{job_id}")
+def get_chat_job(
+    job_id: str,
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_session)
+):
+    """Status of a chat job, with the response once it is done."""
+    current_user = get_current_user(token, db)
+    job = _get_own_job(job_id, current_user.id)
+    return job.to_dict(queue_position=job_queue.queue_position(job))
+
+@router.get("/jobs/{job_id}/stream")
+def stream_chat_job(
+    job_id: str,
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_session)
+):
+    """
+    Server-Sent Events for a chat job: replays the events so far, then follows
+    the job live. Ends with "done", or "error" from source "server" on failure.
+    """
+    current_user = get_current_user(token, db)
+    job = _get_own_job(job_id, current_user.id)
+
+    async def event_stream():
+        async for event in job.iter_events():
+            yield _sse(event)
+        if job.status == "failed":
+            yield _sse({"event": "error", "source": "server", "message": job.error, "branches": job.branches})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -2,8 +2,10 @@ import uuid
 from fastapi import APIRouter, HTTPException, Depends
 from sqlmodel import Session, select
 from ..models import Portfolio, Profile
-from ..database import get_session
-from ..OAuth2 import get_current_user
+from sqlmodel.ext.asyncio.session import AsyncSession
+from ..database import get_async_session, get_session
+from ..OAuth2 import aget_current_user, get_current_user
+from ..user_context import invalidate_user_snapshot
 from fastapi.security import OAuth2PasswordBearer
 
 # Create OAuth2 scheme
@@ -24,6 +26,7 @@ async def add_portfolio(user_id: uuid.UUID, portfolio: Portfolio, db: Session =
     db.add(portfolio)
     db.commit()
     db.refresh(portfolio)
+    invalidate_user_snapshot(user_id)
     return {"message": "Portfolio added successfully!", "portfolio": portfolio}
 
 # New secured route using OAuth2
@@ -46,12 +49,13 @@ async def add_secure_portfolio(
     db.add(portfolio)
     db.commit()
     db.refresh(portfolio)
+    invalidate_user_snapshot(current_user.id)
     return {"message": "Portfolio added successfully!", "portfolio": portfolio}
 
 # Original route - kept for backward compatibility
 @router.get('/portfolio/{user_id}')
-async def get_portfolio(user_id: uuid.UUID, db: Session = Depends(get_session)):
-    portfolio = db.exec(select(Portfolio).where(Portfolio.user_id == user_id)).first()
+async def get_portfolio(user_id: uuid.UUID, db: AsyncSession = Depends(get_async_session)):
+    portfolio = (await db.exec(select(Portfolio).where(Portfolio.user_id == user_id))).first()
     if not portfolio:
         raise HTTPException(status_code=404, detail="Portfolio not found for this user")
     return {"portfolio": portfolio}
@@ -60,16 +64,16 @@ async def get_portfolio(user_id: uuid.UUID, db: Session = Depends(get_session)):
 @router.get('/secure/my_portfolio')
 async def get_secure_portfolio(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_session)
+    db: AsyncSession = Depends(get_async_session)
 ):
     """
     Get portfolio for the authenticated user
     """
     # Get the current user from the token
-    current_user = get_current_user(token, db)
+    current_user = await aget_current_user(token, db)
     
     print(f"Fetching portfolio for user: {current_user.username}")
-    portfolio = db.exec(select(Portfolio).where(Portfolio.user_id == current_user.id)).first()
+    portfolio = (await db.exec(select(Portfolio).where(Portfolio.user_id == current_user.id))).first()
     if not portfolio:
         raise HTTPException(status_code=404, detail="Portfolio not found for this user")
     
@@ -96,4 +100,5 @@ async def update_secure_portfolio(
     db.add(existing_portfolio)
     db.commit()
     db.refresh(existing_portfolio)
+    invalidate_user_snapshot(current_user.id)
     return {"message": "Portfolio updated successfully!", "portfolio": existing_portfolio}
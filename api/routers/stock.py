@@ -3,10 +3,13 @@ import logging
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import Session, select
-from ..models import StockData
-from ..database import get_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import List
+from ..models import StockData, SentimentDailyOut
+from ..database import get_async_session, get_session
 from api import screener
-from FinAdvisor.agent.sentiment import print_sentiment_summary, get_sentiment
+from .. import news_ingestion, sentiment_history
+from FinAdvisor.agent.sentiment import print_sentiment_summary, get_sentiment_for_ticker
 
 router = APIRouter(
     prefix='/stock',
@@ -143,18 +146,32 @@ async def fetch_stock_data(ticker: str, db: Session = Depends(get_session)):
         )
 
 @router.get('/display_news/{ticker}')
-def display_stock_news(ticker: str):
+def display_stock_news(ticker: str, db: Session = Depends(get_session)):
     """
-    Load stock data from NSE and update the database.
+    Return the latest news and sentiment for a ticker from the news store.
+    Falls back to live scraping only for tickers that were never crawled.
     """
     try:
-        prompt= f" Fetch the latest news for the stock ticker {ticker} and analyse the sentiment of the news."
-        sentiment = get_sentiment(prompt)
+        sentiment = news_ingestion.get_stored_news(db, ticker)
+        if sentiment is None:
+            logger.info(f"{ticker} not crawled yet, scraping live news")
+            sentiment = get_sentiment_for_ticker(news_ingestion.normalize_ticker(ticker))
 
         if not sentiment:
             raise HTTPException(status_code=404, detail="No news found for this ticker")
         print_sentiment_summary(sentiment)
-        print(sentiment )
         return sentiment
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e) + " An error occurred while fetching stock news.")
+
+@router.get('/sentiment_history/{ticker}', response_model=List[SentimentDailyOut])
+async def get_sentiment_history(ticker: str, days: int = 30, db: AsyncSession = Depends(get_async_session)):
+    """
+    Daily news sentiment for a ticker: article counts, mean score and
+    exponentially-weighted sentiment, oldest day first.
+    """
+    if days < 1 or days > 365:
+        raise HTTPException(status_code=400, detail="days must be between 1 and 365")
+    return await db.run_sync(
+        sentiment_history.get_sentiment_history, news_ingestion.normalize_ticker(ticker), days
+    )
@@ -1,9 +1,12 @@
 from ..models import Profile, ProfileCreate, ProfileOut, PersonalInfo
-from ..database import get_session
+from ..database import get_async_session, get_session
 from fastapi import APIRouter, Depends, HTTPException, Security
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+import asyncio
 from ..utils import hash_password
-from ..OAuth2 import authenticate_user, get_current_user
+from ..OAuth2 import aauthenticate_user, get_current_user
+from ..user_context import invalidate_user_snapshot
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 
 # Create OAuth2 scheme
@@ -15,32 +18,32 @@ router = APIRouter(
 )
 
 @router.get('/all/')
-async def get_profiles(db: Session = Depends(get_session)):
-    users = db.exec(select(Profile)).all()  # Use SQLModel style instead of db.query()
+async def get_profiles(db: AsyncSession = Depends(get_async_session)):
+    users = (await db.exec(select(Profile))).all()  # Use SQLModel style instead of db.query()
     print(users)
     if not users:
         raise HTTPException(status_code=404, detail="No users found")
     return {"users": users}
     
 @router.get('/profile/{user_id}', response_model=ProfileOut)
-async def get_profile(user_id: int, db: Session = Depends(get_session)):
-    user = db.exec(select(Profile).where(Profile.id == user_id)).first()
+async def get_profile(user_id: int, db: AsyncSession = Depends(get_async_session)):
+    user = (await db.exec(select(Profile).where(Profile.id == user_id))).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return {"user": user}
 
 @router.post('/create_profile/', response_model=ProfileOut)
-async def create_profile(profile_in: ProfileCreate, db: Session = Depends(get_session)):
+async def create_profile(profile_in: ProfileCreate, db: AsyncSession = Depends(get_async_session)):
     """
     create a new user profile.
     """
     try:
-        existing_user = db.exec(select(Profile).where(Profile.username == profile_in.username)).first()
+        existing_user = (await db.exec(select(Profile).where(Profile.username == profile_in.username))).first()
         if existing_user:
             raise HTTPException(status_code=400, detail="username already exists")
 
-        # convert profilecreate → profile
-        hashed_password = hash_password(profile_in.password)
+        # convert profilecreate → profile; bcrypt is CPU-bound, keep it off the event loop
+        hashed_password = await asyncio.to_thread(hash_password, profile_in.password)
         new_profile = Profile(
             username=profile_in.username,
             email=profile_in.email,
@@ -50,19 +53,19 @@ async def create_profile(profile_in: ProfileCreate, db: Session = Depends(get_se
         )
 
         db.add(new_profile)
-        db.commit()
-        db.refresh(new_profile)
+        await db.commit()
+        await db.refresh(new_profile)
         return new_profile
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e) + " an error occurred while creating the user profile.")
 
 # Add login endpoint to generate token
 @router.post('/token')
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_session)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_session)):
     """
     Authenticate user and return access token
     """
-    user = authenticate_user(form_data.username, form_data.password, db)
+    user = await aauthenticate_user(form_data.username, form_data.password, db)
     
     # You'll need to implement this function in OAuth2.py
     from datetime import timedelta
@@ -136,17 +139,18 @@ async def add_personal_details(
         
         db.commit()
         db.refresh(existing_info if existing_info else new_info)
+        invalidate_user_snapshot(current_user.id)
         
         return {"message": "Personal details updated successfully!", "user": current_user}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e) + " An error occurred while updating personal details.")
     
 @router.get('/personal_info/{user_id}')
-async def get_personal_info(user_id: int, db: Session = Depends(get_session)):
+async def get_personal_info(user_id: int, db: AsyncSession = Depends(get_async_session)):
     """
     Get personal information for a user by user_id.
     """
-    personal_info = db.exec(select(PersonalInfo).where(PersonalInfo.user_id == user_id)).first()
+    personal_info = (await db.exec(select(PersonalInfo).where(PersonalInfo.user_id == user_id))).first()
     if not personal_info:
         raise HTTPException(status_code=404, detail="Personal information not found for this user")
     return {"personal_info": personal_info}
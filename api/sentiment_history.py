@@ -0,0 +1,85 @@
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List
+
+from sqlmodel import Session, select
+from sqlalchemy import desc
+
+from .models import NewsArticle, SentimentDaily
+
+# Smoothing factor of the exponentially-weighted sentiment (per covered day)
+SENTIMENT_EWM_ALPHA = float(os.getenv("SENTIMENT_EWM_ALPHA", 0.3))
+
+
+def signed_score(label: str, score: float) -> float:
+    """Map a (label, confidence) pair onto [-1, 1]."""
+    return score if label == "POSITIVE" else -score
+
+
+def update_daily_sentiment(db: Session, ticker: str, articles: Iterable[NewsArticle]) -> List[SentimentDaily]:
+    """
+    Fold newly stored articles into the per-day aggregates for ``ticker``.
+
+    Only the touched days are updated; the EWM is then rolled forward from
+    the day before the earliest touched day using the aggregate rows alone,
+    so raw articles are never rescanned. The caller commits.
+    """
+    by_day = defaultdict(list)
+    for article in articles:
+        published = article.published_at
+        if published.tzinfo is not None:
+            published = published.astimezone(timezone.utc)
+        by_day[published.date()].append(article)
+    if not by_day:
+        return []
+
+    for day, day_articles in by_day.items():
+        row = db.get(SentimentDaily, (ticker, day))
+        if row is None:
+            row = SentimentDaily(ticker=ticker, day=day)
+        for article in day_articles:
+            row.article_count += 1
+            if article.sentiment_label == "POSITIVE":
+                row.positive_count += 1
+            else:
+                row.negative_count += 1
+            row.score_sum += signed_score(article.sentiment_label, article.sentiment_score)
+        row.mean_score = row.score_sum / row.article_count
+        db.add(row)
+    db.flush()
+
+    earliest = min(by_day)
+    previous = db.exec(
+        select(SentimentDaily)
+        .where(SentimentDaily.ticker == ticker)
+        .where(SentimentDaily.day < earliest)
+        .order_by(desc(SentimentDaily.day))
+        .limit(1)
+    ).first()
+    rows = db.exec(
+        select(SentimentDaily)
+        .where(SentimentDaily.ticker == ticker)
+        .where(SentimentDaily.day >= earliest)
+        .order_by(SentimentDaily.day)
+    ).all()
+
+    ewm = previous.ewm_score if previous else None
+    for row in rows:
+        ewm = row.mean_score if ewm is None else (
+            SENTIMENT_EWM_ALPHA * row.mean_score + (1 - SENTIMENT_EWM_ALPHA) * ewm
+        )
+        row.ewm_score = round(ewm, 4)
+        db.add(row)
+    return rows
+
+
+def get_sentiment_history(db: Session, ticker: str, days: int = 30) -> List[SentimentDaily]:
+    """Daily sentiment aggregates for the last ``days`` days, oldest first."""
+    since = (datetime.now(timezone.utc) - timedelta(days=days)).date()
+    return db.exec(
+        select(SentimentDaily)
+        .where(SentimentDaily.ticker == ticker)
+        .where(SentimentDaily.day >= since)
+        .order_by(SentimentDaily.day)
+    ).all()
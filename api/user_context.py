@@ -0,0 +1,165 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import FrozenSet, Optional
+
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from .models import ChatContext, PersonalInfo, Portfolio, Profile
+from .chat_context import format_context, load_history_context, recent_chat_ids
+
+# How long a snapshot is served before it is reloaded, even without a write
+USER_CONTEXT_TTL_SECONDS = float(os.getenv("USER_CONTEXT_TTL_SECONDS", 300))
+USER_CONTEXT_MAX_ENTRIES = int(os.getenv("USER_CONTEXT_MAX_ENTRIES", 10000))
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """Everything the advisors need to know about a user, detached from any session."""
+    profile: Profile
+    personal_info: Optional[PersonalInfo]
+    portfolio: Optional[Portfolio]
+    history: str          # prompt-ready rolling conversation context
+    prompt_fragment: str  # "User Data:" block shared by both advisors
+    recent_chat_ids: FrozenSet[int] = frozenset()  # chats already in ``history`` verbatim
+
+
+def build_prompt_fragment(profile: Profile, personal_info: Optional[PersonalInfo], portfolio: Optional[Portfolio]) -> str:
+    lines = [
+        "User Data:",
+        f"- User: {profile.username}",
+        f"- Age: {profile.age if profile.age is not None else 'Unknown Age'}",
+    ]
+    if personal_info:
+        lines += [
+            f"- Location: {personal_info.location or 'Unknown'}",
+            f"- Occupation: {personal_info.occupation or 'Unknown'}",
+            f"- Dependants: {personal_info.dependants if personal_info.dependants is not None else 'Unknown'}",
+            f"- Marital Status: {personal_info.marital_status or 'Unknown'}",
+            f"- Income: {personal_info.income if personal_info.income is not None else 'Unknown'}",
+        ]
+    holdings = [
+        ("Equity Amount", "equity_amt"),
+        ("Cash Amount", "cash_amt"),
+        ("FD Amount", "fd_amt"),
+        ("Debt Amount", "debt_amt"),
+        ("Real Estate Amount", "real_estate_amt"),
+        ("Bonds Amount", "bonds_amt"),
+        ("Crypto Amount", "crypto_amt"),
+    ]
+    for label, attr in holdings:
+        value = getattr(portfolio, attr) if portfolio else None
+        lines.append(f"- {label}: {value if value is not None else f'Unknown {label}'}")
+    return "\n".join(lines)
+
+
+class _SnapshotCache:
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: uuid.UUID) -> Optional[UserSnapshot]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            snapshot, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return snapshot
+
+    def put(self, user_id: uuid.UUID, snapshot: UserSnapshot) -> None:
+        with self._lock:
+            self._entries[user_id] = (snapshot, time.monotonic() + self.ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def update(self, user_id: uuid.UUID, **changes) -> None:
+        """Replace fields of a cached snapshot in place, keeping its expiry."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                self._entries[user_id] = (replace(entry[0], **changes), entry[1])
+
+    def invalidate(self, user_id: uuid.UUID) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+_cache = _SnapshotCache(USER_CONTEXT_TTL_SECONDS, USER_CONTEXT_MAX_ENTRIES)
+
+
+def get_user_snapshot(db: Session, user_id: uuid.UUID) -> Optional[UserSnapshot]:
+    """
+    Cached snapshot of a user's profile, personal info, portfolio and chat
+    context. A miss loads all of them in one joined query; None if the user
+    does not exist.
+    """
+    if isinstance(user_id, str):
+        try:
+            user_id = uuid.UUID(user_id)
+        except ValueError:
+            return None
+    snapshot = _cache.get(user_id)
+    if snapshot is not None:
+        return snapshot
+
+    row = db.exec(
+        select(Profile, PersonalInfo, Portfolio, ChatContext)
+        .outerjoin(PersonalInfo, PersonalInfo.user_id == Profile.id)
+        .outerjoin(Portfolio, Portfolio.user_id == Profile.id)
+        .outerjoin(ChatContext, ChatContext.user_id == Profile.id)
+        .where(Profile.id == user_id)
+    ).first()
+    if row is None:
+        return None
+
+    profile, personal_info, portfolio, context = row
+    # Detach before anything below commits, which would expire loaded attributes
+    for instance in (profile, personal_info, portfolio, context):
+        if instance is not None and instance in db:
+            db.expunge(instance)
+    # Users whose chats predate the context store get it built once here
+    history = format_context(context) if context is not None else load_history_context(db, user_id)
+
+    snapshot = UserSnapshot(
+        profile=profile,
+        personal_info=personal_info,
+        portfolio=portfolio,
+        history=history,
+        prompt_fragment=build_prompt_fragment(profile, personal_info, portfolio),
+        recent_chat_ids=recent_chat_ids(context),
+    )
+    _cache.put(user_id, snapshot)
+    return snapshot
+
+
+async def aget_user_snapshot(db: AsyncSession, user_id: uuid.UUID) -> Optional[UserSnapshot]:
+    """``get_user_snapshot`` for async endpoints; a miss loads through the async driver."""
+    # The sync loader checks the cache itself, but a hit should not need a greenlet hop
+    try:
+        cached = _cache.get(uuid.UUID(str(user_id)))
+    except ValueError:
+        return None
+    if cached is not None:
+        return cached
+    return await db.run_sync(get_user_snapshot, user_id)
+
+
+def invalidate_user_snapshot(user_id: uuid.UUID) -> None:
+    """Drop the cached snapshot; call after writing the user's profile, personal info or portfolio."""
+    _cache.invalidate(user_id)
+
+
+def update_snapshot_history(user_id: uuid.UUID, context: ChatContext) -> None:
+    """Refresh the cached conversation context after a new chat turn was recorded."""
+    _cache.update(user_id, history=format_context(context), recent_chat_ids=recent_chat_ids(context))
@@ -4,27 +4,31 @@ from dotenv import load_dotenv
 from fastapi import HTTPException, Depends
 from datetime import datetime, timedelta
 import jwt  # This is PyJWT
-from google import genai
 import logging
-try:
-    client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
-except Exception as e:
-    logging.error(f"Failed to initialize Gemini client: {e}")
-    client = None
+from .llm_client import get_llm_client
 # Load environment variables
 load_dotenv()
+# Shared Gemini client: one connection pool, per-call timeouts, retries and a concurrency limit
+client = get_llm_client()
 # Gemini chat function
 def chat_with_gemini(prompt: str) -> str:
     """Chat with Gemini AI model."""
-    if not client:
+    if not client.available:
         raise HTTPException(status_code=500, detail="Gemini client not initialized")
     
     try:
-        response = client.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=prompt
-        )
-        return response.text
+        return client.generate(prompt, model="gemini-2.0-flash").text
+    except Exception as e:
+        logging.error(f"Gemini API error: {e}")
+        raise HTTPException(status_code=500, detail="AI service unavailable")
+
+def stream_chat_with_gemini(prompt: str):
+    """Chat with Gemini AI model, yielding the response text chunk by chunk."""
+    if not client.available:
+        raise HTTPException(status_code=500, detail="Gemini client not initialized")
+    
+    try:
+        yield from client.stream(prompt, model="gemini-2.0-flash")
     except Exception as e:
         logging.error(f"Gemini API error: {e}")
         raise HTTPException(status_code=500, detail="AI service unavailable")
@@ -0,0 +1,160 @@
+"""
+ReAct vs native tool-calling agent, offline.
+
+Runs the same questions through both agent modes against the fake LLM
+(no Gemini calls) with the tool cache pre-seeded (no database or Yahoo
+calls), and reports executor iterations, parse errors, LLM round trips,
+tool calls and latency per mode. Every LLM call costs the same fixed
+latency in both modes (the fake's per-word streaming delay is off, since
+only ReAct turns are streamed).
+
+Two scenarios:
+
+  clean        the default scripts: ReAct fetches stock data and news in
+               two separate turns, tool-calling asks for both in one turn
+  parse-error  ReAct's first reply is malformed (no Action / Final Answer)
+               and costs an extra iteration; tool calls are structured, so
+               tool-calling runs as in "clean"
+
+Usage:
+    python benchmarks/bench_agent_modes.py --runs 20 --latency-ms 300
+    python benchmarks/bench_agent_modes.py --scenario parse-error
+"""
+import argparse
+import math
+import os
+import sys
+import time
+from pathlib import Path
+
+QUESTIONS = [
+    "Is Reliance Industries a good investment right now?",
+    "Should I buy more Infosys shares for the long term?",
+    "What is the outlook for HDFC Bank?",
+    "How is Tata Consultancy Services doing?",
+]
+
+# ReAct script whose first reply breaks the output format
+PARSE_ERROR_REACT_SCRIPT = [
+    "The company looks solid, so I would lean towards holding it for now.",
+    "I should look up the latest stock data first.\n"
+    "Action: query_stock_data\n"
+    "Action Input: {question}",
+    "I should check the recent news and sentiment as well.\n"
+    "Action: get_company_news\n"
+    "Action Input: {question}",
+    "I now know the final answer\n"
+    "Final Answer: Based on the latest stock data and news sentiment, the company looks fairly valued. "
+    "Consider your risk profile and investment horizon before adding to the position.",
+]
+
+
+def percentile(sorted_values, q: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def seed_tool_cache(finagent) -> None:
+    for question in QUESTIONS:
+        ticker = finagent.extract_company_ticker(question)
+        finagent.tool_cache.put("query_stock_data", ticker, {
+            "ticker": ticker, "source": "database", "price": 2450.5, "sector": "Energy",
+            "pe_ratio": 24.1, "pb_ratio": 2.3, "dividend_yield": 0.4, "market_cap": 1.65e13,
+        })
+        finagent.tool_cache.put("get_company_news", ticker, [
+            {"title": f"{ticker} reports steady quarterly growth", "sentiment": {"label": "POSITIVE", "score": 0.93}},
+            {"title": f"Analysts trim {ticker} target on margin pressure", "sentiment": {"label": "NEGATIVE", "score": 0.81}},
+        ])
+
+
+class IterationCounter:
+    """
+    Executor iterations from the streamed chunks: an iteration yields its
+    actions, then their steps; the last one yields the output.
+    """
+
+    def __init__(self):
+        self.iterations = 0
+        self._in_actions = False
+
+    def __call__(self, chunk):
+        if "actions" in chunk:
+            if not self._in_actions:
+                self.iterations += 1
+            self._in_actions = True
+            return
+        self._in_actions = False
+        if "output" in chunk:
+            self.iterations += 1
+
+
+def run_mode(finagent, mode: str, runs: int):
+    from FinAdvisor.agent.instrumentation import AgentMetrics, AgentRunRecorder
+
+    latencies, iterations, parse_errors, llm_calls, tool_calls = [], [], [], [], []
+    for i in range(runs):
+        question = QUESTIONS[i % len(QUESTIONS)]
+        agent_input = finagent._agent_request(question, "", "", None)["input"]
+        recorder = AgentRunRecorder(metrics=AgentMetrics())
+        counter = IterationCounter()
+        start = time.perf_counter()
+        output, outcome = finagent._run_agent(agent_input, [recorder], on_chunk=counter, mode=mode)
+        latencies.append((time.perf_counter() - start) * 1000)
+        summary = recorder.finish(outcome)
+        if outcome != "ok":
+            print(f"  {mode} run {i}: outcome={outcome}")
+        iterations.append(counter.iterations)
+        parse_errors.append(summary["parse_errors"])
+        llm_calls.append(summary["llm_calls"])
+        tool_calls.append(len(summary["tools"]))
+    latencies.sort()
+    return {
+        "iterations": sum(iterations) / runs,
+        "parse_errors": sum(parse_errors) / runs,
+        "llm_calls": sum(llm_calls) / runs,
+        "tool_calls": sum(tool_calls) / runs,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20, help="agent runs per mode")
+    parser.add_argument("--latency-ms", type=float, default=300, help="fake LLM latency per call")
+    parser.add_argument("--scenario", choices=("clean", "parse-error", "both"), default="both")
+    args = parser.parse_args()
+
+    # Must be set before the agent (and its LLM client) is imported
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ["FAKE_LLM_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["FAKE_LLM_JITTER_MS"] = "0"
+    # Only ReAct turns are streamed; per-word pacing would bill ReAct alone
+    os.environ["FAKE_LLM_CHUNK_MS"] = "0"
+    os.environ["PREFETCH_ENABLED"] = "false"
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+    from FinAdvisor.agent import finagent
+    from FinAdvisor.api.fake_llm import DEFAULT_REACT_SCRIPT
+    from FinAdvisor.api.llm_client import get_llm_client
+
+    seed_tool_cache(finagent)
+    fake_models = get_llm_client()._client.aio.models
+    scripts = {"clean": DEFAULT_REACT_SCRIPT, "parse-error": PARSE_ERROR_REACT_SCRIPT}
+    scenarios = list(scripts) if args.scenario == "both" else [args.scenario]
+
+    print(f"{args.runs} runs per mode, fake LLM latency {args.latency_ms:.0f} ms per call")
+    for scenario in scenarios:
+        fake_models.react_script = scripts[scenario]
+        print(f"\n{scenario}")
+        print(f"{'mode':<14}{'iterations':>12}{'parse errs':>12}{'LLM calls':>11}{'tool calls':>12}"
+              f"{'p50 ms':>10}{'p95 ms':>10}")
+        for mode in finagent.AGENT_MODES:
+            result = run_mode(finagent, mode, args.runs)
+            print(f"{mode:<14}{result['iterations']:>12.1f}{result['parse_errors']:>12.1f}{result['llm_calls']:>11.1f}"
+                  f"{result['tool_calls']:>12.1f}{result['p50']:>10.0f}{result['p95']:>10.0f}")
+
+if __name__ == "__main__":
+    main()
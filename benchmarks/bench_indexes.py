@@ -0,0 +1,183 @@
+"""
+Query plans and write cost before/after migration 0001 (hot query indexes).
+
+Builds two SQLite databases with the same data: one with the indexes the
+models used to declare, one with migration 0001 applied on top. Prints
+EXPLAIN QUERY PLAN for the hot reads and times them, then times the write
+paths that pay for indexes: a full screener refresh of stock_data,
+portfolio updates and chat inserts. Needs only the standard library.
+
+Usage:
+    python benchmarks/bench_indexes.py --users 2000 --chats-per-user 50 --stocks 2000
+"""
+import argparse
+import importlib.util
+import os
+import random
+import sqlite3
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+MIGRATION = Path(__file__).resolve().parent.parent / "api" / "migrations" / "m0001_hot_query_indexes.py"
+
+# Tables and indexes as create_all built them before the migration
+BEFORE_SCHEMA = """
+CREATE TABLE user (id CHAR(32) PRIMARY KEY, username VARCHAR NOT NULL UNIQUE);
+CREATE TABLE chat (
+    id INTEGER PRIMARY KEY, user_id CHAR(32) NOT NULL REFERENCES user (id),
+    human_message VARCHAR NOT NULL, ai_message VARCHAR NOT NULL, timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX ix_chat_user_id ON chat (user_id);
+CREATE TABLE portfolio (
+    portfolio_id CHAR(32) PRIMARY KEY, user_id CHAR(32) NOT NULL REFERENCES user (id),
+    equity_amt FLOAT, cash_amt FLOAT, fd_amt FLOAT, debt_amt FLOAT, real_estate_amt FLOAT, bonds_amt FLOAT, crypto_amt FLOAT
+);
+CREATE INDEX ix_portfolio_user_id ON portfolio (user_id);
+CREATE TABLE stock_data (
+    stock_id CHAR(32) PRIMARY KEY, stock_name VARCHAR NOT NULL, stock_ticker VARCHAR NOT NULL UNIQUE, sector VARCHAR,
+    current_price FLOAT NOT NULL, pe_ratio FLOAT, pb_ratio FLOAT, dividend_yield FLOAT, eps FLOAT, book_value FLOAT,
+    market_cap FLOAT, volume INTEGER, last_updated TIMESTAMP
+);
+CREATE INDEX ix_stock_data_stock_name ON stock_data (stock_name);
+CREATE INDEX ix_stock_data_sector ON stock_data (sector);
+""" + "".join(
+    f"CREATE INDEX ix_{table}_{column} ON {table} ({column});\n"
+    for table, columns in {
+        "portfolio": ["equity_amt", "cash_amt", "fd_amt", "debt_amt", "real_estate_amt", "bonds_amt", "crypto_amt"],
+        "stock_data": ["current_price", "pe_ratio", "pb_ratio", "dividend_yield", "eps", "book_value", "market_cap", "volume"],
+    }.items()
+    for column in columns
+)
+
+STOCK_COLUMNS = ["current_price", "pe_ratio", "pb_ratio", "dividend_yield", "eps", "book_value", "market_cap", "volume"]
+PORTFOLIO_COLUMNS = ["equity_amt", "cash_amt", "fd_amt", "debt_amt", "real_estate_amt", "bonds_amt", "crypto_amt"]
+
+QUERIES = {
+    "chat history": (
+        "SELECT id, human_message, ai_message FROM chat WHERE user_id = ? ORDER BY timestamp DESC, id DESC LIMIT 5",
+        "user",
+    ),
+    "portfolio by user": ("SELECT * FROM portfolio WHERE user_id = ?", "user"),
+    "stock by ticker": ("SELECT * FROM stock_data WHERE stock_ticker = ?", "ticker"),
+}
+
+
+def load_migration():
+    spec = importlib.util.spec_from_file_location("m0001", MIGRATION)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def build(path: str, args, rng: random.Random, migrate):
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.executescript(BEFORE_SCHEMA)
+    if migrate:
+        for statement in migrate.UP:
+            db.execute(statement)
+
+    users = [uuid.UUID(int=rng.getrandbits(128)).hex for _ in range(args.users)]
+    db.executemany("INSERT INTO user (id, username) VALUES (?, ?)", [(u, f"user_{u[:12]}") for u in users])
+    db.executemany(
+        f"INSERT INTO portfolio (portfolio_id, user_id, {', '.join(PORTFOLIO_COLUMNS)}) VALUES (?, ?{', ?' * 7})",
+        [(uuid.UUID(int=rng.getrandbits(128)).hex, u, *(rng.uniform(0, 1e6) for _ in PORTFOLIO_COLUMNS)) for u in users],
+    )
+    # Chats arrive interleaved across users, as in production
+    db.executemany(
+        "INSERT INTO chat (user_id, human_message, ai_message, timestamp) VALUES (?, ?, ?, datetime(?, 'unixepoch'))",
+        [(rng.choice(users), "question " * 20, "answer " * 80, 1.7e9 + i)
+         for i in range(args.users * args.chats_per_user)],
+    )
+    tickers = [f"STOCK{i}.NS" for i in range(args.stocks)]
+    db.executemany(
+        f"INSERT INTO stock_data (stock_id, stock_name, stock_ticker, sector, {', '.join(STOCK_COLUMNS)}) "
+        f"VALUES (?, ?, ?, ?{', ?' * 8})",
+        [(uuid.uuid4().hex, f"Stock {i}", t, f"Sector {i % 12}", *(rng.uniform(1, 1e4) for _ in STOCK_COLUMNS))
+         for i, t in enumerate(tickers)],
+    )
+    db.commit()
+    db.execute("ANALYZE")
+    return db, users, tickers
+
+
+def timed(fn, repeat: int = 3) -> float:
+    """Best of ``repeat`` runs, in ms."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def measure(db, users, tickers, rng: random.Random, lookups: int):
+    samples = {"user": users, "ticker": tickers}
+    results = {}
+    for name, (sql, kind) in QUERIES.items():
+        plan = [row[3] for row in db.execute(f"EXPLAIN QUERY PLAN {sql}", (samples[kind][0],))]
+        keys = [rng.choice(samples[kind]) for _ in range(lookups)]
+        total = timed(lambda: [db.execute(sql, (key,)).fetchall() for key in keys])
+        results[name] = (plan, total * 1000 / lookups)
+
+    def refresh_stocks():
+        db.executemany(
+            f"UPDATE stock_data SET {', '.join(f'{c} = ?' for c in STOCK_COLUMNS)}, last_updated = CURRENT_TIMESTAMP "
+            "WHERE stock_ticker = ?",
+            [(*(rng.uniform(1, 1e4) for _ in STOCK_COLUMNS), t) for t in tickers],
+        )
+        db.commit()
+
+    def update_portfolios():
+        db.executemany(
+            f"UPDATE portfolio SET {', '.join(f'{c} = ?' for c in PORTFOLIO_COLUMNS)} WHERE user_id = ?",
+            [(*(rng.uniform(0, 1e6) for _ in PORTFOLIO_COLUMNS), u) for u in users],
+        )
+        db.commit()
+
+    def insert_chats():
+        for u in rng.sample(users, min(len(users), 1000)):
+            db.execute("INSERT INTO chat (user_id, human_message, ai_message) VALUES (?, ?, ?)", (u, "q", "a"))
+            db.commit()
+
+    writes = {
+        "stock refresh (all rows)": timed(refresh_stocks),
+        "portfolio update (all rows)": timed(update_portfolios),
+        "chat insert x1000 (commit each)": timed(insert_chats),
+    }
+    return results, writes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--chats-per-user", type=int, default=50)
+    parser.add_argument("--stocks", type=int, default=2000)
+    parser.add_argument("--lookups", type=int, default=2000, help="timed lookups per query")
+    args = parser.parse_args()
+
+    migration = load_migration()
+    workdir = tempfile.mkdtemp()
+    runs = {}
+    for label, migrate in (("before", None), ("after", migration)):
+        rng = random.Random(42)  # same data in both databases
+        db, users, tickers = build(os.path.join(workdir, f"{label}.db"), args, rng, migrate)
+        runs[label] = measure(db, users, tickers, rng, args.lookups)
+        db.close()
+
+    print(f"{args.users} users, {args.users * args.chats_per_user} chats, {args.stocks} stocks\n")
+    for name in QUERIES:
+        print(f"{name}:")
+        for label in ("before", "after"):
+            plan, us = runs[label][0][name]
+            print(f"  {label:<7}{us:>9.1f} us/query  {' | '.join(plan)}")
+    print(f"\n{'write':<34}{'before ms':>12}{'after ms':>12}")
+    for name in runs["before"][1]:
+        print(f"{name:<34}{runs['before'][1][name]:>12.1f}{runs['after'][1][name]:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
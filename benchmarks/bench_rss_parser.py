@@ -0,0 +1,112 @@
+"""
+Benchmark the streaming RSS parser against the old BeautifulSoup parse.
+
+Usage:
+    python benchmarks/bench_rss_parser.py                       # synthetic feeds
+    python benchmarks/bench_rss_parser.py --feeds-dir feeds/    # recorded *.xml feeds
+
+Recorded feeds can be captured with e.g.
+    curl -o feeds/reliance.xml "https://news.google.com/rss/search?q=RELIANCE+Reliance+Industries+stock"
+"""
+import argparse
+import io
+import statistics
+import sys
+import time
+from pathlib import Path
+
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from bs4 import BeautifulSoup
+from agent.rss_parser import parse_relevant_articles
+
+KEYWORDS = ["RELIANCE", "Reliance Industries"]
+
+
+def legacy_parse(content: bytes, keywords, max_articles=10):
+    """The previous scraping_google_news parsing logic, kept as the baseline."""
+    soup = BeautifulSoup(content, 'xml')
+    items = soup.find_all('item')
+
+    articles = []
+    for item in items[:max_articles]:
+        title = item.title.get_text() if item.title else ""
+        description = item.description.get_text() if item.description else ""
+        link = item.link.get_text() if item.link else ""
+        pub_date = item.pubDate.get_text() if item.pubDate else ""
+
+        full_text = (title + " " + description).lower()
+        is_relevant = any(keyword.lower() in full_text for keyword in keywords)
+
+        if is_relevant and title:
+            articles.append({
+                'title': title,
+                'description': description,
+                'link': link,
+                'pub_date': pub_date
+            })
+    return articles
+
+
+def synthetic_feed(n_items: int) -> bytes:
+    """Build a Google-News-shaped feed with ``n_items`` items."""
+    items = []
+    for i in range(n_items):
+        company = "Reliance Industries" if i % 3 == 0 else "Some Other Corp"
+        items.append(
+            "<item>"
+            f"<title>{company} shares move on quarterly update #{i} - Example News</title>"
+            f"<link>https://news.google.com/rss/articles/{i}</link>"
+            f"<guid isPermaLink=\"false\">{i}</guid>"
+            "<pubDate>Mon, 02 Jun 2025 07:00:00 GMT</pubDate>"
+            "<description>&lt;a href=\"https://news.google.com/rss/articles/"
+            f"{i}\" target=\"_blank\"&gt;{company} shares move on quarterly update #{i}&lt;/a&gt;"
+            "&amp;nbsp;&amp;nbsp;&lt;font color=\"#6f6f6f\"&gt;Example News&lt;/font&gt;</description>"
+            "<source url=\"https://example.com\">Example News</source>"
+            "</item>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<rss version="2.0" xmlns:media="http://search.yahoo.com/mrss/"><channel>'
+        "<title>Google News</title>" + "".join(items) + "</channel></rss>"
+    ).encode("utf-8")
+
+
+def time_it(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--feeds-dir", type=Path, help="directory of recorded RSS feeds (*.xml)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000],
+                        help="item counts for synthetic feeds")
+    parser.add_argument("--max-articles", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.feeds_dir:
+        feeds = [(path.name, path.read_bytes()) for path in sorted(args.feeds_dir.glob("*.xml"))]
+    else:
+        feeds = [(f"synthetic-{n}", synthetic_feed(n)) for n in args.sizes]
+
+    print(f"{'feed':<24}{'size KB':>10}{'bs4 ms':>12}{'stream ms':>12}{'speedup':>10}")
+    for name, content in feeds:
+        legacy_ms = time_it(lambda: legacy_parse(content, KEYWORDS, args.max_articles), args.repeat)
+        stream_ms = time_it(
+            lambda: parse_relevant_articles(io.BytesIO(content), KEYWORDS, args.max_articles),
+            args.repeat
+        )
+        print(f"{name:<24}{len(content) / 1024:>10.1f}{legacy_ms:>12.2f}{stream_ms:>12.2f}"
+              f"{legacy_ms / stream_ms:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
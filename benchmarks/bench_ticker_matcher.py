@@ -0,0 +1,70 @@
+"""
+Micro-benchmark: compiled TickerMatcher vs. the old linear substring scans.
+
+Usage:
+    python benchmarks/bench_ticker_matcher.py --symbols 2000
+"""
+import argparse
+import random
+import sys
+import timeit
+from pathlib import Path
+
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from agent.ticker_matcher import TickerMatcher
+
+WORDS = ["alpha", "bharat", "capital", "digital", "energy", "finance", "global",
+         "holdings", "infra", "jewels", "kinetic", "logistics", "motors", "natural"]
+
+
+def build_universe(n_symbols: int, seed: int = 7):
+    rng = random.Random(seed)
+    universe = {}
+    while len(universe) < n_symbols:
+        name = " ".join(rng.sample(WORDS, 2)).title() + f" {len(universe)} Ltd"
+        universe[name] = f"SYM{len(universe)}"
+    return universe
+
+
+def linear_scan(prompt: str, company_ticker_map):
+    """The previous extract_company_ticker / _fallback_ticker_extraction logic."""
+    prompt_lower = prompt.lower()
+    for company, ticker in company_ticker_map.items():
+        if company.lower() in prompt_lower:
+            return ticker
+    for ticker in company_ticker_map.values():
+        if ticker.lower() in prompt_lower:
+            return ticker
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=2000)
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    universe = build_universe(args.symbols)
+    names = list(universe)
+    prompts = [
+        f"What is the outlook for {names[-1]} after the latest results?",
+        f"Compare {names[len(names) // 2]} with {names[3]} on valuation",
+        "How should I diversify my portfolio for retirement?",
+    ]
+
+    start = timeit.default_timer()
+    matcher = TickerMatcher(universe)
+    build_ms = (timeit.default_timer() - start) * 1000
+    print(f"{args.symbols} symbols, matcher build: {build_ms:.1f} ms")
+    print(f"{'prompt':<60}{'linear us':>12}{'matcher us':>12}")
+    for prompt in prompts:
+        linear = timeit.timeit(lambda: linear_scan(prompt, universe), number=args.number)
+        compiled = timeit.timeit(lambda: matcher.find_all(prompt), number=args.number)
+        print(f"{prompt[:58]:<60}{linear / args.number * 1e6:>12.1f}{compiled / args.number * 1e6:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Offline end-to-end load test for POST /chat/secure-advice.
+
+Drives N concurrent users through the full chat stack (middleware, auth,
+context loading, both advisors, agent parsing, tools, persistence) and
+reports latency percentiles. Start the API against the fake LLM first so
+no Gemini calls are made, and lift the global rate limit:
+
+    LLM_BACKEND=fake FAKE_LLM_LATENCY_MS=300 RATE_LIMIT_REQUESTS=100000 \\
+        uvicorn FinAdvisor.api.main:app --port 8000
+
+Usage:
+    python benchmarks/load_test_chat.py --users 20 --requests 10
+"""
+import argparse
+import asyncio
+import math
+import time
+import uuid
+from collections import Counter
+
+import httpx
+
+PROMPTS = [
+    "What is the current price of Reliance Industries?",
+    "Should I buy more Infosys shares for the long term?",
+    "How should I diversify my portfolio at my age?",
+    "What is the latest news sentiment on HDFC Bank?",
+    "Is Tata Consultancy Services a good investment right now?",
+]
+
+
+def percentile(sorted_values, q: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+async def create_user(client: httpx.AsyncClient, run_id: str, index: int) -> str:
+    username = f"loadtest_{run_id}_{index}"
+    password = "loadtest-password"
+    response = await client.post("/user/create_profile/", json={
+        "username": username,
+        "email": f"{username}@example.com",
+        "password": password,
+        "name": f"Load Test {index}",
+        "age": 30,
+    })
+    response.raise_for_status()
+    response = await client.post("/user/token", data={"username": username, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def run_user(client: httpx.AsyncClient, token: str, index: int, n_requests: int, latencies, statuses):
+    headers = {"Authorization": f"Bearer {token}"}
+    for i in range(n_requests):
+        prompt = PROMPTS[(index + i) % len(PROMPTS)]
+        start = time.perf_counter()
+        try:
+            response = await client.post("/chat/secure-advice", json={"prompt": prompt}, headers=headers)
+            status = response.status_code
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        statuses[status] += 1
+        if status == 200:
+            latencies.append(elapsed_ms)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--users", type=int, default=10, help="concurrent users")
+    parser.add_argument("--requests", type=int, default=5, help="requests per user")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request timeout in seconds")
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        run_id = uuid.uuid4().hex[:8]
+        tokens = [await create_user(client, run_id, i) for i in range(args.users)]
+
+        latencies, statuses = [], Counter()
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            run_user(client, token, i, args.requests, latencies, statuses)
+            for i, token in enumerate(tokens)
+        ))
+        wall = time.perf_counter() - start
+
+    latencies.sort()
+    total = sum(statuses.values())
+    print(f"{args.users} users x {args.requests} requests = {total} requests in {wall:.1f} s "
+          f"({total / wall:.2f} req/s)")
+    print("status counts: " + ", ".join(f"{status}={count}" for status, count in sorted(statuses.items(), key=str)))
+    if latencies:
+        print(f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        print(f"{percentile(latencies, 50):>10.0f}{percentile(latencies, 95):>10.0f}"
+              f"{percentile(latencies, 99):>10.0f}{latencies[-1]:>10.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -5,6 +5,7 @@ import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime
 import time
+import json
 
 # Configure the app
 st.set_page_config(
@@ -267,6 +268,23 @@ def get_stock_sentiment(ticker):
         show_error(f"Failed to get sentiment data: {response.status_code}")
         return None
 
+def get_sentiment_history(ticker, days=30):
+    """Get daily sentiment aggregates for a ticker"""
+    response = api_request(
+        'get',
+        f"{API_URL}/stock/sentiment_history/{ticker}",
+        params={"days": days}
+    )
+    
+    if not response:
+        return None
+        
+    if response.status_code == 200:
+        return response.json()
+    else:
+        show_error(f"Failed to get sentiment history: {response.status_code}")
+        return None
+
 # Personal info functions
 def get_personal_info():
     """Get personal info"""
@@ -332,6 +350,66 @@ def send_message(message, user_token):
         st.error(f"An error occurred: {str(e)}")
         return None
 
+def stream_message(message, user_token):
+    """Send a message to the streaming chat API and yield its events as they arrive"""
+    headers = {"Authorization": f"Bearer {user_token}", "Accept": "text/event-stream"}
+    try:
+        with requests.post(
+            f"{API_URL}/chat/secure-advice/stream",
+            json={"prompt": message},
+            headers=headers,
+            stream=True,
+            timeout=(10, 180)
+        ) as response:
+            if response.status_code != 200:
+                yield {"event": "error", "source": "server", "message": f"Error sending message: {response.status_code}"}
+                return
+            for line in response.iter_lines(decode_unicode=True):
+                if line and line.startswith("data: "):
+                    yield json.loads(line[len("data: "):])
+    except requests.exceptions.ConnectionError:
+        yield {"event": "error", "source": "server", "message": "Could not connect to the server. Please make sure the backend is running."}
+    except Exception as e:
+        yield {"event": "error", "source": "server", "message": f"An error occurred: {str(e)}"}
+
+def render_streamed_response(prompt, user_token):
+    """Render both advisors' answers incrementally and return the final message"""
+    status = st.status("Thinking...", expanded=False)
+    placeholders = {}
+    texts = {}
+    for name in ("FinGuru", "FinSaathi"):
+        st.markdown(f"**{name}**")
+        placeholders[name] = st.empty()
+        texts[name] = ""
+
+    final_response = None
+    for event in stream_message(prompt, user_token):
+        source = event.get("source")
+        kind = event.get("event")
+        if kind == "step":
+            status.write(f"{source}: using `{event['tool']}` ({event['tool_input']})")
+        elif kind == "observation":
+            status.write(f"{source}: got result from `{event['tool']}`")
+        elif kind == "token" and source in placeholders:
+            texts[source] += event["text"]
+            placeholders[source].markdown(texts[source] + "▌")
+        elif kind == "answer" and source in placeholders:
+            texts[source] = event["text"]
+            placeholders[source].markdown(texts[source])
+        elif kind == "error":
+            if source in placeholders:
+                placeholders[source].markdown(f"_{source} unavailable: {event['message']}_")
+            else:
+                status.update(label="Failed", state="error")
+                st.error(event["message"])
+        elif kind == "done":
+            final_response = event["response"]
+            status.update(label="Done", state="complete")
+
+    if final_response is None:
+        return "I'm sorry, I couldn't process your request at the moment. Please try again."
+    return final_response
+
 # Page functions
 def show_login_page():
     st.title("Login to FinAdvisor")
@@ -580,6 +658,20 @@ def show_stock_page():
             st.error(f"No data available for {ticker}")
     
     with tab2:
+        history = get_sentiment_history(ticker)
+        if history:
+            history_df = pd.DataFrame(history)
+            history_df["day"] = pd.to_datetime(history_df["day"])
+            fig = go.Figure()
+            fig.add_trace(go.Scatter(x=history_df["day"], y=history_df["mean_score"],
+                                     mode="markers", name="Daily mean"))
+            fig.add_trace(go.Scatter(x=history_df["day"], y=history_df["ewm_score"],
+                                     mode="lines", name="Smoothed (EWM)"))
+            fig.update_layout(title="Sentiment Over Time", yaxis_title="Sentiment (-1 to 1)",
+                              yaxis_range=[-1, 1])
+            st.plotly_chart(fig, use_container_width=True)
+            st.caption(f"{int(history_df['article_count'].sum())} articles over the last {len(history_df)} days with coverage")
+
         if st.button("Analyze Sentiment"):
             with st.spinner("Analyzing sentiment..."):
                 sentiment = get_stock_sentiment(ticker)
@@ -766,18 +858,12 @@ def show_chat_page():
         
         # Get AI response
         with st.chat_message("assistant", avatar="🤖"):
-            with st.spinner("Thinking..."):
-                if st.session_state.get('user_token'):
-                    # Send to API
-                    response = send_message(prompt, st.session_state.user_token)
-                    if response and "response" in response:
-                        ai_response = response["response"]
-                    else:
-                        ai_response = "I'm sorry, I couldn't process your request at the moment. Please try again."
-                else:
-                    # Mock response if no API connection
-                    ai_response = f"I understand you're asking about: '{prompt}'. This is a mock response since the backend isn't connected. In a real scenario, I would provide detailed financial advice based on your query."
-                
+            if st.session_state.get('user_token'):
+                # Stream from the API so steps and tokens show up as they are produced
+                ai_response = render_streamed_response(prompt, st.session_state.user_token)
+            else:
+                # Mock response if no API connection
+                ai_response = f"I understand you're asking about: '{prompt}'. This is a mock response since the backend isn't connected. In a real scenario, I would provide detailed financial advice based on your query."
                 st.markdown(ai_response)
         
         # Add assistant response to chat history
@@ -0,0 +1,87 @@
+"""
+Keyset pagination of /chat/history over chats that share one timestamp.
+
+Runs against a throwaway SQLite database, where timestamps compare as text:
+chats saved within the same second must still page forward by id.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# Must be set before the database module is imported
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/test.db"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from FinAdvisor.api import chat_history, database, models
+
+
+def _add_user(session: Session) -> uuid.UUID:
+    user_id = uuid.uuid4()
+    session.add(models.Profile(
+        id=user_id, username=f"test_{user_id.hex[:12]}", email=f"test_{user_id.hex[:12]}@example.com",
+        password_hash="x", name="Test", age=30,
+    ))
+    session.commit()
+    return user_id
+
+
+def _page_through(user_id: uuid.UUID, limit: int):
+    async def run():
+        ids, cursor = [], None
+        async with AsyncSession(database.async_engine, expire_on_commit=False) as db:
+            # Bounded, so a cursor that never advances fails instead of hanging
+            for _ in range(50):
+                before = chat_history.decode_cursor(cursor) if cursor else None
+                page = await chat_history.get_history_page(db, user_id, limit, before)
+                ids.extend(chat.id for chat in page.chats)
+                cursor = page.next_cursor
+                if cursor is None:
+                    break
+        return ids
+
+    return asyncio.run(run())
+
+
+def setup_module():
+    database.create_db_and_tables()
+
+
+def test_pages_through_chats_saved_in_the_same_second():
+    with Session(database.engine) as session:
+        user_id = _add_user(session)
+        # Server-default timestamps: all seven land in the same second
+        session.add_all(models.Chat(user_id=user_id, human_message=f"q{i}", ai_message="a") for i in range(7))
+        session.commit()
+
+    ids = _page_through(user_id, limit=3)
+
+    assert len(ids) == 7
+    assert ids == sorted(ids, reverse=True)
+
+
+def test_pages_continue_into_the_archive_across_shared_timestamps():
+    old = datetime.now(timezone.utc) - timedelta(days=200)
+    with Session(database.engine) as session:
+        user_id = _add_user(session)
+        # Archived chats keep their original ids, all older than the hot ones
+        session.add_all(
+            models.ChatArchive(
+                id=-(i + 1), user_id=user_id, timestamp=old, payload=chat_history.compress_chat(f"old{i}", "a")
+            )
+            for i in range(5)
+        )
+        session.add_all(models.Chat(user_id=user_id, human_message=f"q{i}", ai_message="a") for i in range(4))
+        session.commit()
+
+    ids = _page_through(user_id, limit=3)
+
+    assert len(ids) == len(set(ids)) == 9
+    assert ids[4:] == [-1, -2, -3, -4, -5]
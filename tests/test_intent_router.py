@@ -0,0 +1,66 @@
+"""Routing of phrasings the intent router used to send to the wrong fast path."""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+from FinAdvisor.agent.intent_router import IntentRouter
+from FinAdvisor.agent.ticker_matcher import COMPANY_ALIASES, TickerMatcher
+
+COMPANIES = {
+    "Reliance Industries": "RELIANCE",
+    "Tata Consultancy Services": "TCS",
+    "Infosys": "INFY",
+}
+
+
+@pytest.fixture(scope="module")
+def router():
+    return IntentRouter(TickerMatcher(COMPANIES, COMPANY_ALIASES))
+
+
+@pytest.mark.parametrize("query", [
+    "Which companies are available for analysis?",
+    "What stocks can you analyse?",
+    "List all available companies",
+])
+def test_company_list_wins_over_the_advice_guard(router, query):
+    assert router.classify(query).name == "company_list"
+
+
+@pytest.mark.parametrize("query, ticker", [
+    ("What is the current price of Reliance Industries?", "RELIANCE"),
+    ("TCS share price", "TCS"),
+])
+def test_present_quote_for_one_company(router, query, ticker):
+    intent = router.classify(query)
+    assert (intent.name, intent.ticker) == ("stock_quote", ticker)
+
+
+@pytest.mark.parametrize("query", [
+    "is Reliance overvalued at this price?",
+    "what happened to Reliance share price last year?",
+    "What was the price of Infosys yesterday?",
+    "what is the price?",
+    "price of gold",
+])
+def test_quote_words_without_a_current_quote_go_to_the_agent(router, query):
+    assert router.classify(query).name == "advice"
+
+
+def test_stopword_is_not_a_symbol(router):
+    intent = router.classify("is it a valid ticker?")
+    assert intent.symbol != "it"
+    assert intent.name != "valid_ticker"
+
+
+def test_valid_ticker_keeps_real_symbols(router):
+    intent = router.classify("Is INFY a valid ticker?")
+    assert (intent.name, intent.symbol) == ("valid_ticker", "INFY")
+
+
+def test_news_for_one_company(router):
+    intent = router.classify("Show me news sentiment for TCS")
+    assert (intent.name, intent.ticker) == ("company_news", "TCS")
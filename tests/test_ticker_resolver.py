@@ -0,0 +1,58 @@
+"""Fuzzy ticker resolution must match whole company names, not one shared word."""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+from FinAdvisor.agent.ticker_matcher import COMPANY_ALIASES
+from FinAdvisor.agent.ticker_resolver import TickerResolver
+
+COMPANIES = {
+    "Reliance Industries": "RELIANCE",
+    "Infosys": "INFY",
+    "Hindustan Unilever": "HINDUNILVR",
+    "Bajaj Finance": "BAJFINANCE",
+    "Power Grid Corporation": "POWERGRID",
+    "Coal India": "COALINDIA",
+    "JSW Steel": "JSWSTEEL",
+}
+
+
+class RecordingFallback:
+    def __init__(self, answer=None):
+        self.answer = answer
+        self.calls = []
+
+    def __call__(self, prompt, candidates):
+        self.calls.append((prompt, candidates))
+        return self.answer
+
+
+@pytest.mark.parametrize("prompt", ["steel prices", "power sector outlook", "bajaj auto news", "coal prices"])
+def test_one_shared_word_is_not_a_confident_match(prompt):
+    resolver = TickerResolver(COMPANIES, COMPANY_ALIASES)
+    assert resolver.resolve(prompt, allow_llm=False).ticker is None
+
+
+@pytest.mark.parametrize("prompt", ["steel prices", "power sector outlook", "bajaj auto news"])
+def test_partial_match_is_sent_to_the_llm(prompt):
+    fallback = RecordingFallback()
+    resolver = TickerResolver(COMPANIES, COMPANY_ALIASES, llm_fallback=fallback)
+    resolution = resolver.resolve(prompt)
+    assert len(fallback.calls) == 1
+    assert (resolution.ticker, resolution.tier) == (None, "unresolved")
+
+
+@pytest.mark.parametrize("prompt, ticker", [
+    ("how is relaince industries doing", "RELIANCE"),
+    ("infosis results", "INFY"),
+    ("hindustan unilver dividend", "HINDUNILVR"),
+])
+def test_misspelled_full_names_still_resolve_locally(prompt, ticker):
+    fallback = RecordingFallback()
+    resolver = TickerResolver(COMPANIES, COMPANY_ALIASES, llm_fallback=fallback)
+    resolution = resolver.resolve(prompt)
+    assert (resolution.ticker, resolution.tier) == (ticker, "fuzzy")
+    assert fallback.calls == []